@@ -18,20 +18,20 @@ fi
 
 echo "[*] Installing AirTIGHT to $INSTALL_DIR ..."
 mkdir -p $INSTALL_DIR
-cp -r src $INSTALL_DIR/
+cp -r src stress_tests $INSTALL_DIR/
 cp README.md $INSTALL_DIR/ 2>/dev/null || true
 
 echo "[*] Detecting package manager..."
 
 if command -v pacman &> /dev/null; then
     PM="pacman -S --needed --noconfirm"
-    DEPS="python-psutil pciutils alsa-utils pipewire wireplumber"
+    DEPS="python-psutil python-numpy pciutils alsa-utils pipewire wireplumber"
 elif command -v apt-get &> /dev/null; then
     PM="apt-get install -y"
-    DEPS="python3-psutil pciutils alsa-utils pipewire wireplumber"
+    DEPS="python3-psutil python3-numpy pciutils alsa-utils pipewire wireplumber"
 elif command -v dnf &> /dev/null; then
     PM="dnf install -y"
-    DEPS="python3-psutil pciutils alsa-utils pipewire wireplumber"
+    DEPS="python3-psutil python3-numpy pciutils alsa-utils pipewire wireplumber"
 else
     echo "[!] Unsupported package manager. Install dependencies manually."
     exit 1
@@ -42,9 +42,11 @@ $PM $DEPS
 
 
 echo "[*] Creating 'airtight' command..."
+# No sudo here: status/monitor/audit run unprivileged; fix escalates itself and
+# daemon/revert ask for root.
 cat <<EOF > $BIN_LINK
-#!/bin/bash
-sudo python3 -m src.main
+#!/bin/sh
+PYTHONPATH="$INSTALL_DIR" exec python3 -m src.main "\$@"
 EOF
 
 chmod +x $BIN_LINK
@@ -63,8 +65,10 @@ Description=AirTIGHT Audio Optimizer
 After=network.target sound.target
 
 [Service]
+# Root for the fixes. PipeWire clients are pointed at the runtime directory
+# of whichever user runs PipeWire, looked up each time they start.
 Type=simple
-ExecStart=/usr/bin/python3 -m src.main
+ExecStart=/usr/bin/python3 -u -m src.main daemon
 WorkingDirectory=$INSTALL_DIR
 Restart=on-failure
 
@@ -81,7 +85,8 @@ EOF
     echo "[*] Creating runit service..."
     cat <<EOF > $SERVICE_PATH/run
 #!/bin/sh
-exec python3 $INSTALL_DIR/src/main.py
+cd $INSTALL_DIR
+exec python3 -u -m src.main daemon
 EOF
     chmod +x $SERVICE_PATH/run
     echo "[*] Enable with: ln -s /etc/sv/airtight /var/service/"
@@ -92,8 +97,11 @@ EOF
     echo "[*] Creating OpenRC service..."
     cat <<EOF > $SERVICE_PATH
 #!/sbin/openrc-run
+directory="$INSTALL_DIR"
 command="/usr/bin/python3"
-command_args="$INSTALL_DIR/src/main.py"
+command_args="-u -m src.main daemon"
+command_background=true
+pidfile="/run/airtight.pid"
 EOF
     chmod +x $SERVICE_PATH
     echo "[*] Enable with: rc-update add airtight default"
@@ -106,5 +114,5 @@ esac
 
 echo "$BAR"
 echo "   INSTALLATION COMPLETE"
-echo "   Run 'airtight' to start the audit"
+echo "   Run 'airtight' to audit and fix, 'airtight status' for a quick check"
 echo "$BAR"
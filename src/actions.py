@@ -0,0 +1,50 @@
+from src.fixers.bluetooth_fix import BluetoothFixer
+from src.fixers.bt_codec import BluetoothCodecFixer
+from src.fixers.audio_fix import AudioFixer
+from src.fixers.cgroup_isolation import CgroupIsolationFixer
+from src.fixers.irq_affinity import IRQAffinityFixer
+from src.fixers.memory_fix import MemoryFixer
+from src.fixers.scheduler import SchedulerOptimizer
+from src.fixers.transaction import Transaction
+
+
+def plan_action(action, txn, profile):
+    """Stages the fixers behind one DecisionEngine action into `txn`; returns False if unknown."""
+    if action == "APPLY_RT_SCHEDULER_BOOST":
+        SchedulerOptimizer().plan(txn)
+    elif action == "APPLY_IRQ_AFFINITY":
+        IRQAffinityFixer(profile).plan(txn)
+    elif action == "APPLY_BLUETOOTH_COEX_FIX":
+        BluetoothFixer(profile).plan(txn)
+    elif action == "APPLY_BLUETOOTH_CODEC_FALLBACK":
+        BluetoothCodecFixer(profile).plan(txn)
+    elif action == "APPLY_CGROUP_ISOLATION":
+        CgroupIsolationFixer(profile).plan(txn)
+    elif action == "APPLY_MEMORY_STALL_FIX":
+        MemoryFixer(profile).plan(txn)
+    elif action == "DISABLE_AUDIO_POWER_SAVE":
+        AudioFixer(profile).plan(txn)
+    else:
+        print(f"[!] Unknown action: {action}")
+        return False
+    return True
+
+
+def build_transaction(plan, profile):
+    """One transaction for a whole plan, so shared reloads and restarts happen once."""
+    txn = Transaction(profile)
+    for action in plan:
+        plan_action(action, txn, profile)
+    return txn
+
+
+def apply_action(action, profile):
+    """Runs the fixers behind one DecisionEngine action.
+
+    Returns a callable that undoes exactly what was changed, or None if the
+    action left the system untouched (e.g. the fix was already in place).
+    """
+    txn = build_transaction([action], profile)
+    if not txn.apply():
+        return None
+    return txn.revert
@@ -0,0 +1,188 @@
+import os
+import time
+
+from src.actions import apply_action
+from src.decision_engine import DecisionEngine
+from src.fixers.bt_codec import CodecGovernor
+from src.forecast import XrunForecaster
+from src.profiler import audio_server
+from src.sampler import Sampler
+from src.state import load_json, save_json, state_dir
+from src.telemetry import TelemetryRing
+
+
+class OutcomeStore:
+    """Persists per-hardware verdicts for each action so ineffective fixes are not retried."""
+
+    def __init__(self, fingerprint, path=None):
+        self.fingerprint = fingerprint or "unknown"
+        self.path = path or os.path.join(state_dir(), "outcomes.json")
+        self.data = load_json(self.path, {})
+
+    def _entries(self):
+        return self.data.setdefault(self.fingerprint, {})
+
+    def is_ineffective(self, action):
+        return self._entries().get(action, {}).get("verdict") == "ineffective"
+
+    def record(self, action, verdict, before_rate, after_rate, before_latency=None, after_latency=None):
+        entry = self._entries().setdefault(action, {"effective": 0, "ineffective": 0})
+        entry[verdict] += 1
+        entry["verdict"] = verdict
+        entry["before_rate"] = before_rate
+        entry["after_rate"] = after_rate
+        if before_latency is not None and after_latency is not None:
+            entry["before_latency_ms"] = before_latency
+            entry["after_latency_ms"] = after_latency
+        entry["time"] = int(time.time())
+        save_json(self.path, self.data)
+
+
+class AirTIGHTDaemon:
+    """Headless closed loop: monitor, decide, apply, verify, and roll back what did not help."""
+
+    # A fix must cut the xrun rate by at least this fraction to count as effective,
+    # so sampling noise between two windows is not mistaken for an improvement.
+    MIN_IMPROVEMENT = 0.2
+
+    def __init__(self, profile, monitor, window=60, verify_window=120, rate_hz=1.0, outcomes=None, exporter=None,
+                 recorder=None, latency=None, forecast=False):
+        self.profile = profile
+        self.monitor = monitor
+        self.window = window
+        self.verify_window = verify_window
+        self.rate_hz = rate_hz
+        self.telemetry = TelemetryRing(capacity=int(max(window, verify_window) * rate_hz * 4))
+        self.sampler = Sampler(monitor, rate_hz=rate_hz)
+        self.engine = DecisionEngine(profile)
+        # Registered first, so the ring, exporter and recorder see each sample's xrun_risk.
+        self.forecaster = XrunForecaster(log=self.log) if forecast else None
+        if self.forecaster is not None:
+            self.sampler.add_listener(self.forecaster.observe)
+        self.sampler.add_listener(self.telemetry.append)
+        self.sampler.add_listener(self.engine.observe)
+        self.outcomes = outcomes or OutcomeStore(profile.get("fingerprint"))
+        self.applied = set()
+        self.exporter = exporter
+        if exporter is not None:
+            self.sampler.add_listener(exporter.update)
+        self.recorder = recorder
+        if recorder is not None:
+            self.sampler.add_listener(recorder.append)
+        # Lowered Bluetooth codecs climb back up once the link recovers.
+        self.codec = CodecGovernor(log=self.log).start()
+        self.sampler.add_listener(self.codec.check)
+        # A LatencyProbe measures each fix before and after; samples carry the latest result.
+        self.latency = latency
+        if latency is not None:
+            monitor.latency_probe = latency
+
+    def log(self, message):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+    def record(self, event, action):
+        if self.recorder is not None:
+            self.recorder.event(event, action)
+
+    def run(self):
+        self.log("[*] AirTIGHT daemon started "
+                 f"(window {self.window}s, verification {self.verify_window}s, {self.rate_hz} Hz).")
+        try:
+            while True:
+                self.refresh_profile()
+                stats = self.observe(self.window)
+                for action in self.propose(stats):
+                    stats = self.try_action(action, stats)
+        finally:
+            self.sampler.stop()
+            self.codec.stop()
+            if self.forecaster is not None:
+                self.forecaster.close()
+            if self.recorder is not None:
+                self.recorder.close()
+
+    def observe(self, seconds):
+        """Collects `seconds` of fresh samples and returns their window aggregates."""
+        self.sampler.drain()
+        for _ in self.sampler.samples(max(1, int(seconds * self.rate_hz))):
+            pass
+
+        return self.telemetry.window(seconds)
+
+    def refresh_profile(self):
+        """Follows the audio server, which may start after the daemon (e.g. at login)."""
+        server = audio_server()
+        if server != self.profile.get("audio_server"):
+            self.log(f"[*] Audio server is now {server}; re-evaluating the rules.")
+            self.profile["audio_server"] = server
+            self.engine.set_profile(self.profile)
+
+    def propose(self, stats):
+        plan = self.engine.analyze()
+        if self.exporter is not None:
+            self.exporter.set_plan(self.engine.confidence)
+        # Once every lowered codec is back, a degrading link may lower it again.
+        if "APPLY_BLUETOOTH_CODEC_FALLBACK" in self.applied and not self.codec.lowered():
+            self.applied.discard("APPLY_BLUETOOTH_CODEC_FALLBACK")
+        proposed = []
+        for action in plan:
+            if action in self.applied:
+                continue
+            if self.outcomes.is_ineffective(action):
+                self.log(f"[*] Skipping {action}: previously ineffective on this hardware.")
+                continue
+            proposed.append(action)
+        return proposed
+
+    def measure_latency(self):
+        if self.latency is None:
+            return None
+        result = self.latency.measure()
+        return result["latency_ms"] if result else None
+
+    def try_action(self, action, baseline):
+        """Applies one action, measures the verification window and keeps it only if it helped."""
+        before = baseline["xrun_rate_per_min"]
+        before_latency = self.measure_latency()
+        self.log(f"[⚡] Applying {action} (xrun rate {before}/min)...")
+
+        undo = apply_action(action, self.profile)
+        if undo is None:
+            self.log(f"[*] {action} made no changes; nothing to verify.")
+            self.applied.add(action)
+            return baseline
+        self.record("applied", action)
+
+        # Verify the fix on its own: a pre-emptive quantum raise would hide xruns it did not prevent.
+        if self.forecaster is not None:
+            self.forecaster.suspend()
+        try:
+            stats = self.observe(self.verify_window)
+        finally:
+            if self.forecaster is not None:
+                self.forecaster.resume()
+        after = stats["xrun_rate_per_min"]
+        after_latency = self.measure_latency()
+        if before_latency is not None and after_latency is not None:
+            self.log(f"[*] {action}: round-trip latency {before_latency:.2f} → {after_latency:.2f} ms.")
+
+        # With a quiet baseline there is nothing to lower; keep the fix only if it stays quiet.
+        if before == 0:
+            effective = after == 0
+        else:
+            effective = after <= before * (1 - self.MIN_IMPROVEMENT)
+
+        if effective:
+            self.log(f"[✓] {action} kept: xrun rate {before}/min → {after}/min.")
+            self.outcomes.record(action, "effective", before, after, before_latency, after_latency)
+            self.record("kept", action)
+            self.applied.add(action)
+            if self.exporter is not None:
+                self.exporter.set_applied(self.applied)
+        else:
+            self.log(f"[!] {action} did not clearly lower the xrun rate ({before} → {after}/min). Rolling back.")
+            undo()
+            self.outcomes.record(action, "ineffective", before, after, before_latency, after_latency)
+            self.record("rolled_back", action)
+
+        return stats
@@ -1,30 +1,115 @@
+import os
+
+from src.probes.network import RadioProbe
+from src.probes.pressure import cgroup_v2
+from src.rules import Condition, Rule, RuleEngine
+
+
+def _coex_vendor(profile):
+    return profile.get("vendor_name", "") in ["Realtek", "Intel", "Broadcom"]
+
+
+def _spare_cores(profile):
+    # Reserving audio cores only pays off if the rest of the system keeps enough CPUs.
+    return bool(profile.get("audio_pci")) and (os.cpu_count() or 1) >= 4
+
+
+def _cgroup_v2(profile):
+    return cgroup_v2()
+
+
+def _pipewire(profile):
+    return "pipewire" in profile.get("audio_server", "").lower()
+
+
+# Windows are in seconds; `clear` thresholds give each condition hysteresis.
+# CPU conditions use the core the PipeWire data-loop runs on (audio_core_*),
+# which falls back to the system average when no data-loop thread is found.
+DEFAULT_RULES = [
+    Rule(
+        "rt-starvation", "APPLY_RT_SCHEDULER_BOOST",
+        [Condition("sched_starved", "fraction", 10, ">=", 0.5, clear=0.2)],
+        hold=3, cooldown=300, confidence=0.9
+    ),
+    Rule(
+        "rt-load-xruns", "APPLY_RT_SCHEDULER_BOOST",
+        [Condition("audio_core_busy", "mean", 30, ">", 75, clear=65),
+         Condition("new_xruns", "rate", 60, ">=", 2, clear=1)],
+        hold=5, cooldown=300, confidence=0.6
+    ),
+    Rule(
+        "noisy-neighbour", "APPLY_CGROUP_ISOLATION",
+        [Condition("new_xruns", "rate", 60, ">=", 2, clear=1),
+         Condition("psi_max", "mean", 30, ">=", 10, clear=5),
+         # The same cgroup was busy in most recent xrun bursts (see probes/pressure.py).
+         Condition("noisy_share", "last", 10, ">=", 0.6, clear=0.4)],
+        hold=5, cooldown=600, confidence=0.7, requires=_cgroup_v2
+    ),
+    Rule(
+        "irq-contention", "APPLY_IRQ_AFFINITY",
+        [Condition("audio_core_irq", "mean", 30, ">=", 15, clear=8),
+         Condition("new_xruns", "rate", 60, ">=", 2, clear=1)],
+        hold=5, cooldown=600, confidence=0.5, requires=_spare_cores
+    ),
+    Rule(
+        "bt-coex", "APPLY_BLUETOOTH_COEX_FIX",
+        [Condition("new_xruns", "rate", 60, ">=", 2, clear=1),
+         Condition("audio_core_busy", "p95", 60, "<", 60, clear=70),
+         # Only when xruns demonstrably follow Wi-Fi traffic (see probes/network.py).
+         Condition("coex_corr", "last", 10, ">=", 0.4, clear=0.25)],
+        hold=3, cooldown=900, confidence=0.5, requires=_coex_vendor,
+        warmup=RadioProbe.MIN_SAMPLES  # at 1 Hz; coex_corr is 0 until then
+    ),
+    Rule(
+        "bt-link-quality", "APPLY_BLUETOOTH_CODEC_FALLBACK",
+        [Condition("bt_xruns", "rate", 60, ">=", 2, clear=1),
+         # Weak RSSI or controller errors (see probes/bt_link.py), not just busy radios.
+         Condition("bt_link_poor", "fraction", 30, ">=", 0.5, clear=0.2)],
+        hold=5, cooldown=300, confidence=0.7, requires=_pipewire
+    ),
+    Rule(
+        "memory-stall", "APPLY_MEMORY_STALL_FIX",
+        [Condition("new_xruns", "rate", 60, ">=", 2, clear=1),
+         # Xruns coincide with faults, swap-in or reclaim (see probes/memory.py).
+         Condition("mem_xrun_share", "last", 10, ">=", 0.5, clear=0.3)],
+        hold=5, cooldown=900, confidence=0.6
+    ),
+    Rule(
+        "audio-power-save", "DISABLE_AUDIO_POWER_SAVE",
+        [Condition("new_xruns", "sum", 60, ">=", 2, clear=1)],
+        cooldown=300, confidence=0.6, requires=_pipewire
+    )
+]
+
+
 class DecisionEngine:
-    def __init__(self, profile, monitor_stats):
+    def __init__(self, profile, monitor_stats=None, rules=None):
         self.profile = profile
         self.stats = monitor_stats
         self.plan = []
+        self.confidence = {}
+        self.rule_set = DEFAULT_RULES if rules is None else rules
+        self.rules = RuleEngine(self.rule_set, profile)
 
-    
-    def analyze(self):
-        xruns = self.stats.get("new_xruns", 0)
-        cpu = self.stats.get("cpu", 0)
-        status = self.stats.get("status", "stable")
-        vendor = self.profile.get("vendor_name", "")
-        audio_server = self.profile.get("audio_server", "").lower()
+        if monitor_stats:
+            self.observe(monitor_stats)
 
-        
-        if cpu > 80 or status == "high_cpu":
-            self.plan.append("APPLY_RT_SCHEDULER_BOOST")
+    def set_profile(self, profile):
+        """Recompiles the rules for a changed profile; their windows start over."""
+        self.profile = profile
+        self.rules = RuleEngine(self.rule_set, profile)
 
-      
-        if xruns > 0 and cpu < 60:
-            if vendor in ["Realtek", "Intel", "Broadcom"]:
-                self.plan.append("APPLY_BLUETOOTH_COEX_FIX")
+    def observe(self, sample):
+        """Feeds one monitor sample into the rule windows; cheap enough to call every tick."""
+        return self.rules.observe(sample)
 
-       
-        if xruns > 0 and "pipewire" in audio_server:
-            self.plan.append("DISABLE_AUDIO_POWER_SAVE")
+    def settle_time(self):
+        """Seconds of samples the active rule set needs before any of its rules can fire."""
+        return self.rules.settle_time()
 
+    def analyze(self):
+        self.confidence = self.rules.active()
+        self.plan = list(self.confidence)
         return self._prioritized_unique_plan()
 
     
@@ -33,7 +118,11 @@ class DecisionEngine:
         """Removes duplicates and enforces safe execution order."""
 
         priority_order = [
+            "APPLY_CGROUP_ISOLATION",
+            "APPLY_MEMORY_STALL_FIX",
             "APPLY_RT_SCHEDULER_BOOST",   
+            "APPLY_IRQ_AFFINITY",
+            "APPLY_BLUETOOTH_CODEC_FALLBACK",
             "APPLY_BLUETOOTH_COEX_FIX",   
             "DISABLE_AUDIO_POWER_SAVE"   
         ]
@@ -50,6 +139,6 @@ class DecisionEngine:
 
         report = ["\n[!] AirTIGHT Decision Engine Recommendations:"]
         for action in plan:
-            report.append(f"  → {action.replace('_', ' ')}")
+            report.append(f"  → {action.replace('_', ' ')} (confidence {self.confidence[action]:.2f})")
 
         return "\n".join(report)
@@ -0,0 +1,213 @@
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+DEFAULT_ADDRESS = "127.0.0.1:9477"
+
+
+def parse_address(spec):
+    """"host:port", ":port" or "unix:/path" -> (host, port) or a socket path string."""
+    if spec.startswith("unix:"):
+        return spec[5:]
+    host, _, port = spec.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.exporter.render()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.UnixStreamServer):
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+class MetricsExporter:
+    """Serves the monitor's latest sample as OpenMetrics text.
+
+    update() is a sampler listener and only folds the sample into a few
+    counters under a short lock. The text is rendered on the first scrape after
+    a new sample and the bytes are cached, so repeated scrapes cost a socket
+    write and the sampling thread never waits on a client.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.lock = threading.Lock()
+        self.sample = None
+        self.generation = 0
+        self.xruns_total = 0
+        self.node_xruns_total = {}
+        self.plan = {}
+        self.applied = set()
+        self._cache = (None, b"")
+        self.server = None
+        self.thread = None
+
+    # -- producer side (sampler / daemon threads) -----------------------
+
+    def update(self, sample):
+        with self.lock:
+            self.sample = sample
+            self.xruns_total += sample.get("new_xruns", 0)
+            for name, count in sample.get("node_xruns", {}).items():
+                self.node_xruns_total[name] = self.node_xruns_total.get(name, 0) + count
+            self.generation += 1
+
+    def set_plan(self, confidence):
+        """{action: confidence} of the latest DecisionEngine analysis."""
+        with self.lock:
+            self.plan = dict(confidence)
+            self.generation += 1
+
+    def set_applied(self, actions):
+        with self.lock:
+            self.applied = set(actions)
+            self.generation += 1
+
+    # -- scrape side -----------------------------------------------------
+
+    def render(self):
+        with self.lock:
+            generation = self.generation
+            if self._cache[0] == generation:
+                return self._cache[1]
+            sample = self.sample
+            xruns_total = self.xruns_total
+            node_totals = dict(self.node_xruns_total)
+            plan = dict(self.plan)
+            applied = sorted(self.applied)
+
+        body = self._render(sample, xruns_total, node_totals, plan, applied).encode()
+        with self.lock:
+            self._cache = (generation, body)
+        return body
+
+    def _render(self, sample, xruns_total, node_totals, plan, applied):
+        lines = []
+
+        def metric(name, kind, help_text, values):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+            suffix = "_total" if kind == "counter" else ""
+            for labels, value in values:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+        metric("airtight_xruns", "counter", "Xruns counted since the exporter started.", [((), xruns_total)])
+        metric("airtight_node_xruns", "counter", "Xruns per PipeWire node since the exporter started.",
+               [((("node", name),), count) for name, count in sorted(node_totals.items())])
+
+        if sample is not None:
+            metric("airtight_last_sample_timestamp_seconds", "gauge", "Wall-clock time of the latest sample.",
+                   [((), round(sample.get("time", 0.0), 3))])
+            metric("airtight_sample_lateness_seconds", "gauge", "How late the sampler ran the latest tick.",
+                   [((), round(sample.get("lateness", 0.0), 6))])
+            metric("airtight_cpu_percent", "gauge", "System CPU usage.", [((), sample.get("cpu", 0.0))])
+            metric("airtight_ram_percent", "gauge", "System memory usage.", [((), sample.get("ram", 0.0))])
+
+            for key, name, help_text in (
+                ("sched_delay_us", "airtight_sched_delay_microseconds", "Worst audio thread run-queue delay per wakeup."),
+                ("sched_invol_rate", "airtight_sched_involuntary_switches_per_second", "Involuntary context switches of audio threads."),
+                ("sched_non_rt", "airtight_sched_non_rt_data_loops", "PipeWire data-loop threads not on a real-time policy."),
+                ("wifi_pps", "airtight_wifi_packets_per_second", "Wi-Fi packet rate."),
+                ("bt_kbps", "airtight_bluetooth_kilobits_per_second", "Bluetooth controller throughput."),
+                ("coex_corr", "airtight_coex_correlation", "Cross-correlation of Wi-Fi traffic and xruns."),
+                ("bt_rssi", "airtight_bluetooth_rssi", "Worst RSSI of connected A2DP devices (BR/EDR: relative to the golden range)."),
+                ("bt_tx_power", "airtight_bluetooth_tx_power_dbm", "Highest transmit power of connected A2DP devices."),
+                ("audio_core_busy", "airtight_audio_core_busy_percent", "Load of the core running the PipeWire data-loop."),
+                ("audio_core_irq", "airtight_audio_core_interrupt_percent", "IRQ and softirq share of the audio core."),
+                ("latency_ms", "airtight_roundtrip_latency_milliseconds", "Latest measured round-trip latency."),
+                ("latency_jitter_ms", "airtight_roundtrip_jitter_milliseconds", "Spread of the latest latency measurement."),
+                ("psi_cpu", "airtight_pressure_cpu_percent", "Share of time tasks stalled on CPU (PSI some)."),
+                ("psi_io", "airtight_pressure_io_percent", "Share of time tasks stalled on I/O (PSI some)."),
+                ("psi_mem", "airtight_pressure_memory_percent", "Share of time tasks stalled on memory (PSI some)."),
+                ("audio_majflt", "airtight_audio_major_faults_per_second", "Major page faults of the audio daemons."),
+                ("audio_locked_kb", "airtight_audio_locked_kilobytes", "Memory PipeWire has locked (VmLck)."),
+                ("swap_in", "airtight_swap_in_pages_per_second", "Pages swapped in."),
+                ("compact_stall", "airtight_compaction_stalls_per_second", "Direct compaction stalls."),
+                ("direct_reclaim", "airtight_direct_reclaim_per_second", "Allocations that fell into direct reclaim."),
+                ("psi_mem_full", "airtight_pressure_memory_full_percent", "Share of time all tasks stalled on memory (PSI full)."),
+                ("noisy_share", "airtight_noisy_neighbour_share", "Share of recent xrun bursts blamed on the top suspect cgroup."),
+                ("xrun_risk", "airtight_xrun_risk", "Forecast probability of an xrun within the horizon."),
+                ("forecast_quantum", "airtight_forecast_quantum", "Quantum forced ahead of a forecast burst (0 while none is).")
+            ):
+                if sample.get(key) is not None:
+                    metric(name, "gauge", help_text, [((), sample[key])])
+
+            if sample.get("bt_codec"):
+                metric("airtight_bluetooth_codec", "gauge", "A2DP codec in use.",
+                       [((("codec", sample["bt_codec"]),), 1)])
+
+            if sample.get("noisy_cgroup"):
+                metric("airtight_noisy_neighbour_cpu_percent", "gauge", "CPU use of the cgroup blamed for xrun bursts.",
+                       [((("cgroup", sample["noisy_cgroup"]), ("comm", sample["noisy_comm"])), sample["noisy_cpu"])])
+
+            cores = sorted(sample.get("cores", {}).values(), key=lambda c: c.cpu)
+            metric("airtight_core_percent", "gauge", "Per-core time share by mode since the previous sample.",
+                   [((("cpu", c.cpu), ("mode", mode)), round(getattr(c, mode), 2))
+                    for c in cores for mode in ("user", "system", "irq", "softirq", "steal", "iowait")])
+
+            nodes = sorted(sample.get("nodes", {}).values(), key=lambda n: n.name)
+            metric("airtight_node_busy_ratio", "gauge", "PipeWire node B/Q (processing time per quantum).",
+                   [((("node", n.name),), n.busy_ratio) for n in nodes])
+            metric("airtight_node_wait_ratio", "gauge", "PipeWire node W/Q (scheduling wait per quantum).",
+                   [((("node", n.name),), n.wait_ratio) for n in nodes])
+            metric("airtight_node_quantum", "gauge", "PipeWire node quantum in frames.",
+                   [((("node", n.name),), n.quantum) for n in nodes])
+
+        metric("airtight_recommended_action", "gauge", "Confidence of each action in the latest decision plan.",
+               [((("action", a),), c) for a, c in sorted(plan.items())])
+        metric("airtight_fix_applied", "gauge", "Fixes applied and kept by AirTIGHT.",
+               [((("action", a),), 1) for a in applied])
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    # -- server ------------------------------------------------------------
+
+    def start(self):
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self.server = _UnixHTTPServer(self.address, _Handler)
+        else:
+            self.server = HTTPServer(self.address, _Handler)
+        self.server.exporter = self
+        self.thread = threading.Thread(target=self.server.serve_forever, name="airtight-metrics", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.server = None
+
+    def describe(self):
+        if isinstance(self.address, str):
+            return f"unix:{self.address}"
+        return f"http://{self.address[0]}:{self.address[1]}/metrics"
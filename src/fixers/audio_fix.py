@@ -1,40 +1,61 @@
 import subprocess
 import os
-import shutil
 
+from src.fixers.transaction import Transaction
 
-class AudioFixer:
-    def __init__(self):
-        self.conf_path = "/etc/modprobe.d/airtight_audio.conf"
 
-  
+PARAMS = "/sys/module/snd_hda_intel/parameters"
 
-    def disable_power_save(self):
-        """Prevents audio controller sleep (fixes pop after silence)."""
-        print("[*] Checking audio power-save configuration...")
 
-        config = (
+class AudioFixer:
+    def __init__(self, profile=None):
+        self.profile = profile or {}
+        self.conf_path = "/etc/modprobe.d/airtight_audio.conf"
+        self.udev_path = "/etc/udev/rules.d/90-airtight-audio.rules"
+        self.reboot_required = False
+        self.config = (
             "# AirTIGHT Audio Stability Fix\n"
             "options snd_hda_intel power_save=0 power_save_controller=N\n"
         )
 
-        if self._config_already_applied(config):
-            print("[✓] Audio power-save already disabled.")
-            return
-
-        backup = self.conf_path + ".bak"
+  
 
-        try:
-            if os.path.exists(self.conf_path) and not os.path.exists(backup):
-                shutil.copy(self.conf_path, backup)
-                print(f"[*] Backup created: {backup}")
+    def plan(self, txn):
+        """Stages the power-save fix for the next boot and for the running kernel."""
+        print("[*] Checking audio power-save configuration...")
 
-            with open(self.conf_path, "w") as f:
-                f.write(config)
+        if self._config_already_applied(self.config):
+            print("[✓] Audio power-save already disabled in modprobe.d.")
+        else:
+            txn.write_file(self.conf_path, self.config)
+
+        # The same settings applied to the running driver, so no reboot is needed.
+        txn.set_param(f"{PARAMS}/power_save", "0")
+        txn.set_param(f"{PARAMS}/power_save_controller", "N")
+
+        # Keep the controller itself out of runtime suspend and its PCIe link out of ASPM.
+        rules = []
+        for slot in self.profile.get("audio_pci", []):
+            base = f"/sys/bus/pci/devices/{slot}"
+            txn.set_param(f"{base}/power/control", "on")
+            rules.append(f'ACTION=="add", SUBSYSTEM=="pci", KERNEL=="{slot}", ATTR{{power/control}}="on"')
+            for state in ("l0s_aspm", "l1_aspm"):
+                if os.path.exists(f"{base}/link/{state}"):
+                    txn.set_param(f"{base}/link/{state}", "0")
+                    rules.append(f'ACTION=="add", SUBSYSTEM=="pci", KERNEL=="{slot}", ATTR{{link/{state}}}="0"')
+        if rules:
+            txn.write_file(self.udev_path, "# AirTIGHT Audio Device Power\n" + "\n".join(rules) + "\n")
+
+        txn.call(self.warm_up_alsa)
+        return True
 
-            print(f"[✓] Persistent audio fix written: {self.conf_path}")
-        except Exception as e:
-            print(f"[!] Failed to write audio config: {e}")
+    def disable_power_save(self):
+        """Prevents audio controller sleep (fixes pop after silence)."""
+        txn = Transaction(self.profile)
+        self.plan(txn)
+        changed = txn.apply()
+        self.reboot_required = txn.reboot_required
+        return changed
 
 
     def warm_up_alsa(self):
@@ -43,7 +64,7 @@ class AudioFixer:
 
         try:
             
-            subprocess.run(["amixer", "sset", "Master", "unmute"], stderr=subprocess.DEVNULL)
+            subprocess.run(["amixer", "sset", "Master", "unmute"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             print("[✓] ALSA channels unmuted.")
         except FileNotFoundError:
             print("[!] amixer not found. Skipping ALSA warm-up.")
@@ -51,9 +72,12 @@ class AudioFixer:
   
 
     def apply_all(self):
-        self.disable_power_save()
-        self.warm_up_alsa()
-        print("[*] Audio fixes applied. Reboot recommended for kernel-level changes.")
+        changed = self.disable_power_save()
+        if self.reboot_required:
+            print("[*] Audio fixes applied. Reboot recommended for kernel-level changes.")
+        else:
+            print("[✓] Audio fixes applied and active.")
+        return changed
 
 
 
@@ -1,6 +1,9 @@
-import subprocess
 import os
 import shutil
+import subprocess
+
+from src.fixers.transaction import Transaction, restart_service
+from src.procfs import read_text
 
 
 class BluetoothFixer:
@@ -9,57 +12,131 @@ class BluetoothFixer:
         self.init = profile.get("init_system", "systemd").lower()
         self.vendor = profile.get("vendor_name", "Unknown")
         self.conf_path = "/etc/modprobe.d/airtight_coex.conf"
+        self.udev_path = "/etc/udev/rules.d/90-airtight-bt.rules"
+        self.module = None
+
+    fix_map = {
+        "Realtek": (
+            "rtw88_core",
+            "# AirTIGHT Coexistence Fix\n"
+            "options rtw88_core disable_lps_deep=y\n"
+            "options rtw_pci disable_aspm=y\n"
+        ),
+        "Intel": (
+            "iwlwifi",
+            "# AirTIGHT Stability Fix\n"
+            "options iwlwifi power_save=0\n"
+        ),
+        "Broadcom": (
+            "brcmfmac",
+            "# AirTIGHT Stability Fix\n"
+            "options brcmfmac roamoff=1\n"
+        )
+    }
 
    
-    def apply_coex_fix(self):
+    def plan(self, txn):
+        """Stages the coexistence config, its live equivalent, and (only if needed) one reload.
+
+        The driver reload and bluetooth restart run only when the running driver
+        could not take the new settings live.
+        """
         print(f"[*] Evaluating Bluetooth/WiFi coexistence for {self.vendor}...")
 
-        fix_map = {
-            "Realtek": (
-                "rtw88_core",
-                "# AirTIGHT Coexistence Fix\n"
-                "options rtw88_core disable_lps_deep=y\n"
-                "options rtw_pci disable_aspm=y\n"
-            ),
-            "Intel": (
-                "iwlwifi",
-                "# AirTIGHT Stability Fix\n"
-                "options iwlwifi power_save=0\n"
-            ),
-            "Broadcom": (
-                "brcmfmac",
-                "# AirTIGHT Stability Fix\n"
-                "options brcmfmac roamoff=1\n"
-            )
-        }
-
-        if self.vendor not in fix_map:
+        self._plan_usb_power(txn)
+
+        if self.vendor not in self.fix_map:
             print("[!] No known coexistence tweaks for this chipset.")
-            return
+            return False
 
-        module, config = fix_map[self.vendor]
+        module, config = self.fix_map[self.vendor]
+        self.module = module
 
         if self._config_already_applied(config):
-            print("[✓] Coexistence fix already applied. Skipping.")
-            return
+            print("[✓] Coexistence config already in modprobe.d.")
+        else:
+            txn.write_file(self.conf_path, config)
+            txn.reload_module(module)
+            txn.restart_service("bluetooth", after=module)
+
+        wifi = self.profile.get("wifi_pci")
+        if self.vendor == "Realtek":
+            txn.set_param("/sys/module/rtw88_core/parameters/disable_lps_deep", "Y", module=module)
+            # Live counterpart of rtw_pci disable_aspm, which is only read at probe time.
+            links = [f"/sys/bus/pci/devices/{wifi}/link/{state}" for state in ("l0s_aspm", "l1_aspm")]
+            links = [path for path in links if wifi and os.path.exists(path)]
+            for path in links:
+                txn.set_param(path, "0", module=module)
+            if not links:
+                # Without one, only a driver reload applies it.
+                txn.require_reload(module)
+        elif self.vendor == "Intel":
+            # iwlwifi's power_save parameter is read-only at runtime; nl80211 does the same live.
+            txn.call(self._disable_wifi_power_save, kind="wifi_power_save", module=module)
+        return True
 
-        self._write_modprobe_conf(config)
-        self._reload_module_if_loaded(module)
+    def apply_coex_fix(self):
+        txn = Transaction(self.profile)
+        if self.plan(txn):
+            return txn.apply()
+        return False
+
+    def _plan_usb_power(self, txn):
+        """Keeps USB Bluetooth adapters out of autosuspend, now and on every boot."""
+        rules = []
+        for device in self.profile.get("bt_usb", []):
+            base = f"/sys/bus/usb/devices/{device}"
+            vendor, product = read_text(f"{base}/idVendor"), read_text(f"{base}/idProduct")
+            if not vendor:
+                continue
+            txn.set_param(f"{base}/power/control", "on")
+            rules.append(f'ACTION=="add", SUBSYSTEM=="usb", ATTR{{idVendor}}=="{vendor}", '
+                         f'ATTR{{idProduct}}=="{product}", ATTR{{power/control}}="on"')
+        if rules:
+            txn.write_file(self.udev_path, "# AirTIGHT Bluetooth Adapter Power\n" + "\n".join(rules) + "\n")
+
+    def _wifi_interface(self):
+        wifi = self.profile.get("wifi_pci")
+        candidates = []
+        try:
+            names = sorted(os.listdir("/sys/class/net"))
+        except OSError:
+            return None
+        for name in names:
+            if not os.path.isdir(f"/sys/class/net/{name}/wireless"):
+                continue
+            device = os.path.realpath(f"/sys/class/net/{name}/device")
+            if wifi and os.path.basename(device) == wifi:
+                return name
+            candidates.append(name)
+        return candidates[0] if candidates else None
+
+    def _disable_wifi_power_save(self):
+        """Turns Wi-Fi power save off with iw.
+
+        Returns the prior state for revert, True if it was already off, or None.
+        """
+        iface = self._wifi_interface()
+        if iface is None or not shutil.which("iw"):
+            return None
+        previous = _iw_power_save(iface)
+        if previous == "off":
+            print(f"[✓] {iface}: Wi-Fi power save already off.")
+            return True
+        if previous != "on":
+            return None
+        subprocess.run(["iw", "dev", iface, "set", "power_save", "off"], stderr=subprocess.DEVNULL)
+        if _iw_power_save(iface) != "off":
+            return None
+        print(f"[✓] {iface}: Wi-Fi power save off (live)")
+        return {"iface": iface, "previous": previous}
 
     
 
     def restart_bluetooth(self):
         print(f"[*] Restarting Bluetooth service via {self.init}...")
 
-        commands = {
-            "systemd": ["systemctl", "restart", "bluetooth"],
-            "openrc": ["rc-service", "bluetooth", "restart"],
-            "runit": ["sv", "restart", "bluetooth"]
-        }
-
-        cmd = commands.get(self.init)
-        if cmd and shutil.which(cmd[0]):
-            subprocess.run(cmd, stderr=subprocess.DEVNULL)
+        if restart_service(self.init, "bluetooth"):
             print("[✓] Bluetooth service restarted.")
         else:
             print("[!] Could not detect service manager. Restart manually if needed.")
@@ -74,29 +151,19 @@ class BluetoothFixer:
             existing = f.read()
         return new_config.strip() in existing.strip()
 
-    def _write_modprobe_conf(self, content):
-        backup = self.conf_path + ".bak"
 
-        try:
-            if os.path.exists(self.conf_path) and not os.path.exists(backup):
-                shutil.copy(self.conf_path, backup)
-                print(f"[*] Backup created: {backup}")
+def _iw_power_save(iface):
+    try:
+        out = subprocess.check_output(["iw", "dev", iface, "get", "power_save"], text=True,
+                                      stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.split(":")[-1].strip() or None
 
-            with open(self.conf_path, "w") as f:
-                f.write(content)
 
-            print(f"[✓] Coexistence config written: {self.conf_path}")
-        except Exception as e:
-            print(f"[!] Failed to write modprobe config: {e}")
+def _restore_wifi_power_save(data):
+    if data.get("previous") == "on" and shutil.which("iw"):
+        subprocess.run(["iw", "dev", data["iface"], "set", "power_save", "on"], stderr=subprocess.DEVNULL)
 
-    def _reload_module_if_loaded(self, module_name):
-        try:
-            lsmod = subprocess.check_output(["lsmod"], text=True)
-            if module_name in lsmod:
-                print(f"[*] Reloading {module_name} (network may flicker)...")
-                subprocess.run(["modprobe", "-r", module_name], stderr=subprocess.DEVNULL)
-                subprocess.run(["modprobe", module_name], stderr=subprocess.DEVNULL)
-            else:
-                print(f"[!] Module {module_name} not loaded. Reboot may be required.")
-        except Exception:
-            print("[!] Could not verify kernel module state.")
+
+Transaction.REVERTERS["wifi_power_save"] = _restore_wifi_power_save
@@ -0,0 +1,192 @@
+import os
+import subprocess
+import threading
+import time
+
+from src.fixers.transaction import Transaction
+from src.overhead import meter
+from src.probes.bt_link import BluetoothLinkProbe, CODEC_LADDER, bluez_cards, conn_info
+from src.procfs import session_env
+from src.state import load_json, save_json, state_dir
+
+
+def codec_state_path():
+    """Cards whose codec AirTIGHT lowered, with the profile to climb back to."""
+    return os.path.join(state_dir(), "bt_codec.json")
+
+
+def set_card_profile(card, profile):
+    meter.spawned("pactl")
+    try:
+        return subprocess.run(["pactl", "set-card-profile", card, profile], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=10, env=session_env()).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def neighbour_profile(card, step):
+    """The available profile one rung down (step=1) or up (step=-1) the codec ladder, or None."""
+    if card["codec"] not in CODEC_LADDER:
+        return None
+    by_codec = {codec: name for name, codec in card["profiles"].items() if name.startswith("a2dp-sink-")}
+    rung = CODEC_LADDER.index(card["codec"]) + step
+    while 0 <= rung < len(CODEC_LADDER):
+        if CODEC_LADDER[rung] in by_codec:
+            return by_codec[CODEC_LADDER[rung]]
+        rung += step
+    return None
+
+
+class BluetoothCodecFixer:
+    """Steps the A2DP codec of devices with a poor link one rung down the ladder.
+
+    Switching the card profile through PipeWire renegotiates only that
+    device's stream, with no bluetoothd restart or driver reload. Devices
+    whose RSSI is at or below BluetoothLinkProbe.POOR_RSSI are stepped down.
+    Without RSSI readings (no btmgmt, not root), every A2DP device is stepped
+    down, because the rule fired on controller errors and bluez node xruns.
+    The step is journaled for revert. CodecGovernor climbs back once the link
+    has recovered.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile or {}
+
+    def plan(self, txn):
+        print("[*] Checking Bluetooth A2DP link quality and codecs...")
+
+        cards = [card for card in bluez_cards() if card["codec"]]
+        if not cards:
+            print("[*] No Bluetooth device is streaming A2DP.")
+            return False
+
+        readings = {card["name"]: conn_info(card["address"]) if card["address"] else None for card in cards}
+        if any(readings.values()):
+            cards = [card for card in cards
+                     if readings[card["name"]] and readings[card["name"]][0] <= BluetoothLinkProbe.POOR_RSSI]
+
+        staged = False
+        for card in cards:
+            target = neighbour_profile(card, 1)
+            reading = readings[card["name"]]
+            link = f"RSSI {reading[0]}, TX power {reading[1]}" if reading else "no RSSI reading"
+            if target is None:
+                print(f"[*] {card['name']}: already on the most robust codec ({card['codec']}, {link}).")
+                continue
+            print(f"[*] {card['name']}: {card['codec']} → {card['profiles'][target]} ({link})")
+            txn.call(lambda card=card, target=target: self.step_down(card, target), kind="bt_codec")
+            staged = True
+        return staged
+
+    def step_down(self, card, target):
+        """Switches `card` to `target`; returns the journal data for revert, or None."""
+        if not set_card_profile(card["name"], target):
+            print(f"[!] {card['name']}: PipeWire refused profile {target}.")
+            return None
+        print(f"[✓] {card['name']}: A2DP codec {card['codec']} → {card['profiles'][target]} (live)")
+
+        state = load_json(codec_state_path(), {})
+        entry = state.setdefault(card["name"], {"original": card["profile"]})
+        entry["profile"] = target
+        entry["time"] = int(time.time())
+        save_json(codec_state_path(), state)
+        return {"card": card["name"], "previous": card["profile"]}
+
+
+class CodecGovernor:
+    """Climbs lowered codecs back up, one rung at a time, once the link has recovered.
+
+    check() is registered as a sampler listener next to a monitor with a
+    BluetoothLinkProbe. A rung is climbed after RECOVER_SECONDS without a
+    poor link or a bluez node xrun. The hold restarts after each step, so a
+    link that degrades again stops the climb. The listener only decides;
+    pactl runs on a worker thread so a slow profile switch never delays a
+    sample.
+    """
+
+    RECOVER_SECONDS = 120.0
+
+    def __init__(self, log=print):
+        self.log = log
+        self._last_step = time.monotonic()
+        self._due = threading.Event()
+        self._stop = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, name="airtight-codec", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._due.set()
+        if self.thread is not None:
+            self.thread.join(timeout=15)
+            self.thread = None
+
+    def lowered(self):
+        return load_json(codec_state_path(), {})
+
+    def check(self, sample):
+        good = sample.get("bt_good_s", 0.0)
+        now = time.monotonic()
+        if good < self.RECOVER_SECONDS or now - self._last_step < self.RECOVER_SECONDS:
+            return
+        self._last_step = now
+        self._due.set()
+
+    def _run(self):
+        while True:
+            self._due.wait()
+            self._due.clear()
+            if self._stop.is_set():
+                return
+            self.climb()
+
+    def climb(self):
+        """Steps every lowered card one rung back up."""
+        state = self.lowered()
+        if not state:
+            return
+
+        cards = {card["name"]: card for card in bluez_cards()}
+        for name, entry in list(state.items()):
+            card = cards.get(name)
+            if card is None:
+                del state[name]  # disconnected: it negotiates afresh on reconnect
+                continue
+            original = card["profiles"].get(entry["original"])
+            if card["codec"] is None or card["profile"] == entry["original"] or card["codec"] == original:
+                del state[name]  # back where it started, or no longer on A2DP
+                continue
+            # Never climb past the codec the device was using before it was lowered.
+            target = neighbour_profile(card, -1)
+            if (target is None or card["profiles"][target] == original
+                    or (original in CODEC_LADDER
+                        and CODEC_LADDER.index(card["profiles"][target]) < CODEC_LADDER.index(original))):
+                target = entry["original"]
+            if set_card_profile(name, target):
+                self.log(f"[✓] {name}: link recovered, A2DP codec {card['codec']} → "
+                         f"{card['profiles'].get(target, target)}.")
+                entry["profile"] = target
+                if target == entry["original"]:
+                    del state[name]
+        save_json(codec_state_path(), state)
+
+
+def _restore_codec(data):
+    if set_card_profile(data["card"], data["previous"]):
+        print(f"[✓] {data['card']}: A2DP profile {data['previous']} restored.")
+    state = load_json(codec_state_path(), {})
+    entry = state.get(data["card"])
+    if entry is not None:
+        if data["previous"] == entry["original"]:
+            del state[data["card"]]
+        else:
+            entry["profile"] = data["previous"]
+        save_json(codec_state_path(), state)
+
+
+Transaction.REVERTERS["bt_codec"] = _restore_codec
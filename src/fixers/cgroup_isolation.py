@@ -0,0 +1,87 @@
+import os
+import time
+
+from src.probes.pressure import CGROUP_ROOT, cgroup_v2, evidence_path, is_protected, protected_cgroups
+from src.procfs import read_text
+from src.state import load_json
+
+
+class CgroupIsolationFixer:
+    """Confines the cgroups blamed for xrun bursts instead of boosting audio globally.
+
+    Offenders come from the evidence the PressureProbe records while the
+    monitor or daemon runs. Each one blamed for at least MIN_BURSTS recent
+    bursts gets a low cpu.weight and io.weight and a cpu.max cap of half the
+    machine, written live through the transaction so revert restores the
+    previous values. Controllers the parent cgroup does not delegate are
+    skipped; io.weight only takes effect with BFQ or the io.cost controller.
+    """
+
+    CPU_WEIGHT = 20
+    IO_WEIGHT = 20
+    PERIOD_US = 100000
+    MIN_BURSTS = 3
+    MAX_AGE = 600.0
+    MAX_CGROUPS = 3
+
+    def __init__(self, profile=None, offenders=None):
+        self.profile = profile or {}
+        self.offenders = offenders
+
+    def load_offenders(self):
+        evidence = load_json(evidence_path(), {})
+        if time.time() - evidence.get("time", 0) > self.MAX_AGE:
+            return []
+        return evidence.get("offenders", [])
+
+    def weight_above(self, path, weight):
+        """True if the cgroup's cpu.weight or io.weight ("default N") is still above `weight`."""
+        fields = read_text(path).split("\n")[0].split()
+        return bool(fields) and fields[-1].isdigit() and int(fields[-1]) > weight
+
+    def cpu_max(self, cgroup):
+        """The cap to stage, or None if the cgroup is already held at or below it."""
+        quota = max(1, (os.cpu_count() or 1) // 2) * self.PERIOD_US
+        current = read_text(f"{CGROUP_ROOT}{cgroup}/cpu.max").split()
+        if len(current) == 2 and current[0].isdigit() and current[1].isdigit():
+            if int(current[0]) * self.PERIOD_US <= quota * int(current[1]):
+                return None
+        return f"{quota} {self.PERIOD_US}"
+
+    def plan(self, txn):
+        print("[*] Looking for noisy neighbours of the audio path...")
+
+        if not cgroup_v2():
+            print("[!] cgroup v2 is not mounted at /sys/fs/cgroup. Skipping.")
+            return False
+
+        offenders = self.offenders if self.offenders is not None else self.load_offenders()
+        protected = protected_cgroups()
+        chosen = [o for o in offenders
+                  if o.get("bursts", 0) >= self.MIN_BURSTS and not is_protected(o["cgroup"], protected)]
+        if not chosen:
+            print("[✓] No process group was repeatedly active during xrun bursts.")
+            return False
+
+        for offender in chosen[:self.MAX_CGROUPS]:
+            cgroup = offender["cgroup"]
+            base = f"{CGROUP_ROOT}{cgroup}"
+            if not os.path.isdir(base):
+                print(f"[*] {cgroup} no longer exists.")
+                continue
+            print(f"[*] {offender['comm']} ({cgroup}): blamed for {offender['bursts']}/{offender['window']} "
+                  f"bursts, {offender['cpu_pct']:.0f}% CPU, {offender['io_mbps']:.1f} MB/s I/O")
+
+            # Weights and caps are only ever lowered, never raised back towards the default.
+            if os.path.exists(f"{base}/cpu.weight"):
+                if self.weight_above(f"{base}/cpu.weight", self.CPU_WEIGHT):
+                    txn.set_param(f"{base}/cpu.weight", self.CPU_WEIGHT)
+                cap = self.cpu_max(cgroup)
+                if cap is not None:
+                    txn.set_param(f"{base}/cpu.max", cap)
+            if os.path.exists(f"{base}/io.weight"):
+                if self.weight_above(f"{base}/io.weight", self.IO_WEIGHT):
+                    txn.set_param(f"{base}/io.weight", f"default {self.IO_WEIGHT}")
+            if not os.path.exists(f"{base}/cpu.weight") and not os.path.exists(f"{base}/io.weight"):
+                print(f"[!] {cgroup}: cpu and io controllers are not enabled for it. Skipping.")
+        return True
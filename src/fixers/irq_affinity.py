@@ -0,0 +1,234 @@
+import os
+import re
+
+from src.fixers.transaction import Transaction, write_param
+from src.procfs import find_processes, format_cpulist, list_threads, parse_cpulist, read_text, thread_identity
+
+
+PCI_SLOT = re.compile(r"^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]$")
+CPU_ROOT = "/sys/devices/system/cpu"
+IRQBALANCE_CONFIGS = ("/etc/default/irqbalance", "/etc/sysconfig/irqbalance", "/etc/irqbalance.env")
+
+
+def online_cpus():
+    return parse_cpulist(read_text(f"{CPU_ROOT}/online", "0"))
+
+
+def audio_cores():
+    """Picks the cores reserved for the audio path: the last core and its SMT siblings.
+
+    CPU0 is avoided because it services most non-movable interrupts. Returns an
+    empty list when there are too few CPUs to set any aside.
+    """
+    online = online_cpus()
+    if len(online) < 2:
+        return []
+    last = online[-1]
+    siblings = parse_cpulist(read_text(f"{CPU_ROOT}/cpu{last}/topology/thread_siblings_list", str(last)))
+    cores = [cpu for cpu in siblings if cpu in online]
+    if len(cores) >= len(online):
+        cores = [last]
+    return cores
+
+
+def read_interrupts(path="/proc/interrupts"):
+    """Returns {irq: (total_count, name)} for the numbered lines of /proc/interrupts."""
+    irqs = {}
+    try:
+        with open(path, "r") as f:
+            ncpu = len(f.readline().split())
+            for line in f:
+                label, _, rest = line.partition(":")
+                label = label.strip()
+                if not label.isdigit():
+                    continue
+                fields = rest.split()
+                counts = [int(v) for v in fields[:ncpu] if v.isdigit()]
+                irqs[int(label)] = (sum(counts), " ".join(fields[ncpu + 2:]))
+    except OSError:
+        pass
+    return irqs
+
+
+def pci_irqs(slot):
+    """IRQs of a PCI device: its MSI/MSI-X vectors, or the legacy INTx line."""
+    base = f"/sys/bus/pci/devices/{slot}"
+    try:
+        vectors = sorted(int(v) for v in os.listdir(f"{base}/msi_irqs") if v.isdigit())
+    except OSError:
+        vectors = []
+    if vectors:
+        return vectors
+    irq = read_text(f"{base}/irq")
+    return [int(irq)] if irq.isdigit() and irq != "0" else []
+
+
+def usb_host_slot(device):
+    """PCI slot of the USB host controller a USB device hangs off (its btusb IRQs arrive there)."""
+    slot = None
+    for part in os.path.realpath(f"/sys/bus/usb/devices/{device}").split("/"):
+        if PCI_SLOT.match(part):
+            slot = part
+    return slot
+
+
+class IRQAffinityFixer:
+    """Keeps the audio path on its own cores.
+
+    The HDA controller and Bluetooth host-controller IRQs and the PipeWire
+    data-loop threads are pinned to audio_cores(); every other movable IRQ is
+    steered off those cores, and the cores' cpufreq policy is set to ramp up
+    immediately. All writes are journaled through the transaction for revert.
+    """
+
+    def __init__(self, profile, cores=None):
+        self.profile = profile
+        self.cores = sorted(cores) if cores else audio_cores()
+        self.targets = ("pipewire",)
+
+    def audio_irqs(self):
+        irqs = set()
+        for slot in self.profile.get("audio_pci", []):
+            irqs.update(pci_irqs(slot))
+        for device in self.profile.get("bt_usb", []):
+            slot = usb_host_slot(device)
+            if slot:
+                irqs.update(pci_irqs(slot))
+        return sorted(irqs)
+
+    def plan(self, txn):
+        print("[*] Evaluating IRQ and CPU placement of the audio path...")
+
+        if not self.cores:
+            print("[!] Not enough CPUs to reserve cores for audio. Skipping.")
+            return False
+
+        irqs = self.audio_irqs()
+        names = read_interrupts()
+        for irq in irqs:
+            print(f"[*] Audio IRQ {irq}: {names.get(irq, (0, '?'))[1]}")
+
+        self._plan_irqbalance(txn, irqs)
+        txn.call(lambda: self.pin(irqs), kind="irq_affinity")
+        return True
+
+    def pin(self, irqs):
+        """Applies the placement; returns the journal of previous values (None if nothing changed)."""
+        cores = set(self.cores)
+        others = [cpu for cpu in online_cpus() if cpu not in cores]
+        cpulist = format_cpulist(self.cores)
+        journal = {"paths": {}, "threads": {}}
+        moved = 0
+
+        try:
+            entries = [int(e) for e in os.listdir("/proc/irq") if e.isdigit()]
+        except OSError:
+            entries = []
+
+        for irq in sorted(entries):
+            path = f"/proc/irq/{irq}/smp_affinity_list"
+            current = read_text(path, None)
+            if current is None:
+                continue
+            if irq in irqs:
+                target = cpulist
+            else:
+                remaining = [cpu for cpu in parse_cpulist(current) if cpu not in cores]
+                target = format_cpulist(remaining or others)
+            if not target:
+                continue
+            # Per-CPU and chained interrupts reject the write; they stay where they are.
+            confirmed, previous = write_param(path, target)
+            if confirmed and previous != target:
+                journal["paths"][path] = previous
+                moved += 1
+
+        for pid in find_processes(self.targets):
+            for tid, name in list_threads(pid):
+                identity = thread_identity(pid, tid)
+                if not name.startswith("data-loop") or identity is None:
+                    continue
+                try:
+                    previous = sorted(os.sched_getaffinity(tid))
+                    if set(previous) != cores:
+                        os.sched_setaffinity(tid, cores)
+                        journal["threads"][str(tid)] = {"pid": pid, "thread": identity[0], "start": identity[1],
+                                                        "cpus": previous}
+                except OSError:
+                    pass
+
+        for cpu in self.cores:
+            base = f"{CPU_ROOT}/cpu{cpu}/cpufreq"
+            epp = f"{base}/energy_performance_preference"
+            governor = read_text(f"{base}/scaling_governor")
+            if os.path.exists(epp) and governor != "performance":
+                path, value = epp, "performance"
+            elif "performance" in read_text(f"{base}/scaling_available_governors").split():
+                path, value = f"{base}/scaling_governor", "performance"
+            else:
+                continue
+            confirmed, previous = write_param(path, value)
+            if confirmed and previous != value:
+                journal["paths"][path] = previous
+
+        print(f"[✓] Audio cores {cpulist}: {len(irqs)} audio IRQs pinned, {moved} IRQ affinities changed, "
+              f"{len(journal['threads'])} data-loop threads pinned.")
+        if not journal["paths"] and not journal["threads"]:
+            return None
+        return journal
+
+    def restore(self, journal):
+        restore_placement(journal)
+
+    def pin_audio_path(self):
+        txn = Transaction(self.profile)
+        if self.plan(txn):
+            return txn.apply()
+        return False
+
+    def _plan_irqbalance(self, txn, irqs):
+        """irqbalance would undo the steering; ban the audio cores and IRQs in its config."""
+        if not find_processes(("irqbalance",)):
+            return
+        path = next((p for p in IRQBALANCE_CONFIGS if os.path.exists(p)), None)
+        if path is None:
+            print("[!] irqbalance is running without a config file; it may move the audio IRQs again.")
+            return
+
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+
+        args = []
+        kept = []
+        for line in lines:
+            if line.startswith("IRQBALANCE_ARGS="):
+                args = line.split("=", 1)[1].strip().strip('"').split()
+            elif not line.startswith(("IRQBALANCE_BANNED_CPULIST=", "# AirTIGHT")):
+                kept.append(line)
+
+        args += [f"--banirq={irq}" for irq in irqs if f"--banirq={irq}" not in args]
+        kept += [
+            "# AirTIGHT: keep other interrupts off the audio cores, and the audio IRQs where they are",
+            f"IRQBALANCE_BANNED_CPULIST={format_cpulist(self.cores)}",
+            f'IRQBALANCE_ARGS="{" ".join(args)}"'
+        ]
+        txn.write_file(path, "\n".join(kept) + "\n")
+        txn.restart_service("irqbalance")
+
+
+def restore_placement(journal):
+    """Undoes IRQAffinityFixer.pin() from its journal."""
+    for path, previous in journal.get("paths", {}).items():
+        write_param(path, previous)
+    for tid, thread in journal.get("threads", {}).items():
+        # After a PipeWire restart or a reboot the TID may belong to an unrelated thread.
+        if thread_identity(thread["pid"], tid) != (thread["thread"], thread["start"]):
+            continue
+        try:
+            os.sched_setaffinity(int(tid), thread["cpus"])
+        except OSError:
+            pass  # thread has exited since
+    print("[✓] IRQ affinity and CPU placement restored.")
+
+
+Transaction.REVERTERS["irq_affinity"] = restore_placement
@@ -0,0 +1,109 @@
+from src.fixers.transaction import Transaction
+from src.procfs import find_processes, read_meminfo, read_text
+from src.probes.memory import read_vm_kb
+
+
+VM = "/proc/sys/vm"
+THP_DEFRAG = "/sys/kernel/mm/transparent_hugepage/defrag"
+
+
+def thp_mode(path=THP_DEFRAG):
+    """The selected mode of a THP setting ("always defer [madvise] never" -> "madvise"), or None."""
+    for word in read_text(path).split():
+        if word.startswith("[") and word.endswith("]"):
+            return word[1:-1]
+    return None
+
+
+class MemoryFixer:
+    """Keeps the kernel from stalling audio threads on memory.
+
+    Lowers vm.swappiness so PipeWire's pages are not swapped out while file
+    cache can still be dropped. Raises vm.watermark_scale_factor so kswapd
+    frees memory in the background before allocations fall into direct
+    reclaim. Moves THP defrag off `always`, so no page fault compacts memory
+    synchronously. The sysctls are written live and to sysctl.d; the THP mode
+    is set live, and through tmpfiles.d on systemd.
+    """
+
+    SWAPPINESS = 10
+    WATERMARK_SCALE = 125  # 1.25% of memory between watermarks; the kernel default is 10
+    DEFRAG = "madvise"
+
+    def __init__(self, profile=None):
+        self.profile = profile or {}
+        self.sysctl_path = "/etc/sysctl.d/90-airtight-memory.conf"
+        self.tmpfiles_path = "/etc/tmpfiles.d/airtight-thp.conf"
+
+    def plan(self, txn):
+        print("[*] Checking memory reclaim and page-fault settings...")
+        self._report_mlock()
+
+        sysctls = {}
+        swappiness = read_text(f"{VM}/swappiness")
+        if not read_meminfo().get("SwapTotal"):
+            print("[✓] No swap configured; vm.swappiness left alone.")
+        elif swappiness.isdigit() and int(swappiness) > self.SWAPPINESS:
+            sysctls["swappiness"] = self.SWAPPINESS
+
+        scale = read_text(f"{VM}/watermark_scale_factor")
+        if scale.isdigit() and int(scale) < self.WATERMARK_SCALE:
+            sysctls["watermark_scale_factor"] = self.WATERMARK_SCALE
+
+        for name, value in sysctls.items():
+            print(f"[*] vm.{name}: {read_text(f'{VM}/{name}')} → {value}")
+            txn.set_param(f"{VM}/{name}", value)
+        if sysctls:
+            txn.write_file(self.sysctl_path, "# AirTIGHT Memory Stall Fix\n"
+                           + "".join(f"vm.{name} = {value}\n" for name, value in sysctls.items()))
+
+        mode = thp_mode()
+        if mode == "always":
+            print(f"[*] THP defrag: always → {self.DEFRAG}")
+            txn.call(lambda: self._set_defrag(self.DEFRAG), kind="thp_defrag")
+            if self.profile.get("init_system", "systemd").lower() == "systemd":
+                txn.write_file(self.tmpfiles_path, "# AirTIGHT Memory Stall Fix\n"
+                               f"w {THP_DEFRAG} - - - - {self.DEFRAG}\n")
+        elif mode is not None:
+            print(f"[✓] THP defrag is {mode}; page faults do not compact synchronously.")
+
+        if not sysctls and mode != "always":
+            print("[✓] Memory reclaim settings already favour low latency.")
+            return False
+        return True
+
+    def _report_mlock(self):
+        """Warns when PipeWire runs without locked memory despite the memlock limit."""
+        for pid, comm in find_processes(("pipewire",)).items():
+            locked = read_vm_kb(pid).get("VmLck", 0)
+            if locked:
+                print(f"[✓] {comm}[{pid}] has {locked} kB locked in memory.")
+            else:
+                print(f"[!] {comm}[{pid}] locks no memory; its pages can be reclaimed "
+                      "(enable mem.mlock-all in pipewire.conf with the memlock limit).")
+
+    def _set_defrag(self, mode):
+        """Switches the THP defrag mode; returns the previous mode for revert, or None."""
+        previous = thp_mode()
+        try:
+            with open(THP_DEFRAG, "w") as f:
+                f.write(mode)
+        except OSError as e:
+            print(f"[!] Could not set THP defrag: {e}")
+            return None
+        if thp_mode() != mode:
+            return None
+        print(f"[✓] THP defrag = {mode} (live)")
+        return {"previous": previous}
+
+
+def _restore_defrag(data):
+    try:
+        with open(THP_DEFRAG, "w") as f:
+            f.write(data["previous"])
+        print(f"[✓] Restored THP defrag = {data['previous']}")
+    except OSError as e:
+        print(f"[!] Could not restore THP defrag: {e}")
+
+
+Transaction.REVERTERS["thp_defrag"] = _restore_defrag
@@ -1,89 +1,235 @@
-import subprocess
-import shutil
+import ctypes
 import os
+import platform
+
+from src.fixers.transaction import Transaction
+from src.procfs import find_processes, list_threads, thread_identity
+
+
+# ioprio_set/ioprio_get syscall numbers; the glibc wrapper does not exist.
+IOPRIO_SYSCALLS = {
+    "x86_64": (251, 252),
+    "i386": (289, 290),
+    "i686": (289, 290),
+    "aarch64": (30, 31),
+    "riscv64": (30, 31),
+    "armv7l": (314, 315),
+    "ppc64le": (273, 274)
+}
+
+SCHED_RESET_ON_FORK = 0x40000000
+
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASS_BE = 2
+
+POLICY_NAMES = {
+    os.SCHED_OTHER: "SCHED_OTHER",
+    os.SCHED_FIFO: "SCHED_FIFO",
+    os.SCHED_RR: "SCHED_RR",
+    getattr(os, "SCHED_BATCH", 3): "SCHED_BATCH",
+    getattr(os, "SCHED_IDLE", 5): "SCHED_IDLE"
+}
 
 
 class SchedulerOptimizer:
     def __init__(self):
-        self.rtkit_available = shutil.which("rtkitctl") is not None
         self.limits_path = "/etc/security/limits.d/airtight_audio.conf"
+        self.targets = ("pipewire", "pipewire-pulse", "wireplumber", "bluetoothd")
+        self.nice_level = -12
+        # Matches PipeWire's own module-rt default, below the rtprio 95 limit we grant.
+        self.rt_priority = 88
+        self.last_result = None
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._ioprio = IOPRIO_SYSCALLS.get(platform.machine())
+
 
-  
 
     def boost_audio_priority(self):
+        """Boosts every audio thread in one /proc scan and returns a before/after report.
+
+        PipeWire data-loop threads get SCHED_FIFO; all other threads stay on normal
+        scheduling with a raised nice level and best-effort I/O priority 0.
+        """
         print("[*] Evaluating audio process scheduling...")
 
-        targets = ["pipewire", "wireplumber", "bluetoothd"]
+        result = {"threads": [], "changed": 0, "skipped": 0, "failed": 0}
 
-        for proc in targets:
-            pids = self._get_pids(proc)
-            for pid in pids:
-                if not self._already_boosted(pid):
-                    if self.rtkit_available:
-                        self._apply_rtkit(pid)
-                    else:
-                        self._manual_boost(pid)
+        for pid, comm in sorted(find_processes(self.targets).items()):
+            for tid, thread_name in list_threads(pid):
+                entry = self._boost_thread(pid, tid, comm, thread_name)
+                result["threads"].append(entry)
+                if entry["error"]:
+                    result["failed"] += 1
+                elif entry["changed"]:
+                    result["changed"] += 1
                 else:
-                    print(f"[✓] PID {pid} already optimized.")
+                    result["skipped"] += 1
+
+        self.last_result = result
+        self._print_result(result)
+        return result
+
+    def restore(self, result=None):
+        """Puts every thread touched by `result` (default: the last boost) back to its prior state."""
+        result = result or self.last_result
+        if not result:
+            return
+
+        replaced = 0
+        for entry in result["threads"]:
+            if not entry["changed"]:
+                continue
+            # After a PipeWire restart or a reboot the TID may belong to an unrelated thread.
+            if thread_identity(entry["pid"], entry["tid"]) != (entry["thread"], entry["start"]):
+                replaced += 1
+                continue
+            before = entry["before"]
+            try:
+                self._apply(entry["tid"], before["policy"], before["rtprio"], before["nice"], before["ioprio"])
+            except OSError:
+                pass  # thread has exited since
+        print("[✓] Audio thread scheduling restored.")
+        if replaced:
+            print(f"[*] {replaced} boosted threads no longer exist; left alone.")
+
+    def _boost_thread(self, pid, tid, comm, thread_name):
+        realtime = thread_name.startswith("data-loop") and comm != "bluetoothd"
+        entry = {
+            "pid": pid,
+            "tid": tid,
+            "comm": comm,
+            "thread": thread_name,
+            "start": None,
+            "role": "data-loop" if realtime else "main",
+            "before": None,
+            "after": None,
+            "changed": False,
+            "error": None
+        }
+
+        identity = thread_identity(pid, tid)
+        if identity is None:
+            entry["error"] = "thread has exited"
+            return entry
+        entry["start"] = identity[1]
 
-    
+        try:
+            before = self._read_state(tid)
+        except OSError as e:
+            entry["error"] = str(e)
+            return entry
+        entry["before"] = before
+
+        if realtime:
+            target = (os.SCHED_FIFO, max(before["rtprio"], self.rt_priority), before["nice"], before["ioprio"])
+            boosted = before["policy"] in ("SCHED_FIFO", "SCHED_RR")
+        else:
+            ioprio = (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | 0
+            target = (before["policy_id"], before["rtprio"], min(before["nice"], self.nice_level), ioprio)
+            boosted = before["nice"] <= -10
+
+        if boosted:
+            entry["after"] = before
+            return entry
 
-    def _apply_rtkit(self, pid):
         try:
-            subprocess.run(
-                ["rtkitctl", "set-rtprio", pid, "10"],
-                stderr=subprocess.DEVNULL
-            )
-            print(f"[✓] RTKit applied to PID {pid}")
-        except Exception:
-            print(f"[!] RTKit failed for PID {pid}")
+            self._apply(tid, *target)
+            entry["after"] = self._read_state(tid)
+            entry["changed"] = True
+        except OSError as e:
+            entry["error"] = os.strerror(e.errno) if e.errno else str(e)
+        return entry
+
+    def _read_state(self, tid):
+        policy = os.sched_getscheduler(tid) & ~SCHED_RESET_ON_FORK
+        return {
+            "policy_id": policy,
+            "policy": POLICY_NAMES.get(policy, str(policy)),
+            "rtprio": os.sched_getparam(tid).sched_priority,
+            "nice": os.getpriority(os.PRIO_PROCESS, tid),
+            "ioprio": self._get_ioprio(tid)
+        }
+
+    def _apply(self, tid, policy, rtprio, nice, ioprio):
+        if isinstance(policy, str):
+            policy = {name: value for value, name in POLICY_NAMES.items()}[policy]
+        # On Linux these calls act on the single thread `tid`, not the whole process.
+        current = os.sched_getscheduler(tid) & ~SCHED_RESET_ON_FORK
+        if current != policy or os.sched_getparam(tid).sched_priority != rtprio:
+            os.sched_setscheduler(tid, policy, os.sched_param(rtprio))
+        os.setpriority(os.PRIO_PROCESS, tid, nice)
+        if ioprio is not None:
+            self._set_ioprio(tid, ioprio)
+
+
+
+    def _get_ioprio(self, tid):
+        if self._ioprio is None:
+            return None
+        value = self._libc.syscall(self._ioprio[1], IOPRIO_WHO_PROCESS, tid)
+        return value if value >= 0 else None
+
+    def _set_ioprio(self, tid, ioprio):
+        if self._ioprio is None:
+            return
+        if self._libc.syscall(self._ioprio[0], IOPRIO_WHO_PROCESS, tid, ioprio) < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def _print_result(self, result):
+        for entry in result["threads"]:
+            label = f"{entry['comm']}[{entry['pid']}] {entry['thread']} (TID {entry['tid']})"
+            if entry["error"]:
+                print(f"[!] {label}: {entry['error']}")
+            elif entry["changed"]:
+                before, after = entry["before"], entry["after"]
+                print(f"[✓] {label}: {before['policy']}/{before['rtprio']} nice {before['nice']} → "
+                      f"{after['policy']}/{after['rtprio']} nice {after['nice']}")
+
+        print(f"[*] Threads boosted: {result['changed']}, already optimized: {result['skipped']}, "
+              f"failed: {result['failed']}")
+
+
+
+    rt_limits = (
+        "# AirTIGHT Real-Time Audio Limits\n"
+        "@audio   -   rtprio   95\n"
+        "@audio   -   memlock  unlimited\n"
+        "@audio   -   nice    -15\n"
+    )
+
+    def plan(self, txn):
+        """Stages the PAM limits file and the live thread boost (journaled for revert)."""
+        print("[*] Checking PAM real-time limits...")
 
-  
+        if self._limits_already_set(self.rt_limits):
+            print("[✓] RT limits already configured.")
+        else:
+            txn.write_file(self.limits_path, self.rt_limits)
 
-    def _manual_boost(self, pid):
-        subprocess.run(["renice", "-n", "-12", "-p", pid], stderr=subprocess.DEVNULL)
-        subprocess.run(["ionice", "-c", "2", "-n", "0", "-p", pid], stderr=subprocess.DEVNULL)
-        print(f"[✓] PID {pid} boosted via renice/ionice")
+        def boost():
+            result = self.boost_audio_priority()
+            return result if result["changed"] else None
 
-  
+        txn.call(boost, kind="sched")
+        return True
 
     def apply_rt_limits(self):
         print("[*] Checking PAM real-time limits...")
 
-        config = (
-            "# AirTIGHT Real-Time Audio Limits\n"
-            "@audio   -   rtprio   95\n"
-            "@audio   -   memlock  unlimited\n"
-            "@audio   -   nice    -15\n"
-        )
-
-        if self._limits_already_set(config):
+        if self._limits_already_set(self.rt_limits):
             print("[✓] RT limits already configured.")
-            return
+            return False
 
-        try:
-            with open(self.limits_path, "w") as f:
-                f.write(config)
+        txn = Transaction()
+        txn.write_file(self.limits_path, self.rt_limits)
+        if txn.apply():
             print("[✓] RT limits written. Re-login required.")
-        except Exception as e:
-            print(f"[!] Failed to write limits: {e}")
+            return True
+        return False
 
-   
 
-    def _get_pids(self, name):
-        try:
-            return subprocess.check_output(["pgrep", name], text=True).split()
-        except subprocess.CalledProcessError:
-            return []
-
-    def _already_boosted(self, pid):
-        """Checks if process already has high priority."""
-        try:
-            output = subprocess.check_output(["ps", "-o", "ni=", "-p", pid], text=True)
-            nice_value = int(output.strip())
-            return nice_value <= -10
-        except Exception:
-            return False
 
     def _limits_already_set(self, new_config):
         if not os.path.exists(self.limits_path):
@@ -93,3 +239,6 @@ class SchedulerOptimizer:
             existing = f.read()
 
         return new_config.strip() in existing.strip()
+
+
+Transaction.REVERTERS["sched"] = lambda result: SchedulerOptimizer().restore(result)
@@ -0,0 +1,315 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from src.procfs import read_text
+from src.state import journal_path, load_json, save_json
+
+
+SERVICE_COMMANDS = {
+    "systemd": ["systemctl", "restart"],
+    "openrc": ["rc-service", None, "restart"],
+    "runit": ["sv", "restart"]
+}
+
+MAX_JOURNAL = 20
+
+
+def restart_service(init, name):
+    """Restarts a service through the detected init system; returns False if that is not possible."""
+    template = SERVICE_COMMANDS.get(init)
+    if not template or not shutil.which(template[0]):
+        return False
+    cmd = [name if part is None else part for part in template]
+    if None not in template:
+        cmd.append(name)
+    subprocess.run(cmd, stderr=subprocess.DEVNULL)
+    return True
+
+
+def module_loaded(name):
+    """True for a loaded, unloadable module (built-ins have no initstate file)."""
+    return os.path.exists(f"/sys/module/{name.replace('-', '_')}/initstate")
+
+
+def reload_module(name):
+    if not module_loaded(name):
+        print(f"[!] Module {name} not loaded. Reboot may be required.")
+        return False
+    print(f"[*] Reloading {name} (network may flicker)...")
+    subprocess.run(["modprobe", "-r", name], stderr=subprocess.DEVNULL)
+    subprocess.run(["modprobe", name], stderr=subprocess.DEVNULL)
+    return True
+
+
+def write_atomic(path, content, mode=0o644):
+    """Replaces `path` in one rename so a crash never leaves a half-written config behind."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".airtight-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def write_param(path, value):
+    """Writes a live sysfs/module parameter and reads it back.
+
+    Returns (confirmed, previous); (None, None) if the parameter does not exist
+    here (module not loaded, no such device, or not writable at runtime).
+    """
+    previous = read_text(path, None)
+    if previous is None:
+        return None, None
+    if previous == value:
+        return True, previous
+    try:
+        with open(path, "w") as f:
+            f.write(value)
+    except OSError:
+        return False, previous
+    return read_text(path) == value, previous
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class Transaction:
+    """Collects the changes of several fixers and applies them as one unit.
+
+    Fixers stage file writes, live sysfs parameters, module reloads, service
+    restarts and live steps through plan(txn). apply() writes only files whose
+    content changes, reloads each kernel module and restarts each service at
+    most once, and records a journal entry so revert() (or
+    Transaction.revert_last()) undoes the whole run in one step.
+
+    A module reload is skipped when every live change tagged with that module
+    was confirmed, since the running driver already uses the new values,
+    unless part of the module's new config has no live counterpart.
+    """
+
+    # kind -> callable(data) that undoes a journaled live step.
+    REVERTERS = {}
+
+    def __init__(self, profile=None):
+        self.profile = profile or {}
+        self.init = self.profile.get("init_system", "systemd").lower()
+        self.files = {}
+        self.modules = []
+        self.services = {}
+        self.params = []
+        self.steps = []
+        self.reload_only = set()
+        self.entry = None
+        self.reboot_required = False
+
+    # -- staging -------------------------------------------------------
+
+    def write_file(self, path, content):
+        self.files[path] = content
+
+    def reload_module(self, name):
+        if name not in self.modules:
+            self.modules.append(name)
+
+    def require_reload(self, name):
+        """Marks part of the change to module `name` as having no live counterpart; its reload is never skipped."""
+        self.reload_only.add(name)
+
+    def restart_service(self, name, after=None):
+        """Stages a restart; with `after`, only if that module really gets reloaded."""
+        if name in self.services and self.services[name] != after:
+            after = None  # needed by two independent changes: restart unconditionally
+        self.services[name] = after
+
+    def set_param(self, path, value, module=None):
+        """Stages a live write to a sysfs or /sys/module parameter, verified by reading it back."""
+        self.params.append((path, str(value), module))
+
+    def call(self, fn, kind=None, module=None):
+        """Runs `fn` during apply(); if `kind` is set, its return value is journaled for revert.
+
+        With `module` set, a truthy result counts as that module's change being live.
+        `fn` returns True when the change was already in place: live, but nothing
+        to journal or undo.
+        """
+        self.steps.append((kind, fn, module))
+
+    # -- inspection ----------------------------------------------------
+
+    def pending_files(self):
+        """Returns {path: (current, new)} for staged files whose content would change."""
+        pending = {}
+        for path, content in self.files.items():
+            current = _read(path)
+            if current != content:
+                pending[path] = (current, content)
+        return pending
+
+    def diff(self):
+        import difflib  # only the interactive preview needs it; keeps `airtight status` fast
+
+        lines = []
+        for path, (current, new) in self.pending_files().items():
+            lines.extend(difflib.unified_diff(
+                (current or "").splitlines(keepends=True),
+                new.splitlines(keepends=True),
+                fromfile=path if current is not None else "/dev/null",
+                tofile=path
+            ))
+        for path, value, _ in self.params:
+            current = read_text(path, None)
+            if current is not None and current != value:
+                lines.append(f"set {path}: {current} -> {value}\n")
+        for name in self.modules:
+            live = name not in self.reload_only and (any(module == name for _, _, module in self.params)
+                                                     or any(m == name for _, _, m in self.steps))
+            lines.append(f"reload module: {name}{' (skipped if applied live)' if live else ''}\n")
+        for name in self.services:
+            lines.append(f"restart service: {name}\n")
+        return "".join(lines)
+
+    # -- execution -----------------------------------------------------
+
+    def apply(self):
+        """Applies all staged changes; returns True if anything on the system changed."""
+        entry = {"id": os.urandom(8).hex(), "time": int(time.time()), "init": self.init, "files": [],
+                 "params": [], "modules": [], "services": [], "steps": []}
+        pending = self.pending_files()
+        live, failed = set(), set(self.reload_only)
+
+        try:
+            for path, (current, new) in pending.items():
+                write_atomic(path, new)
+                entry["files"].append({"path": path, "original": current})
+                print(f"[✓] Wrote {path}")
+
+            for path, value, module in self.params:
+                confirmed, previous = write_param(path, value)
+                if confirmed is None:
+                    continue
+                if previous != value:
+                    entry["params"].append({"path": path, "original": previous})
+                if confirmed:
+                    live.add(module)
+                    print(f"[✓] {path} = {value} (live)")
+                else:
+                    failed.add(module)
+                    self.reboot_required = True
+                    print(f"[!] {path} did not accept {value}; takes effect after reboot.")
+
+            for kind, fn, module in self.steps:
+                data = fn()
+                if kind is not None and data and data is not True:
+                    entry["steps"].append({"kind": kind, "data": data})
+                if module is not None:
+                    (live if data else failed).add(module)
+        except Exception as e:
+            print(f"[!] Transaction failed ({e}); rolling back.")
+            self._undo(entry)
+            return False
+
+        # Module reloads and restarts only matter if a config they read actually changed.
+        if entry["files"]:
+            for name in self.modules:
+                if name in live and name not in failed:
+                    print(f"[✓] {name} already running with the new settings; reload skipped.")
+                    continue
+                if reload_module(name):
+                    entry["modules"].append(name)
+                else:
+                    self.reboot_required = True
+            for name, after in self.services.items():
+                if after is not None and after not in entry["modules"]:
+                    continue
+                if restart_service(self.init, name):
+                    entry["services"].append(name)
+                    print(f"[✓] {name} service restarted.")
+
+        if not entry["files"] and not entry["params"] and not entry["steps"]:
+            return False
+
+        self.entry = entry
+        journal = load_json(journal_path(), {"transactions": []})
+        journal["transactions"] = (journal["transactions"] + [entry])[-MAX_JOURNAL:]
+        save_json(journal_path(), journal)
+        return True
+
+    def revert(self):
+        """Undoes this transaction and drops it from the journal."""
+        if self.entry is None:
+            return
+        journal = load_json(journal_path(), {"transactions": []})
+        # By id: the journaled copy has been through JSON (tuples come back as lists).
+        journal["transactions"] = [t for t in journal["transactions"] if t.get("id") != self.entry["id"]]
+        save_json(journal_path(), journal)
+        self._undo(self.entry)
+        self.entry = None
+
+    @classmethod
+    def revert_last(cls):
+        """Undoes the most recent journaled transaction; returns False if there is none.
+
+        Returns None, keeping the entry, if a step's kind has no registered
+        reverter (its fixer module was not imported), rather than dropping a
+        change that would not be undone.
+        """
+        journal = load_json(journal_path(), {"transactions": []})
+        if not journal["transactions"]:
+            return False
+        missing = sorted({step["kind"] for step in journal["transactions"][-1]["steps"]} - set(cls.REVERTERS))
+        if missing:
+            print(f"[!] No undo registered for {', '.join(missing)}; the journal entry is kept.")
+            return None
+        entry = journal["transactions"].pop()
+        save_json(journal_path(), journal)
+        cls._undo(entry)
+        return True
+
+    @classmethod
+    def _undo(cls, entry):
+        for step in reversed(entry["steps"]):
+            reverter = cls.REVERTERS.get(step["kind"])
+            if reverter is not None:
+                reverter(step["data"])
+
+        for item in reversed(entry.get("params", [])):
+            try:
+                with open(item["path"], "w") as f:
+                    f.write(item["original"])
+                print(f"[✓] Restored {item['path']} = {item['original']}")
+            except OSError as e:
+                print(f"[!] Could not restore {item['path']}: {e}")
+
+        for item in reversed(entry["files"]):
+            path, original = item["path"], item["original"]
+            try:
+                if original is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    print(f"[✓] Removed {path}")
+                else:
+                    write_atomic(path, original)
+                    print(f"[✓] Restored {path}")
+            except OSError as e:
+                print(f"[!] Could not restore {path}: {e}")
+
+        for name in entry["modules"]:
+            reload_module(name)
+        for name in entry["services"]:
+            restart_service(entry.get("init", "systemd"), name)
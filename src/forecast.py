@@ -0,0 +1,200 @@
+import math
+import os
+import time
+from collections import deque
+
+from src.overhead import meter
+from src.quantum import forced_quantum, set_quantum
+from src.state import load_json, save_json, state_dir
+
+
+FEATURES = ("bias", "core_busy", "core_irq", "busy_ratio", "busy_trend", "wifi", "quantum")
+
+
+def forecast_path():
+    return os.path.join(state_dir(), "forecast.json")
+
+
+def features(sample, baseline):
+    """Scaled model inputs of one monitor sample; `baseline` is the EWMA of the node busy ratio."""
+    busy_ratio, quantum = 0.0, 0
+    for node in sample.get("nodes", {}).values():
+        if node.busy_ratio > busy_ratio:
+            busy_ratio, quantum = node.busy_ratio, node.quantum
+    return [
+        1.0,
+        (sample.get("audio_core_busy") or 0.0) / 100.0,
+        (sample.get("audio_core_irq") or 0.0) / 100.0,
+        busy_ratio,
+        busy_ratio - baseline,
+        math.log1p(sample.get("wifi_pps") or 0.0) / 10.0,
+        # Smaller quanta leave less slack per cycle; 64 frames maps to 1.0.
+        64.0 / quantum if quantum else 0.0
+    ]
+
+
+class XrunModel:
+    """Online logistic regression: P(xrun within the horizon | features).
+
+    Plain-Python SGD over seven features costs a few microseconds per update,
+    less than the NumPy call overhead on vectors this short. Positives are
+    weighted by the running negative/positive ratio (capped at MAX_WEIGHT)
+    because xruns are rare, and a small L2 term keeps weights bounded.
+    """
+
+    MAX_WEIGHT = 50.0
+
+    def __init__(self, weights=None, rate=0.05, l2=1e-4):
+        self.weights = list(weights) if weights else [0.0] * len(FEATURES)
+        self.rate = rate
+        self.l2 = l2
+        self.positives = 0
+        self.negatives = 0
+
+    def predict(self, x):
+        z = sum(w * v for w, v in zip(self.weights, x))
+        if z < -30:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def update(self, x, label):
+        if label:
+            self.positives += 1
+            weight = min(self.MAX_WEIGHT, (self.negatives + 1) / (self.positives + 1))
+        else:
+            self.negatives += 1
+            weight = 1.0
+        error = (1.0 if label else 0.0) - self.predict(x)
+        step = self.rate * weight * error
+        decay = 1.0 - self.rate * self.l2
+        self.weights = [w * decay + step * v for w, v in zip(self.weights, x)]
+
+    def to_dict(self):
+        return {"features": list(FEATURES), "weights": self.weights,
+                "positives": self.positives, "negatives": self.negatives}
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls()
+        if data and data.get("features") == list(FEATURES):
+            model.weights = list(data["weights"])
+            model.positives = data.get("positives", 0)
+            model.negatives = data.get("negatives", 0)
+        return model
+
+
+class XrunForecaster:
+    """Forecasts xrun bursts and raises the quantum ahead of them.
+
+    Registered as a sampler listener. Each sample is scored, then kept until
+    `horizon` seconds have passed; it is then trained on whether xruns came
+    in that time, so a prediction is scored against what actually followed.
+    The risk is added to the sample as xrun_risk and, while the quantum is
+    raised, forecast_quantum.
+
+    Once the model has seen MIN_SAMPLES samples and MIN_POSITIVES xrun
+    labels, a risk at RAISE_RISK forces clock.force-quantum to twice the
+    busiest node's quantum (up to MAX_QUANTUM). The previous forced value is
+    restored after the risk stays below LOWER_RISK for `hold` seconds.
+    """
+
+    RAISE_RISK = 0.6
+    LOWER_RISK = 0.3
+    MAX_QUANTUM = 1024
+    MIN_SAMPLES = 300
+    MIN_POSITIVES = 5
+    ALPHA = 0.2  # EWMA weight of the busy-ratio baseline
+    SAVE_INTERVAL = 600.0
+
+    def __init__(self, horizon=5.0, hold=30.0, act=True, log=print):
+        self.horizon = horizon
+        self.hold = hold
+        self.act = act
+        self.log = log
+        self.model = XrunModel.from_dict(load_json(forecast_path(), None))
+        self.pending = deque()
+        self.baseline = 0.0
+        self.risk = 0.0
+        self.raised = None
+        self.restore = 0
+        self.calm_since = None
+        self.suspended = False
+        self._saved = time.monotonic()
+
+    @property
+    def trained(self):
+        return (self.model.positives + self.model.negatives >= self.MIN_SAMPLES
+                and self.model.positives >= self.MIN_POSITIVES)
+
+    def observe(self, sample):
+        started = time.perf_counter_ns()
+        now = sample.get("mono", sample.get("time", time.monotonic()))
+        xruns = sample.get("new_xruns", 0)
+
+        # Label every sample still inside its horizon; train on those that left it.
+        if xruns:
+            for entry in self.pending:
+                entry[1] = True
+        while self.pending and now - self.pending[0][2] >= self.horizon:
+            x, label, _ = self.pending.popleft()
+            self.model.update(x, label)
+
+        x = features(sample, self.baseline)
+        self.baseline += self.ALPHA * (x[3] - self.baseline)
+        self.risk = self.model.predict(x)
+        self.pending.append([x, False, now])
+        meter.add("forecast", started)
+
+        sample["xrun_risk"] = round(self.risk, 3)
+        if self.act and not self.suspended:
+            self._actuate(sample, now)
+        sample["forecast_quantum"] = self.raised or 0
+
+        if time.monotonic() - self._saved >= self.SAVE_INTERVAL:
+            self.save()
+
+    def _actuate(self, sample, now):
+        if self.raised is None:
+            if self.trained and self.risk >= self.RAISE_RISK:
+                busiest = max(sample.get("nodes", {}).values(), key=lambda n: n.busy_ratio, default=None)
+                if busiest is None or not busiest.quantum or busiest.quantum >= self.MAX_QUANTUM:
+                    return
+                self.restore = forced_quantum()
+                self.raised = min(self.MAX_QUANTUM, busiest.quantum * 2)
+                self.calm_since = None
+                set_quantum(self.raised)
+                self.log(f"[⚡] Xrun risk {self.risk:.2f}: quantum raised {busiest.quantum} → {self.raised} ahead of it.")
+            return
+
+        if self.risk >= self.LOWER_RISK or sample.get("new_xruns"):
+            self.calm_since = None
+        elif self.calm_since is None:
+            self.calm_since = now
+        elif now - self.calm_since >= self.hold:
+            self.lower()
+
+    def lower(self):
+        """Gives the quantum back (the forced value from before the raise, usually PipeWire's own)."""
+        if self.raised is None:
+            return
+        set_quantum(self.restore)
+        self.log(f"[*] Xrun risk {self.risk:.2f}: quantum {self.raised} released"
+                 + (f" back to {self.restore}." if self.restore else "."))
+        self.raised = None
+        self.calm_since = None
+
+    def suspend(self):
+        """Stops acting (and releases a raised quantum); the model keeps learning."""
+        self.suspended = True
+        self.lower()
+
+    def resume(self):
+        self.suspended = False
+
+    def save(self):
+        self._saved = time.monotonic()
+        save_json(forecast_path(), self.model.to_dict())
+
+    def close(self):
+        self.lower()
+        self.save()
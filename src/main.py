@@ -1,106 +1,418 @@
+import math
 import os
 import sys
 import time
-import subprocess
 
-from src.profiler import Profiler
-from src.monitor import PerformanceMonitor
-from src.decision_engine import DecisionEngine
-from src.fixers.bluetooth_fix import BluetoothFixer
-from src.fixers.audio_fix import AudioFixer
-from src.fixers.scheduler import SchedulerOptimizer
+# Subcommands import what they need when they run, so `airtight status` stays fast.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Subcommands whose arguments are parsed by the module they hand over to.
+PASSTHROUGH = ("monitor", "bench")
+
+# Pre-subcommand flags, still accepted so existing service units keep working.
+LEGACY_FLAGS = {"--daemon": "daemon", "--revert": "revert", "--replay": "replay"}
 
 
 class AirTIGHT:
+    HEALTH_CHECK_SECONDS = 5
+
     def __init__(self):
+        from src.profiler import Profiler
         self.profiler = Profiler()
-        self.monitor = PerformanceMonitor()
+        self.monitor = None
         self.profile = None
 
+    def close(self):
+        if self.monitor is not None:
+            self.monitor.close()
+            self.monitor = None
+
     def banner(self):
-        os.system('clear' if os.name == 'posix' else 'cls')
+        if sys.stdout.isatty():
+            os.system('clear' if os.name == 'posix' else 'cls')
         print("═" * 60)
         print("   AirTIGHT: UNIVERSAL LINUX AUDIO OPTIMIZER   ".center(60))
         print("   Mode: INTERACTIVE ANALYSIS   ".center(60))
         print("═" * 60)
 
+    def audit(self, refresh=False):
+        self.profile = self.profiler.run_audit(refresh=refresh)
+        self.profiler.print_report()
+
+    def run(self, assume_yes=False, measure_latency=False):
+        from src.decision_engine import DecisionEngine
+        from src.monitor import PerformanceMonitor
+        from src.sampler import Sampler
+        from src.telemetry import TelemetryRing
 
-    def run(self):
         self.banner()
 
         print("[*] Phase 1: System Audit...")
-        self.profile = self.profiler.run_audit()
-        self.profiler.print_report()
+        self.audit()
 
-        print("\n[*] Phase 2: Live Health Check (5 seconds)...")
+        engine = DecisionEngine(self.profile)
+        # Long enough for every rule's hold (and probe warm-up) to elapse; the first sample starts the hold.
+        seconds = max(self.HEALTH_CHECK_SECONDS, math.ceil(engine.settle_time()) + 1)
+        print(f"\n[*] Phase 2: Live Health Check ({seconds} seconds)...")
         print(f"{'TIME':<12} | {'CPU %':<10} | {'XRUNS':<8} | STATUS")
         print("─" * 60)
 
-        captured_stats = []
-        for _ in range(5):
-            stats = self.monitor.get_stats()
-            captured_stats.append(stats)
-            alert = "⚠️ XRUN" if stats["new_xruns"] > 0 else "✓"
-            print(f"{stats['timestamp']:<12} | {stats['cpu']:<10}% | {stats['new_xruns']:<8} | {alert}")
-            time.sleep(1)
-
-        total_xruns = sum(s["new_xruns"] for s in captured_stats)
-        peak_cpu = max(s["cpu"] for s in captured_stats)
-        status = "high_cpu" if peak_cpu > 80 else "stable"
-
-        engine = DecisionEngine(self.profile, {
-            "new_xruns": total_xruns,
-            "cpu": peak_cpu,
-            "status": status
-        })
+        self.monitor = PerformanceMonitor()
+        telemetry = TelemetryRing()
+        sampler = Sampler(self.monitor, rate_hz=1.0)
+        sampler.add_listener(telemetry.append)
+        sampler.add_listener(engine.observe)
+        try:
+            for stats in sampler.samples(seconds):
+                alert = "⚠️ XRUN" if stats["new_xruns"] > 0 else "✓"
+                print(f"{stats['timestamp']:<12} | {stats['cpu']:<10}% | {stats['new_xruns']:<8} | {alert}")
+        finally:
+            sampler.stop()
 
         plan = engine.analyze()
         print(engine.get_recommendations())
 
         if plan:
-            confirm = input("\n[?] Apply recommended optimizations? (y/n): ")
-            if confirm.lower() == 'y':
-                self.execute_optimizations(plan)
+            if assume_yes or input("\n[?] Apply recommended optimizations? (y/n): ").lower() == 'y':
+                self.execute_optimizations(plan, measure_latency)
             else:
                 print("[*] No changes applied.")
         else:
             print("\n[✓] No optimizations required. System is AirTIGHT.")
 
 
-    def execute_optimizations(self, plan):
-        
+    def execute_optimizations(self, plan, measure_latency=False):
+        from src.actions import plan_action
+        from src.fixers.transaction import Transaction
+
         if os.geteuid() != 0:
             print("\n[!] Root privileges required for system/kernel tweaks.")
             print("[*] Re-running with sudo...")
-            os.execvp("sudo", ["sudo", sys.executable] + sys.argv)
+            self.close()
+            # The user already confirmed; run the same check and apply it as root.
+            os.chdir(PROJECT_ROOT)
+            os.execvp("sudo", ["sudo", sys.executable, "-m", "src.main", "fix", "--yes"]
+                      + (["--latency"] if measure_latency else []))
 
+        latency = before = None
+        if measure_latency:
+            from src.probes.latency import LatencyProbe
+            latency = LatencyProbe()
+            print("\n[*] Measuring round-trip latency before the changes...")
+            before = latency.measure()
+            if before is None:
+                print("[!] Latency could not be measured (needs pactl, pw-loopback, pw-play, pw-record).")
+
+        # One transaction for the whole plan: each module reloads and each service restarts once.
+        txn = Transaction(self.profile)
         for action in plan:
-            print(f"\n[⚡] Executing: {action.replace('_', ' ')}...")
+            print(f"\n[⚡] Planning: {action.replace('_', ' ')}...")
+            plan_action(action, txn, self.profile)
 
-            if action == "APPLY_RT_SCHEDULER_BOOST":
-                sched = SchedulerOptimizer()
-                sched.apply_rt_limits()
-                sched.boost_audio_priority()
+        diff = txn.diff()
+        if diff:
+            print("\n[*] Pending changes:")
+            print(diff.rstrip())
 
-            elif action == "APPLY_BLUETOOTH_COEX_FIX":
-                bt = BluetoothFixer(self.profile)
-                bt.apply_coex_fix()
-                bt.restart_bluetooth()
+        print("\n[⚡] Applying...")
+        if txn.apply():
+            print("[*] Undo everything from this run with: airtight revert")
+        else:
+            print("[✓] Nothing needed changing.")
 
-            elif action == "DISABLE_AUDIO_POWER_SAVE":
-                audio = AudioFixer()
-                audio.apply_all()
+        if before is not None:
+            after = latency.measure()
+            if after is not None:
+                print(f"[*] Round-trip latency: {before['latency_ms']:.2f} → {after['latency_ms']:.2f} ms "
+                      f"(jitter {before['latency_jitter_ms']:.2f} → {after['latency_jitter_ms']:.2f} ms)")
 
         print("\n" + "═" * 60)
         print("   OPTIMIZATION COMPLETE   ".center(60))
-        print("   Reboot recommended for kernel-level changes   ".center(60))
+        if txn.reboot_required:
+            print("   Reboot recommended for kernel-level changes   ".center(60))
+        else:
+            print("   All changes are active now   ".center(60))
         print("═" * 60)
 
+    def run_daemon(self, window, verify_window, metrics=None, measure_latency=False, forecast=False):
+        from src.daemon import AirTIGHTDaemon
+        from src.monitor import PerformanceMonitor
+        from src.recorder import TelemetryLog
 
+        self.profile = self.profiler.run_audit()
+        self.monitor = PerformanceMonitor()
+        exporter = None
+        if metrics:
+            from src.exporter import MetricsExporter
+            exporter = MetricsExporter(metrics).start()
+            print(f"[*] Metrics at {exporter.describe()}", flush=True)
+        latency = None
+        if measure_latency:
+            from src.probes.latency import LatencyProbe
+            latency = LatencyProbe() if LatencyProbe.available() else None
+            if latency is None:
+                print("[!] Latency probe needs pactl, pw-loopback, pw-play and pw-record; not measuring.", flush=True)
+        try:
+            AirTIGHTDaemon(self.profile, self.monitor, window=window, verify_window=verify_window,
+                           exporter=exporter, recorder=TelemetryLog(), latency=latency,
+                           forecast=forecast).run()
+        finally:
+            if exporter is not None:
+                exporter.stop()
 
-if __name__ == "__main__":
+
+def revert():
+    # Importing the actions imports every fixer, and with them their Transaction.REVERTERS.
+    import src.actions
+    from src.fixers.transaction import Transaction
+
+    reverted = Transaction.revert_last()
+    if reverted:
+        print("[✓] Last optimization run reverted.")
+    elif reverted is False:
+        print("[*] Nothing to revert.")
+    else:
+        sys.exit(1)
+
+
+def run_replay(paths, rules_file=None, hours=None):
+    """Runs recorded telemetry through the DecisionEngine offline (optionally with other rules)."""
+    import runpy
+    from src.profiler import Profiler
+    from src.recorder import log_files, print_replay, replay
+
+    paths = paths or log_files()
+    if not paths:
+        print("[!] No telemetry logs found. Record with 'airtight daemon' or 'airtight monitor --record'.")
+        return
+
+    rules = runpy.run_path(rules_file)["RULES"] if rules_file else None
+    since = time.time() - hours * 3600 if hours else None
+    profile = Profiler().run_audit()
+    print_replay(replay(paths, profile, rules=rules, since=since))
+
+
+def _newest(paths):
+    """The most recently modified of `paths` that exists, or None."""
+    found = []
+    for path in set(paths):
+        try:
+            found.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    return max(found)[1] if found else None
+
+
+def collect_status():
+    """Reads /proc and AirTIGHT's own state files only: no audit, no child processes."""
+    from src.procfs import find_processes, memory_percent, read_text
+    from src.recorder import last_sample, log_files
+    from src.state import SYSTEM_CACHE_DIR, SYSTEM_STATE_DIR, cache_dir, journal_path, load_json
+
+    processes = find_processes(("pipewire", "pulseaudio", "wireplumber"))
+    names = set(processes.values())
+    if "pipewire" in names:
+        server = "PipeWire"
+    elif "pulseaudio" in names:
+        server = "PulseAudio"
+    else:
+        server = None
+
+    status = {
+        "audio_server": server,
+        "session_manager": "wireplumber" in names,
+        "load": [float(v) for v in read_text("/proc/loadavg", "0 0 0").split()[:3]],
+        "ram": memory_percent(),
+        "profile": None,
+        "journal": None,
+        "telemetry": None
+    }
+
+    # Fixes and the daemon run as root, so a user's status also looks at root's state.
+    profile_path = _newest([os.path.join(cache_dir(), "profile.json"),
+                            os.path.join(SYSTEM_CACHE_DIR, "profile.json")])
+    profile = load_json(profile_path) if profile_path else None
+    if profile:
+        status["profile"] = {
+            "vendor": profile.get("vendor_name"),
+            "chip": profile.get("chip_id"),
+            "audited": int(os.path.getmtime(profile_path)),
+            "this_boot": profile.get("boot_id") == read_text("/proc/sys/kernel/random/boot_id")
+        }
+
+    journal = _newest([journal_path(), os.path.join(SYSTEM_STATE_DIR, "journal.json")])
+    runs = load_json(journal, {"transactions": []})["transactions"] if journal else []
+    if runs:
+        last = runs[-1]
+        status["journal"] = {
+            "runs": len(runs),
+            "last": last["time"],
+            "files": len(last["files"]),
+            "params": len(last.get("params", [])),
+            "steps": len(last["steps"])
+        }
+
+    latest = _newest(log_files()[-1:] + log_files(os.path.join(SYSTEM_STATE_DIR, "telemetry"))[-1:])
+    tail = last_sample(latest) if latest else None
+    if tail:
+        t, values = tail
+        status["telemetry"] = {"age": round(time.time() - t, 1), "sample": values}
+    return status
+
+
+def print_status(status):
+    fmt = "%Y-%m-%d %H:%M"
+    server = status["audio_server"]
+    if server:
+        session = ", WirePlumber running" if status["session_manager"] else ""
+        print(f"[✓] Audio server: {server}{session}")
+    else:
+        print("[!] Audio server: none running")
+
+    load = " ".join(f"{v:.2f}" for v in status["load"])
+    print(f"[*] System:       load {load}, RAM {status['ram']}%")
+
+    profile = status["profile"]
+    if profile:
+        note = "" if profile["this_boot"] else ", previous boot"
+        print(f"[*] Hardware:     {profile['vendor']} {profile['chip']} "
+              f"(audited {time.strftime(fmt, time.localtime(profile['audited']))}{note})")
+    else:
+        print("[*] Hardware:     not audited yet (run: airtight audit)")
+
+    journal = status["journal"]
+    if journal:
+        print(f"[*] Changes:      {journal['runs']} run(s), last {time.strftime(fmt, time.localtime(journal['last']))} "
+              f"({journal['files']} files, {journal['params']} live params, {journal['steps']} steps); "
+              f"undo with: airtight revert")
+    else:
+        print("[*] Changes:      none applied")
+
+    telemetry = status["telemetry"]
+    if telemetry:
+        sample = telemetry["sample"]
+        line = (f"last sample {telemetry['age']:.0f}s ago, CPU {sample.get('cpu', 0):.0f}%, "
+                f"audio core {sample.get('audio_core_busy', 0):.0f}%, {sample.get('new_xruns', 0):.0f} xruns")
+        if sample.get("latency_ms"):
+            line += f", round trip {sample['latency_ms']:.2f} ms"
+        print(f"[*] Telemetry:    {line}")
+    else:
+        print("[*] Telemetry:    nothing recorded")
+
+
+def status(as_json=False):
+    """Exit status 0 while an audio server is running, 1 otherwise."""
+    result = collect_status()
+    if as_json:
+        import json
+        print(json.dumps(result, indent=2))
+    else:
+        print_status(result)
+    return 0 if result["audio_server"] else 1
+
+
+def _require_root(what):
+    if os.geteuid() != 0:
+        print(f"[!] {what} requires root.")
+        sys.exit(1)
+
+
+def _handle_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="airtight", description="AirTIGHT: Universal Linux Audio Optimizer")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    audit = commands.add_parser("audit", help="detect hardware, audio stack and missing tools")
+    audit.add_argument("--refresh", action="store_true", help="ignore the cached profile")
+
+    commands.add_parser("monitor", add_help=False, help="live performance tracker (see: airtight monitor -h)")
+
+    fix = commands.add_parser("fix", help="audit, short health check, then apply the recommended fixes (default)")
+    fix.add_argument("-y", "--yes", action="store_true", help="apply without asking")
+    fix.add_argument("--latency", action="store_true", help="measure round-trip latency before and after")
+
+    commands.add_parser("bench", add_help=False, help="audio-stability benchmark (see: airtight bench -h)")
+
+    state = commands.add_parser("status", help="quick summary from /proc and saved state (for scripts)")
+    state.add_argument("--json", action="store_true", help="machine-readable output")
+
+    commands.add_parser("revert", help="undo the most recent optimization run in one step")
+
+    daemon = commands.add_parser("daemon", help="run unattended: monitor, apply fixes, verify and roll back")
+    daemon.add_argument("--window", type=int, default=60, help="observation window in seconds")
+    daemon.add_argument("--verify", type=int, default=120,
+                        help="verification window after each fix, in seconds")
+    daemon.add_argument("--metrics", metavar="ADDR",
+                        help="serve OpenMetrics on host:port or unix:/path (e.g. 127.0.0.1:9477)")
+    daemon.add_argument("--latency", action="store_true",
+                        help="measure round-trip latency before and after every fix")
+    daemon.add_argument("--forecast", action="store_true",
+                        help="predict xrun bursts and raise the quantum ahead of them")
+
+    replay = commands.add_parser("replay", help="feed recorded telemetry through the decision engine")
+    replay.add_argument("logs", nargs="*", metavar="LOG", help="log files (default: all)")
+    replay.add_argument("--rules", metavar="FILE",
+                        help="Python file defining RULES to evaluate instead of the defaults")
+    replay.add_argument("--hours", type=float, help="only the last N hours")
+    return parser
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Scripts poll `status`; answer it without building the argument parser.
+    if argv[:1] == ["status"] and set(argv[1:]) <= {"--json"}:
+        return status("--json" in argv)
+
+    for i, arg in enumerate(argv):
+        if arg in LEGACY_FLAGS:
+            argv = [LEGACY_FLAGS[arg]] + argv[:i] + argv[i + 1:]
+            break
+
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    command = args.command or "fix"
+    if extra and command not in PASSTHROUGH:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    if command == "status":
+        return status(args.json)
+    if command == "monitor":
+        from src.monitor import main as monitor_main
+        return monitor_main(extra, prog="airtight monitor")
+    if command == "bench":
+        from stress_tests.bench import main as bench_main
+        return bench_main(extra, prog="airtight bench")
+    if command == "replay":
+        return run_replay(args.logs, args.rules, args.hours)
+    if command == "revert":
+        _require_root("Reverting system/kernel tweaks")
+        return revert()
+    if command == "daemon":
+        # It applies system/kernel tweaks unattended.
+        _require_root("Daemon mode")
+
+    import signal
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    app = AirTIGHT()
     try:
-        app = AirTIGHT()
-        app.run()
+        if command == "audit":
+            app.audit(refresh=args.refresh)
+        elif command == "daemon":
+            app.run_daemon(args.window, args.verify, args.metrics, args.latency, args.forecast)
+        else:
+            app.run(assume_yes=getattr(args, "yes", False), measure_latency=getattr(args, "latency", False))
     except KeyboardInterrupt:
         print("\n\n[*] AirTIGHT: Session Terminated.")
+    finally:
+        app.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
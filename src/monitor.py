@@ -1,73 +1,484 @@
 import subprocess
+import shutil
+import threading
 import time
-import sys
+
+from src.overhead import meter
+from src.procfs import CpuPercent, memory_percent, session_env
+from src.probes.bt_link import BluetoothLinkProbe
+from src.probes.cpu_cores import CoreLoadProbe
+from src.probes.memory import MemoryProbe
+from src.probes.network import RadioProbe
+from src.probes.pressure import PressureProbe
+from src.probes.sched_latency import SchedLatencyProbe
 
 try:
     import psutil
 except ImportError:
-    print("[!] psutil not found. Please run: pip install psutil")
-    sys.exit(1)
+    psutil = None  # the /proc backend in src.procfs covers CPU and memory
 
 
-class PerformanceMonitor:
+class NodeStats:
+    """One row of the PipeWire graph as reported by pw-top (times in microseconds)."""
+
+    __slots__ = (
+        "id", "name", "driver", "state", "quantum", "rate",
+        "wait", "busy", "wait_ratio", "busy_ratio", "errors", "format"
+    )
+
+    TIME_UNITS = {"ns": 0.001, "us": 1.0, "µs": 1.0, "ms": 1000.0, "s": 1000000.0}
+
+    def __init__(self, id, name, driver, state="", quantum=0, rate=0,
+                 wait=0.0, busy=0.0, wait_ratio=0.0, busy_ratio=0.0, errors=0, format=""):
+        self.id = id
+        self.name = name
+        self.driver = driver
+        self.state = state
+        self.quantum = quantum
+        self.rate = rate
+        self.wait = wait
+        self.busy = busy
+        self.wait_ratio = wait_ratio
+        self.busy_ratio = busy_ratio
+        self.errors = errors
+        self.format = format
+
+    @property
+    def is_driver(self):
+        return self.driver == self.id
+
+    @property
+    def period_us(self):
+        """Time budget of one graph cycle for this node."""
+        if not self.rate:
+            return 0.0
+        return self.quantum * 1000000.0 / self.rate
+
+    def error_delta(self, previous):
+        """New errors since `previous` (another snapshot of the same node, or None)."""
+        if previous is None or previous.name != self.name:
+            return self.errors
+        return max(0, self.errors - previous.errors)
+
+    @classmethod
+    def from_pw_top(cls, parts, columns, driver_id):
+        """Builds a record from a split pw-top row; returns None for unparsable rows."""
+        try:
+            node_id = int(parts[columns["ID"]])
+            err_col = columns["ERR"]
+            errors = int(parts[err_col])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+        rest = parts[err_col + 1:]
+        if "+" in rest:
+            split = rest.index("+")
+            fmt, name = rest[:split], rest[split + 1:]
+            driver = driver_id if driver_id is not None else node_id
+        else:
+            split = 0
+            if "FORMAT" in columns:
+                while split < len(rest) - 1 and _is_format_token(rest[split]):
+                    split += 1
+            fmt, name = rest[:split], rest[split:]
+            driver = node_id
+
+        return cls(
+            id=node_id,
+            name=" ".join(name),
+            driver=driver,
+            state=_field(parts, columns, "S", ""),
+            quantum=_to_int(_field(parts, columns, "QUANT", "0")),
+            rate=_to_int(_field(parts, columns, "RATE", "0")),
+            wait=cls.parse_time(_field(parts, columns, "WAIT", "")),
+            busy=cls.parse_time(_field(parts, columns, "BUSY", "")),
+            wait_ratio=_to_float(_field(parts, columns, "W/Q", "0")),
+            busy_ratio=_to_float(_field(parts, columns, "B/Q", "0")),
+            errors=errors,
+            format=" ".join(fmt)
+        )
+
+    @classmethod
+    def parse_time(cls, text):
+        """Converts pw-top durations such as '12.3us' or '1.2ms' to microseconds."""
+        for suffix in ("ns", "us", "µs", "ms", "s"):
+            if text.endswith(suffix):
+                return _to_float(text[:-len(suffix)]) * cls.TIME_UNITS[suffix]
+        return 0.0
+
+    def __repr__(self):
+        return (f"NodeStats(id={self.id}, name={self.name!r}, driver={self.driver}, "
+                f"quantum={self.quantum}, rate={self.rate}, B/Q={self.busy_ratio:.2f}, "
+                f"W/Q={self.wait_ratio:.2f}, errors={self.errors})")
+
+
+def _field(parts, columns, name, default):
+    index = columns.get(name)
+    if index is None or index >= len(parts):
+        return default
+    return parts[index]
+
+
+def _to_int(text):
+    try:
+        return int(text)
+    except ValueError:
+        return 0
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def _is_format_token(token):
+    """FORMAT cells look like 'S16LE 2 48000' or 'F32P 8 44100'; node names never do."""
+    return token.isdigit() or (token[:1].isupper() and token.replace("_", "").isalnum() and token.upper() == token)
+
+
+class XrunCollector:
+    """Keeps one pw-top batch-mode child alive and folds its output into per-node NodeStats."""
+
+    RESTART_BACKOFF = 5.0
+
     def __init__(self):
-        self.last_xrun_count = self.get_xrun_total()
+        self.process = None
+        self.thread = None
+        self.nodes = {}
+        self.node_deltas = {}
+        self.total = 0
+        self.generation = 0
+        self._columns = None
+        self._pending = {}
+        self._driver_id = None
+        self._baseline = True
+        self._last_spawn = 0.0
+        self.parse_ns = 0
+        self._lock = threading.Lock()
 
-    def get_xrun_total(self):
-        """Fetches total ERR count from PipeWire's pw-top."""
+    def start(self):
+        if self.is_running() or not shutil.which("pw-top"):
+            return False
+
+        cmd = ["pw-top", "-b"]
+        if shutil.which("stdbuf"):
+            cmd = ["stdbuf", "-oL"] + cmd
+
+        self._last_spawn = time.monotonic()
         try:
-            output = subprocess.check_output(
-                ["pw-top", "-n", "1"],
+            self.process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 text=True,
-                stderr=subprocess.DEVNULL
+                bufsize=1,
+                env=session_env()
             )
-            total = 0
-            for line in output.splitlines():
-                parts = line.split()
-                for line in output.splitlines():
-                    if "ERR" in line or "xrun" in line.lower():
-                        parts = line.split()
-                        for p in parts:
-                            if p.isdigit():
-                                total += int(p)
-
-            return total
+        except OSError:
+            self.process = None
+            return False
+        meter.spawned("pw-top", self.process.pid)
+
+        self._columns = None
+        self._pending = {}
+        self._driver_id = None
+        self._baseline = True
+        self.thread = threading.Thread(
+            target=self._reader, name="airtight-xrun-collector", daemon=True
+        )
+        self.thread.start()
+        return True
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_running(self):
+        """Respawns pw-top (e.g. after a PipeWire restart), at most once per backoff period."""
+        if self.is_running():
+            return True
+        if time.monotonic() - self._last_spawn < self.RESTART_BACKOFF:
+            return False
+        return self.start()
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=1)
         except Exception:
-            return 0
+            self.process.kill()
+        self.process = None
 
+    def take_node_deltas(self):
+        """Returns per-node xruns (keyed by node name) accumulated since the previous call."""
+        if not self.node_deltas:
+            return {}
+        with self._lock:
+            deltas, self.node_deltas = self.node_deltas, {}
+        return deltas
+
+    def _reader(self):
+        process = self.process
+        try:
+            for line in process.stdout:
+                self.feed(line)
+        except (OSError, ValueError):
+            pass
+        self._commit()
+
+    def feed(self, line):
+        """Parses one line of pw-top batch output; a header line closes the previous snapshot."""
+        started = time.perf_counter_ns()
+        try:
+            self._parse(line)
+        finally:
+            self.parse_ns += time.perf_counter_ns() - started
+
+    def _parse(self, line):
+        parts = line.split()
+        if not parts:
+            return
+
+        if parts[0] == "S" and "ERR" in parts:
+            if self._columns is not None:
+                self._commit()
+            self._columns = {name: i for i, name in enumerate(parts)}
+            return
+
+        if self._columns is None:
+            return
+
+        node = NodeStats.from_pw_top(parts, self._columns, self._driver_id)
+        if node is None:
+            return
+        if node.is_driver:
+            self._driver_id = node.id
+        self._pending[node.id] = node
+
+    def _commit(self):
+        snapshot = self._pending
+        if not snapshot:
+            return
+        # One pw-top snapshot's worth of line parsing counts as one "pw-top" stage.
+        meter.record("pw-top", self.parse_ns)
+        self.parse_ns = 0
+
+        if self._baseline:
+            # Counters of a fresh pw-top include errors from before we started watching.
+            self._baseline = False
+        else:
+            previous = self.nodes
+            new = 0
+            with self._lock:
+                for node_id, node in snapshot.items():
+                    delta = node.error_delta(previous.get(node_id))
+                    if delta:
+                        self.node_deltas[node.name] = self.node_deltas.get(node.name, 0) + delta
+                        new += delta
+                self.total += new
+
+        self.nodes = snapshot
+        self.generation += 1
+        self._pending = {}
+        self._driver_id = None
+
+
+class PerformanceMonitor:
+    # Probes the overhead budget may switch off; the xrun collector always stays on.
+    OPTIONAL_PROBES = ("radio", "cores", "sched", "pressure", "btlink", "memory")
+
+    def __init__(self):
+        self.disabled = set()
+        self.collector = XrunCollector()
+        self.collector.start()
+        self.sched_probe = SchedLatencyProbe()
+        self.sched_probe.sample()
+        self.radio_probe = RadioProbe()
+        self.radio_probe.sample()
+        self.core_probe = CoreLoadProbe()
+        self.pressure_probe = PressureProbe()
+        self.pressure_probe.sample()
+        self.memory_probe = MemoryProbe()
+        self.memory_probe.sample()
+        # Polls pactl/btmgmt from its own thread, and only while a Bluetooth sink is in the graph.
+        self.link_probe = BluetoothLinkProbe().start()
+        # Optional LatencyProbe; its newest measurement rides along in every sample.
+        self.latency_probe = None
+        self.core_probe.sample()
+        self.last_xrun_count = self.get_xrun_total()
+        # Prime the CPU counters so later non-blocking reads measure the time since the previous tick.
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)
+            self.cpu_percent = None
+        else:
+            self.cpu_percent = CpuPercent()
+
+    def get_xrun_total(self):
+        """Returns the running ERR count gathered by the pw-top collector (no process spawn)."""
+        self.collector.ensure_running()
+        return self.collector.total
+
+    def close(self):
+        self.collector.stop()
+        self.radio_probe.close()
+        self.link_probe.stop()
+
+    def probe_enabled(self, name):
+        return name not in self.disabled
+
+    def set_probe(self, name, enabled):
+        if enabled:
+            self.disabled.discard(name)
+        else:
+            self.disabled.add(name)
 
     def get_cpu_load(self):
-        return psutil.cpu_percent(interval=0.5)
+        """CPU usage since the previous call; never blocks the caller."""
+        if self.cpu_percent is not None:
+            return self.cpu_percent.sample()
+        return psutil.cpu_percent(interval=None)
 
     def get_ram_usage(self):
+        if psutil is None:
+            return memory_percent()
         return psutil.virtual_memory().percent
 
     
     def get_stats(self):
         """Returns a snapshot of system and audio health."""
+        started = time.perf_counter_ns()
         cpu = self.get_cpu_load()
         ram = self.get_ram_usage()
+        meter.add("system", started)
 
         current_xruns = self.get_xrun_total()
         new_xruns = max(0, current_xruns - self.last_xrun_count)
         self.last_xrun_count = current_xruns
 
+        started = time.perf_counter_ns()
+        if "sched" in self.disabled:
+            sched = self.sched_probe.summarize([])
+        else:
+            sched = self.sched_probe.sample()
+            meter.add("sched", started)
+
+        started = time.perf_counter_ns()
+        if "cores" in self.disabled:
+            cores = self.core_probe.summarize({}, [])
+        else:
+            cores = self.core_probe.sample(sched["sched_threads"])
+            meter.add("cores", started)
+        if cores["audio_core_busy"] is None:
+            cores["audio_core_busy"] = cpu  # no data-loop thread seen: fall back to the average
+
+        # A single saturated audio core misses deadlines even when the average looks idle.
         status = "stable"
         if new_xruns > 0:
             status = "xrun_detected"
-        elif cpu > 85:
+        elif cpu > 85 or cores["audio_core_busy"] > 90:
             status = "high_cpu"
+        elif cores["audio_core_irq"] > 30:
+            status = "irq_load"
 
-        return {
-            "timestamp": time.strftime("%H:%M:%S"),
+        now = time.time()
+        stats = {
+            "time": now,
+            "timestamp": time.strftime("%H:%M:%S", time.localtime(now)),
             "cpu": cpu,
             "ram": ram,
             "new_xruns": new_xruns,
+            "nodes": self.collector.nodes,
+            "node_xruns": self.collector.take_node_deltas(),
             "status": status
         }
+        stats.update(sched)
+        stats.update(cores)
+        started = time.perf_counter_ns()
+        if "radio" in self.disabled:
+            stats.update(self.radio_probe.idle())
+        else:
+            stats.update(self.radio_probe.sample(new_xruns))
+            meter.add("radio", started)
+        started = time.perf_counter_ns()
+        if "btlink" in self.disabled:
+            self.link_probe.active = False
+            stats.update(self.link_probe.idle())
+        else:
+            stats.update(self.link_probe.sample(stats["nodes"], stats["node_xruns"], stats["bt_errors"]))
+            meter.add("btlink", started)
+        started = time.perf_counter_ns()
+        if "pressure" in self.disabled:
+            stats.update(self.pressure_probe.idle())
+        else:
+            stats.update(self.pressure_probe.sample(new_xruns))
+            meter.add("pressure", started)
+        started = time.perf_counter_ns()
+        if "memory" in self.disabled:
+            stats.update(self.memory_probe.idle())
+        else:
+            stats.update(self.memory_probe.sample(new_xruns))
+            meter.add("memory", started)
+        if self.latency_probe is not None:
+            stats.update(self.latency_probe.latest())
+        return stats
+
+def main(argv=None, prog=None):
+    """Live tracker; `airtight monitor` and `python3 -m src.monitor`."""
+    import argparse
+    from src.sampler import Sampler
+
+    parser = argparse.ArgumentParser(prog=prog, description="AirTIGHT live performance tracker")
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second (e.g. 10)")
+    parser.add_argument("--metrics", metavar="ADDR",
+                        help="serve OpenMetrics on host:port or unix:/path (e.g. 127.0.0.1:9477)")
+    parser.add_argument("--record", action="store_true", help="append samples to the binary telemetry log")
+    parser.add_argument("--budget", type=float, metavar="PCT",
+                        help="CPU budget for AirTIGHT itself; lowers the rate or drops probes above it")
+    parser.add_argument("--latency", type=float, metavar="SECONDS",
+                        help="measure round-trip latency through a null sink every SECONDS")
+    parser.add_argument("--forecast", action="store_true",
+                        help="predict xrun bursts and raise the quantum ahead of them")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     monitor = PerformanceMonitor()
+    sampler = Sampler(monitor, rate_hz=args.rate)
+    forecaster = None
+    if args.forecast:
+        from src.forecast import XrunForecaster
+        forecaster = XrunForecaster(log=lambda message: print(f"  ↳ {message}"))
+        sampler.add_listener(forecaster.observe)
+        print(f"[*] Forecasting xruns {forecaster.horizon:g}s ahead "
+              f"({forecaster.model.positives + forecaster.model.negatives} samples learned)")
+    if args.budget:
+        from src.overhead import OverheadBudget
+        budget = OverheadBudget(monitor, sampler, cpu_pct=args.budget)
+        sampler.add_listener(budget.check)
+        print(f"[*] Overhead budget {args.budget}% CPU")
+    exporter = None
+    if args.metrics:
+        from src.exporter import MetricsExporter
+        exporter = MetricsExporter(args.metrics).start()
+        sampler.add_listener(exporter.update)
+        print(f"[*] Metrics at {exporter.describe()}")
+    log = None
+    if args.record:
+        from src.recorder import TelemetryLog
+        log = TelemetryLog()
+        sampler.add_listener(log.append)
+        print(f"[*] Recording to {log.directory}")
+    latency = None
+    if args.latency:
+        from src.probes.latency import LatencyProbe
+        if LatencyProbe.available():
+            latency = LatencyProbe().start(args.latency)
+            monitor.latency_probe = latency
+            print(f"[*] Measuring round-trip latency every {args.latency:g}s")
+        else:
+            print("[!] Latency probe needs pactl, pw-loopback, pw-play and pw-record.")
+    latency_seen = None
 
     print("\n" + "═" * 60)
     print("   AirTIGHT LIVE PERFORMANCE TRACKER   ".center(60))
@@ -76,17 +487,91 @@ if __name__ == "__main__":
     print(f"{'TIME':<12} | {'CPU %':<10} | {'RAM %':<10} | {'XRUNS':<8} | STATUS")
     print("─" * 60)
 
+    meter.snapshot("display")
     try:
-        while True:
-            stats = monitor.get_stats()
+        for count, stats in enumerate(sampler.samples(), 1):
             alert = ""
             if stats["status"] == "xrun_detected":
                 alert = "⚠️ STUTTER"
             elif stats["status"] == "high_cpu":
                 alert = "🔥 LOAD"
+            elif stats["status"] == "irq_load":
+                alert = "⚡ IRQ"
 
             print(f"{stats['timestamp']:<12} | {stats['cpu']:<10}% | {stats['ram']:<10}% | {stats['new_xruns']:<8} | {alert}")
-            time.sleep(1)
+
+            if stats["node_xruns"]:
+                by_name = {node.name: node for node in stats["nodes"].values()}
+                for name, n in stats["node_xruns"].items():
+                    node = by_name.get(name)
+                    if node is None:
+                        continue
+                    print(f"  ↳ {name[:36]:<36} +{n} ERR | B/Q {node.busy_ratio:.2f} | "
+                          f"W/Q {node.wait_ratio:.2f} | {node.quantum}/{node.rate}")
+
+            if stats["status"] != "stable":
+                for thread in stats["sched_threads"]:
+                    core = stats["cores"].get(thread.cpu)
+                    if not thread.is_data_loop or core is None:
+                        continue
+                    print(f"  ↳ {thread.comm}/{thread.thread} on CPU{core.cpu}: {core.busy:.0f}% busy "
+                          f"(usr {core.user:.0f} sys {core.system:.0f} irq {core.irq:.0f} "
+                          f"sirq {core.softirq:.0f} steal {core.steal:.0f}), NET_RX {core.net_rx:.0f}/s")
+
+            if stats["sched_starved"]:
+                print(f"  ↳ run-queue starvation: {stats['sched_worst_thread']} waits "
+                      f"{stats['sched_delay_us']:.0f}µs per wakeup, {stats['sched_non_rt']} data-loop(s) not RT")
+
+            if stats["new_xruns"] and stats["coex_corr"] >= 0.4:
+                print(f"  ↳ radio contention: xruns track Wi-Fi traffic (r={stats['coex_corr']:.2f}, "
+                      f"{stats['wifi_pps']:.0f} pkt/s, {stats['wifi_retries']:.1f} retries/s, "
+                      f"BT {stats['bt_kbps']:.0f} kbit/s)")
+
+            if stats["bt_xruns"] and stats["bt_link_poor"]:
+                link = ("no RSSI reading" if stats["bt_rssi"] is None
+                        else f"RSSI {stats['bt_rssi']:.0f}, TX power {stats['bt_tx_power']:.0f} dBm")
+                print(f"  ↳ Bluetooth link: {link}, {stats['bt_errors']:.1f} controller errors/s, "
+                      f"codec {stats['bt_codec'] or 'unknown'}")
+
+            if stats["new_xruns"] and stats["mem_stalled"]:
+                print(f"  ↳ memory stall: {stats['audio_majflt']:.1f} major faults/s in audio daemons, "
+                      f"{stats['swap_in']:.0f} swap-ins/s, {stats['compact_stall']:.1f} compaction and "
+                      f"{stats['direct_reclaim']:.1f} direct-reclaim stalls/s; PipeWire locks "
+                      f"{stats['audio_locked_kb']} kB, {stats['audio_swap_kb']} kB swapped")
+
+            if stats["new_xruns"] and stats["noisy_cgroup"]:
+                print(f"  ↳ noisy neighbour: {stats['noisy_comm']} in {stats['noisy_cgroup'].rsplit('/', 1)[-1]} "
+                      f"({stats['noisy_cpu']:.0f}% CPU, {stats['noisy_io_mbps']:.1f} MB/s I/O, "
+                      f"blamed for {stats['noisy_share']:.0%} of bursts; PSI cpu {stats['psi_cpu']:.0f}% "
+                      f"io {stats['psi_io']:.0f}% mem {stats['psi_mem']:.0f}%)")
+
+            if forecaster is not None and forecaster.trained and stats["xrun_risk"] >= forecaster.LOWER_RISK:
+                print(f"  ↳ xrun risk {stats['xrun_risk']:.2f} within {forecaster.horizon:g}s"
+                      + (f", quantum held at {stats['forecast_quantum']}" if stats["forecast_quantum"] else ""))
+
+            if latency is not None and latency.last is not None and latency.last["time"] != latency_seen:
+                latency_seen = latency.last["time"]
+                print(f"  ↳ round-trip latency {latency.last['latency_ms']:.2f} ms "
+                      f"(jitter {latency.last['latency_jitter_ms']:.2f} ms, {latency.last['bursts']} bursts)")
+
+            if count % 10 == 0:
+                print(f"  ↳ {meter.format(meter.snapshot('display'))}")
 
     except KeyboardInterrupt:
         print("\n[*] Monitoring stopped.")
+        print(f"[*] {meter.format(meter.snapshot('display'))}")
+    finally:
+        sampler.stop()
+        if forecaster is not None:
+            forecaster.close()
+        monitor.close()
+        if latency is not None:
+            latency.stop()
+        if exporter is not None:
+            exporter.stop()
+        if log is not None:
+            log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import resource
+import threading
+import time
+
+from src.procfs import read_text
+
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+class OverheadMeter:
+    """AirTIGHT's own cost: per-stage timings, processes spawned, CPU, RSS and wakeups.
+
+    Stages are timed with perf_counter_ns around each probe and parse; a
+    stage costs two clock reads and a dict update. snapshot() reports the
+    figures since the previous snapshot, including the CPU time of watched
+    long-lived children such as the pw-top collector.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.spawns = {}
+        self.children = {}
+        self._lock = threading.Lock()
+        self._last = {}
+
+    def add(self, name, start_ns):
+        """Accounts the time since `start_ns` (from time.perf_counter_ns()) to a stage."""
+        self.record(name, time.perf_counter_ns() - start_ns)
+
+    def record(self, name, elapsed):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [1, elapsed, elapsed]
+            else:
+                stage[0] += 1
+                stage[1] += elapsed
+                if elapsed > stage[2]:
+                    stage[2] = elapsed
+
+    def spawned(self, name, pid=None):
+        """Counts one child process; with `pid`, its CPU time is included in snapshots while it lives."""
+        with self._lock:
+            self.spawns[name] = self.spawns.get(name, 0) + 1
+            if pid is not None:
+                self.children[name] = pid
+
+    def stage_means_us(self):
+        with self._lock:
+            return {name: round(total / count / 1000, 1) for name, (count, total, _) in self.stages.items()}
+
+    def _child_ticks(self):
+        ticks = 0
+        for pid in list(self.children.values()):
+            stat = read_text(f"/proc/{pid}/stat")
+            fields = stat[stat.rfind(")") + 2:].split()
+            if len(fields) > 12:
+                ticks += int(fields[11]) + int(fields[12])
+        return ticks
+
+    def snapshot(self, reader="default"):
+        """Own CPU %, child CPU %, RSS, wakeups/s and spawns since `reader`'s previous call."""
+        now = time.monotonic()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # process_time() has nanosecond resolution; os.times() only counts clock ticks.
+        current = (now, time.process_time(), self._child_ticks() / CLOCK_TICKS, usage.ru_nvcsw)
+        previous = self._last.get(reader)
+        self._last[reader] = current
+
+        statm = read_text("/proc/self/statm").split()
+        result = {
+            "overhead_cpu_pct": 0.0,
+            "overhead_child_cpu_pct": 0.0,
+            "overhead_rss_mb": round(int(statm[1]) * PAGE_SIZE / 2 ** 20, 1) if len(statm) > 1 else 0.0,
+            "overhead_wakeups": 0.0,
+            "overhead_spawns": sum(self.spawns.values()),
+            "overhead_stage_us": self.stage_means_us()
+        }
+        if previous is not None and now > previous[0]:
+            elapsed = now - previous[0]
+            result["overhead_cpu_pct"] = round((current[1] - previous[1]) / elapsed * 100, 2)
+            result["overhead_child_cpu_pct"] = round(max(0.0, current[2] - previous[2]) / elapsed * 100, 2)
+            result["overhead_wakeups"] = round((current[3] - previous[3]) / elapsed, 1)
+        return result
+
+    def format(self, snapshot):
+        stages = snapshot["overhead_stage_us"]
+        slowest = max(stages, key=stages.get) if stages else None
+        line = (f"AirTIGHT overhead: {snapshot['overhead_cpu_pct']:.2f}% CPU "
+                f"(+{snapshot['overhead_child_cpu_pct']:.2f}% pw-top), {snapshot['overhead_rss_mb']:.0f} MB RSS, "
+                f"{snapshot['overhead_wakeups']:.1f} wakeups/s, {snapshot['overhead_spawns']} spawns")
+        if slowest:
+            line += f"; slowest stage {slowest} {stages[slowest]:.0f}µs"
+        return line
+
+
+# Shared by every module of the process, like the process itself.
+meter = OverheadMeter()
+
+
+class OverheadBudget:
+    """Keeps AirTIGHT under a CPU budget by degrading the monitor step by step.
+
+    Registered as a sampler listener. Every `interval` seconds it compares own
+    plus pw-top CPU with `cpu_pct`. Over budget, it first halves the sample
+    rate down to `min_rate_hz`, then disables the most expensive optional probe
+    (by measured stage time). Well under budget, it undoes those steps in
+    reverse order.
+    """
+
+    def __init__(self, monitor, sampler, cpu_pct=1.0, min_rate_hz=0.25, interval=10.0):
+        self.monitor = monitor
+        self.sampler = sampler
+        self.cpu_pct = cpu_pct
+        self.min_rate_hz = min_rate_hz
+        self.interval = interval
+        self.steps = []
+        self.last = None
+        self._next = time.monotonic() + interval
+        meter.snapshot("budget")
+
+    def check(self, sample):
+        now = time.monotonic()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+
+        self.last = meter.snapshot("budget")
+        used = self.last["overhead_cpu_pct"] + self.last["overhead_child_cpu_pct"]
+        if used > self.cpu_pct:
+            self._degrade(used)
+        elif used < self.cpu_pct / 2 and self.steps:
+            self._restore(used)
+
+    def _degrade(self, used):
+        if self.sampler.rate_hz / 2 >= self.min_rate_hz:
+            self.steps.append(("rate", self.sampler.rate_hz))
+            self.sampler.set_rate(self.sampler.rate_hz / 2)
+            print(f"[!] Overhead {used:.2f}% over the {self.cpu_pct}% budget: "
+                  f"sampling lowered to {self.sampler.rate_hz:g} Hz.")
+            return
+
+        stages = meter.stage_means_us()
+        enabled = [p for p in self.monitor.OPTIONAL_PROBES if self.monitor.probe_enabled(p)]
+        if enabled:
+            probe = max(enabled, key=lambda p: stages.get(p, 0.0))
+            self.monitor.set_probe(probe, False)
+            self.steps.append(("probe", probe))
+            print(f"[!] Overhead {used:.2f}% over the {self.cpu_pct}% budget: {probe} probe disabled.")
+
+    def _restore(self, used):
+        kind, value = self.steps.pop()
+        if kind == "rate":
+            self.sampler.set_rate(value)
+            print(f"[*] Overhead {used:.2f}%: sampling back to {value:g} Hz.")
+        else:
+            self.monitor.set_probe(value, True)
+            print(f"[*] Overhead {used:.2f}%: {value} probe re-enabled.")
@@ -0,0 +1,192 @@
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+from src.overhead import meter
+from src.procfs import session_env
+
+
+# A2DP codecs from the highest to the most robust bitrate; PipeWire offers each
+# as an "a2dp-sink-<codec>" card profile the device and the build support.
+CODEC_LADDER = ("ldac", "aptx_hd", "sbc_xq", "aptx", "aac", "sbc")
+
+CONN_INFO = re.compile(r"RSSI (-?\d+)\s+TX power (-?\d+)")
+PROFILE_CODEC = re.compile(r"codec ([^)]+)\)")
+
+
+def codec_name(description):
+    """"SBC-XQ" -> "sbc_xq", "aptX HD" -> "aptx_hd"; the form used in profile names."""
+    return description.strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def bluez_cards():
+    """A2DP-capable Bluetooth cards from `pactl list cards`.
+
+    Returns [{"name", "address", "profile", "codec", "profiles"}], where
+    `profiles` maps each available profile to its codec and `codec` is the
+    codec of the active profile (None outside A2DP).
+    """
+    if not shutil.which("pactl"):
+        return []
+    meter.spawned("pactl")
+    try:
+        out = subprocess.run(["pactl", "list", "cards"], capture_output=True, text=True, timeout=5,
+                             env=session_env()).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+
+    cards, card, section = [], None, None
+    for line in out.splitlines():
+        stripped = line.strip()
+        if line.startswith("Card #"):
+            card, section = {"name": None, "address": None, "profile": None, "profiles": {}}, None
+            cards.append(card)
+        elif card is None or not stripped:
+            continue
+        elif line.startswith("\t") and not line.startswith("\t\t"):
+            key, _, value = stripped.partition(":")
+            section = key
+            if key == "Name":
+                card["name"] = value.strip()
+            elif key == "Active Profile":
+                card["profile"] = value.strip()
+        elif section == "Properties" and stripped.startswith("api.bluez5.address"):
+            card["address"] = stripped.partition("=")[2].strip().strip('"')
+        elif section == "Profiles":
+            name, _, description = stripped.partition(": ")
+            codec = PROFILE_CODEC.search(description)
+            if name.startswith("a2dp-sink") and codec and "available: no" not in description:
+                card["profiles"][name] = codec_name(codec.group(1))
+
+    result = []
+    for card in cards:
+        if not (card["name"] or "").startswith("bluez_card.") or not card["profiles"]:
+            continue
+        card["codec"] = card["profiles"].get(card["profile"])
+        result.append(card)
+    return result
+
+
+def conn_info(address):
+    """(rssi, tx_power) of a connected device via `btmgmt conn-info`, or None.
+
+    For BR/EDR links the RSSI is relative to the controller's golden receive
+    range: 0 is inside it and negative values are dB below it.
+    """
+    if not shutil.which("btmgmt"):
+        return None
+    meter.spawned("btmgmt")
+    try:
+        out = subprocess.run(["btmgmt", "conn-info", address], capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = CONN_INFO.search(out)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+class BluetoothLinkProbe:
+    """Link quality of connected A2DP devices and xruns on their PipeWire nodes.
+
+    Reading RSSI and codecs costs a pactl and a btmgmt spawn, so a background
+    thread polls every `interval` seconds, and only while a bluez_output node
+    is in the graph. sample() only reads the newest result. The link counts
+    as poor when the worst RSSI drops to POOR_RSSI or the controller reports
+    POOR_ERRORS errors/s (bt_errors from the radio probe). It stays poor until
+    RSSI is back at GOOD_RSSI and errors are below half that rate.
+    """
+
+    POOR_RSSI = -8
+    GOOD_RSSI = -3
+    POOR_ERRORS = 1.0
+
+    def __init__(self, interval=10.0):
+        self.interval = interval
+        self.active = False
+        self.cards = []
+        self.rssi = None
+        self.tx_power = None
+        self.poor = False
+        self.good_since = None
+        self.thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, name="airtight-bt-link", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+            self.thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.active:
+                self.poll()
+                self._stop.wait(self.interval)
+            else:
+                self._wake.wait()
+                self._wake.clear()
+
+    def poll(self):
+        cards = bluez_cards()
+        links = [conn_info(card["address"]) for card in cards if card["address"] and card["codec"]]
+        links = [link for link in links if link is not None]
+        self.rssi = min(link[0] for link in links) if links else None
+        self.tx_power = max(link[1] for link in links) if links else None
+        self.cards = cards
+
+    def sample(self, nodes, node_xruns, bt_errors=0.0):
+        """Folds the newest poll with this tick's bluez node xruns and controller errors."""
+        active = any(node.name.startswith("bluez_output.") for node in nodes.values())
+        if active and not self.active:
+            self._wake.set()
+        self.active = active
+        if not active:
+            self.rssi = self.tx_power = None
+            self.cards = []
+
+        rssi = self.rssi
+        if self.poor:
+            self.poor = (rssi is not None and rssi < self.GOOD_RSSI) or bt_errors >= self.POOR_ERRORS / 2
+        else:
+            self.poor = (rssi is not None and rssi <= self.POOR_RSSI) or bt_errors >= self.POOR_ERRORS
+        self.poor = self.poor and active
+
+        xruns = sum(count for name, count in node_xruns.items() if name.startswith("bluez_output."))
+        now = time.monotonic()
+        if self.poor or xruns or not active:
+            self.good_since = None
+        elif self.good_since is None:
+            self.good_since = now
+
+        result = self.idle()
+        codecs = [card["codec"] for card in self.cards if card["codec"]]
+        result["bt_codec"] = codecs[0] if codecs else None
+        result["bt_rssi"] = float(rssi) if rssi is not None else None
+        result["bt_tx_power"] = float(self.tx_power) if self.tx_power is not None else None
+        result["bt_link_poor"] = self.poor
+        result["bt_xruns"] = xruns
+        result["bt_good_s"] = round(now - self.good_since, 1) if self.good_since is not None else 0.0
+        return result
+
+    def idle(self):
+        """The empty result, also used while the probe is switched off.
+
+        RSSI and TX power are None without a reading: 0 is a valid BR/EDR RSSI.
+        """
+        return {
+            "bt_codec": None,
+            "bt_rssi": None,
+            "bt_tx_power": None,
+            "bt_link_poor": False,
+            "bt_xruns": 0,
+            "bt_good_s": 0.0
+        }
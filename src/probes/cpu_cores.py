@@ -0,0 +1,140 @@
+import time
+
+from src.procfs import read_text
+
+
+# Column order of the cpuN lines in /proc/stat; see proc(5).
+STAT_FIELDS = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal")
+
+
+class CoreStats:
+    """Time shares of one CPU between two samples, in percent, plus softirq rates per second."""
+
+    __slots__ = ("cpu", "busy", "user", "system", "irq", "softirq", "steal", "iowait", "net_rx", "net_tx", "softirqs")
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.busy = 0.0
+        self.user = 0.0
+        self.system = 0.0
+        self.irq = 0.0
+        self.softirq = 0.0
+        self.steal = 0.0
+        self.iowait = 0.0
+        self.net_rx = 0.0
+        self.net_tx = 0.0
+        self.softirqs = 0.0
+
+    @property
+    def interrupt(self):
+        """Share of the core spent in hard and soft interrupt context."""
+        return self.irq + self.softirq
+
+    def __repr__(self):
+        return (f"CoreStats(cpu{self.cpu} busy={self.busy:.0f}% usr={self.user:.0f} sys={self.system:.0f} "
+                f"irq={self.irq:.0f} sirq={self.softirq:.0f} steal={self.steal:.0f})")
+
+
+def read_proc_stat(path="/proc/stat"):
+    """Returns {cpu: (user, nice, system, idle, iowait, irq, softirq, steal)} in clock ticks."""
+    counters = {}
+    for line in read_text(path).splitlines():
+        if not line.startswith("cpu") or line.startswith("cpu "):
+            continue
+        fields = line.split()
+        values = [int(v) for v in fields[1:9]]
+        values += [0] * (8 - len(values))
+        counters[int(fields[0][3:])] = tuple(values)
+    return counters
+
+
+def read_softirqs(path="/proc/softirqs"):
+    """Returns {type: [count per CPU column]} and the CPU ids of the columns."""
+    lines = read_text(path).splitlines()
+    if not lines:
+        return {}, []
+    cpus = [int(name[3:]) for name in lines[0].split()]
+    table = {}
+    for line in lines[1:]:
+        name, _, rest = line.partition(":")
+        table[name.strip()] = [int(v) for v in rest.split()[:len(cpus)]]
+    return table, cpus
+
+
+class CoreLoadProbe:
+    """Per-core user/system/irq/softirq/steal breakdown from /proc/stat and /proc/softirqs.
+
+    One read of each file per sample; shares are computed from counter deltas.
+    `sample(threads)` takes the SchedLatencyProbe thread records so it can
+    report the load of the cores the PipeWire data-loop threads last ran on,
+    which is what decides whether a deadline is missed.
+    """
+
+    def __init__(self):
+        self.previous = None
+        self.previous_softirqs = None
+        self._last_time = None
+
+    def sample(self, threads=()):
+        now = time.monotonic()
+        stat = read_proc_stat()
+        softirqs, columns = read_softirqs()
+        elapsed = now - self._last_time if self._last_time else 0.0
+        previous, previous_softirqs = self.previous, self.previous_softirqs
+        self.previous, self.previous_softirqs, self._last_time = stat, softirqs, now
+
+        cores = {}
+        if previous is not None:
+            for cpu, values in stat.items():
+                before = previous.get(cpu)
+                if before is None:
+                    continue
+                delta = [max(0, a - b) for a, b in zip(values, before)]
+                total = sum(delta)
+                if not total:
+                    continue
+                core = CoreStats(cpu)
+                scale = 100.0 / total
+                core.user = (delta[0] + delta[1]) * scale
+                core.system = delta[2] * scale
+                core.iowait = delta[4] * scale
+                core.irq = delta[5] * scale
+                core.softirq = delta[6] * scale
+                core.steal = delta[7] * scale
+                core.busy = 100.0 - (delta[3] + delta[4]) * scale
+                cores[cpu] = core
+
+        if previous_softirqs and elapsed > 0:
+            for name, counts in softirqs.items():
+                before = previous_softirqs.get(name)
+                if before is None:
+                    continue
+                for cpu, now_count, old in zip(columns, counts, before):
+                    core = cores.get(cpu)
+                    if core is None:
+                        continue
+                    rate = max(0, now_count - old) / elapsed
+                    core.softirqs += rate
+                    if name == "NET_RX":
+                        core.net_rx = rate
+                    elif name == "NET_TX":
+                        core.net_tx = rate
+
+        return self.summarize(cores, threads)
+
+    def summarize(self, cores, threads):
+        audio_cpus = sorted({t.cpu for t in threads
+                             if t.is_data_loop and t.comm != "bluetoothd" and t.cpu in cores})
+        audio = [cores[cpu] for cpu in audio_cpus]
+        hottest = max(audio, key=lambda c: c.busy, default=None)
+        busiest = max(cores.values(), key=lambda c: c.busy, default=None)
+
+        return {
+            "cores": cores,
+            "core_max": round(busiest.busy, 1) if busiest else 0.0,
+            "audio_cores": audio_cpus,
+            "audio_core": hottest.cpu if hottest else -1,
+            "audio_core_busy": round(hottest.busy, 1) if hottest else None,
+            "audio_core_irq": round(max(c.interrupt for c in audio), 1) if audio else 0.0,
+            "audio_core_steal": round(max(c.steal for c in audio), 1) if audio else 0.0
+        }
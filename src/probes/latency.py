@@ -0,0 +1,280 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from array import array
+
+from src.overhead import meter
+from src.procfs import session_env
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+SINK_NAME = "airtight-latency"
+TOOLS = ("pactl", "pw-loopback", "pw-play", "pw-record")
+
+# Feedback taps of primitive polynomials (Xilinx XAPP052), one per register length.
+MLS_TAPS = {10: (10, 7), 11: (11, 9), 12: (12, 6, 4, 1), 13: (13, 4, 3, 1), 14: (14, 5, 3, 1), 15: (15, 14)}
+
+
+def mls(order=12):
+    """Maximum-length sequence of 2**order - 1 values in {-1, +1} from a Fibonacci LFSR."""
+    taps = MLS_TAPS[order]
+    state = (1 << order) - 1
+    sequence = []
+    for _ in range((1 << order) - 1):
+        sequence.append(1 if state & 1 else -1)
+        bit = 0
+        for tap in taps:
+            bit ^= state >> (order - tap)
+        state = (state >> 1) | ((bit & 1) << (order - 1))
+    return sequence
+
+
+def correlate(signal, reference):
+    """Cross-correlation of `reference` against every offset of `signal` (valid part only), via FFT."""
+    n = len(signal) + len(reference) - 1
+    size = 1 << (n - 1).bit_length()
+    spectrum = np.fft.rfft(signal, size) * np.conj(np.fft.rfft(reference, size))
+    return np.fft.irfft(spectrum, size)[:len(signal) - len(reference) + 1]
+
+
+def find_bursts(signal, reference, count):
+    """Start offsets (sorted) of up to `count` copies of `reference` in `signal`.
+
+    With NumPy the whole channel is cross-correlated through the FFT and the
+    strongest peaks are taken, each masking one reference length around it.
+    Without NumPy, bursts are located by their onset after silence and the
+    offset is refined by direct correlation in a small window around it.
+    """
+    length = len(reference)
+    if len(signal) < length:
+        return []
+
+    if np is not None:
+        corr = np.abs(correlate(np.asarray(signal, dtype=float), np.asarray(reference, dtype=float)))
+        threshold = corr.max() * 0.5
+        peaks = []
+        for _ in range(count):
+            index = int(corr.argmax())
+            if corr[index] < threshold or corr[index] == 0:
+                break
+            peaks.append(index)
+            corr[max(0, index - length):index + length] = 0
+        return sorted(peaks)
+
+    loudest = max(abs(v) for v in signal)
+    if not loudest:
+        return []
+    threshold = loudest / 4
+    window = 16
+    peaks = []
+    i = 0
+    end = len(signal) - length
+    while i <= end + window and len(peaks) < count:
+        if abs(signal[i]) < threshold:
+            i += 1
+            continue
+        best, best_score = i, -1.0
+        for k in range(max(0, i - window), min(end, i + window) + 1):
+            score = abs(sum(signal[k + m] * reference[m] for m in range(length)))
+            if score > best_score:
+                best, best_score = k, score
+        peaks.append(best)
+        i = best + length
+    return peaks
+
+
+def burst_lags(left, right, reference, count, max_lag):
+    """Delay in samples of each burst from the left channel to its copy in the right channel."""
+    starts = find_bursts(left, reference, count)
+    arrivals = find_bursts(right, reference, count)
+    lags = []
+    for start in starts:
+        later = [a for a in arrivals if start <= a < start + max_lag]
+        if later:
+            lags.append(later[0] - start)
+    return lags
+
+
+class LatencyProbe:
+    """Measures PipeWire round-trip latency with an MLS through a null sink.
+
+    A pw-loopback stream captures the left channel of a temporary null sink's
+    monitor and plays it back into the right channel of the same sink. The
+    stimulus plays `repeats` MLS bursts on the left channel only, and one
+    pw-record of the monitor captures both channels. The lag between each
+    burst and its looped copy is one capture-plus-playback pass through the
+    graph at the current quantum. Both copies are in the same recording, so
+    process start-up times cancel out. Jitter is the spread of those lags.
+
+    measure() blocks for a few seconds; start(interval) repeats it from a
+    background thread and latest() returns the newest result for sampling.
+    """
+
+    AMPLITUDE = 8192  # -12 dBFS in s16
+
+    def __init__(self, rate=48000, order=12, repeats=6, spacing=0.5):
+        self.rate = rate
+        self.order = order
+        self.repeats = repeats
+        self.spacing = spacing
+        self.reference = mls(order)
+        self.last = None
+        self.env = None
+        self.thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def available():
+        return all(shutil.which(tool) for tool in TOOLS)
+
+    def latest(self):
+        """Latency fields for a monitor sample; zeros until the first measurement."""
+        last = self.last
+        if last is None:
+            return {"latency_ms": 0.0, "latency_jitter_ms": 0.0}
+        return {"latency_ms": last["latency_ms"], "latency_jitter_ms": last["latency_jitter_ms"]}
+
+    def _write_stimulus(self, path):
+        gap = int(self.spacing * self.rate)
+        lead = int(0.2 * self.rate)
+        burst = [v * self.AMPLITUDE for v in self.reference]
+        left = array("h", [0] * lead)
+        for _ in range(self.repeats):
+            left.extend(burst)
+            left.extend([0] * max(0, gap - len(burst)))
+        frames = array("h", [0] * (2 * len(left)))
+        frames[0::2] = left
+        if sys.byteorder != "little":
+            frames.byteswap()
+        with wave.open(path, "wb") as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            f.writeframes(frames.tobytes())
+
+    def _read_capture(self, path):
+        with wave.open(path, "rb") as f:
+            if f.getnchannels() != 2 or f.getsampwidth() != 2:
+                return None, None
+            frames = array("h", f.readframes(f.getnframes()))
+        if sys.byteorder != "little":
+            frames.byteswap()
+        return frames[0::2], frames[1::2]
+
+    def _spawn(self, name, args):
+        meter.spawned(name)
+        return subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=self.env)
+
+    def measure(self):
+        """Returns latency/jitter in ms (plus min, max and burst count), or None if it could not be measured."""
+        if not self.available():
+            return None
+        workdir = tempfile.mkdtemp(prefix="airtight-latency-")
+        try:
+            lags = self._run_loop(workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return self.summarize(lags) if lags else None
+
+    def _run_loop(self, workdir):
+        stimulus = os.path.join(workdir, "stimulus.wav")
+        capture = os.path.join(workdir, "capture.wav")
+        self._write_stimulus(stimulus)
+        self.env = session_env()
+
+        meter.spawned("pactl")
+        out = subprocess.run(
+            ["pactl", "load-module", "module-null-sink", f"sink_name={SINK_NAME}", "channels=2",
+             "channel_map=front-left,front-right", f"rate={self.rate}",
+             "sink_properties=device.description=AirTIGHT-latency-probe"],
+            capture_output=True, text=True, env=self.env)
+        module = out.stdout.strip()
+        if out.returncode != 0 or not module:
+            return None
+
+        loop = recorder = None
+        try:
+            loop = self._spawn("pw-loopback", [
+                "pw-loopback", "--name", "airtight-latency-loop", "--channels", "1",
+                "--capture-props", f"target.object={SINK_NAME} stream.capture.sink=true "
+                                   "audio.position=[FL] stream.dont-remix=true",
+                "--playback-props", f"target.object={SINK_NAME} audio.position=[FR] stream.dont-remix=true"])
+            recorder = self._spawn("pw-record", [
+                "pw-record", "--target", SINK_NAME, "-P", "{ stream.capture.sink=true }",
+                "--rate", str(self.rate), "--channels", "2", "--format", "s16", capture])
+            time.sleep(0.5)  # let both streams link before the first burst
+
+            player = self._spawn("pw-play", ["pw-play", "--target", SINK_NAME, stimulus])
+            player.wait(timeout=self.repeats * self.spacing + 10)
+            time.sleep(self.spacing)  # the last looped burst is still in flight
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        finally:
+            if recorder is not None:
+                recorder.send_signal(signal.SIGINT)  # pw-record finalizes the WAV header on SIGINT
+            if loop is not None:
+                loop.terminate()
+            for process in (recorder, loop):
+                if process is not None:
+                    try:
+                        process.wait(timeout=2)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.wait()
+            meter.spawned("pactl")
+            subprocess.run(["pactl", "unload-module", module], stderr=subprocess.DEVNULL, env=self.env)
+
+        try:
+            left, right = self._read_capture(capture)
+        except (OSError, EOFError, wave.Error):
+            return None
+        if left is None:
+            return None
+        return burst_lags(left, right, self.reference, self.repeats, int(self.spacing * self.rate))
+
+    def summarize(self, lags):
+        if len(lags) < 2:
+            return None
+        ms = [lag * 1000.0 / self.rate for lag in lags]
+        mean = sum(ms) / len(ms)
+        jitter = (sum((v - mean) ** 2 for v in ms) / len(ms)) ** 0.5
+        self.last = {
+            "latency_ms": round(mean, 3),
+            "latency_jitter_ms": round(jitter, 3),
+            "latency_min_ms": round(min(ms), 3),
+            "latency_max_ms": round(max(ms), 3),
+            "bursts": len(ms),
+            "rate": self.rate,
+            "time": time.time()
+        }
+        return self.last
+
+    # -- periodic measurement ----------------------------------------------
+
+    def start(self, interval=60.0):
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, args=(interval,), name="airtight-latency", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.repeats * self.spacing + 5)
+            self.thread = None
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            self.measure()
+            if self._stop.wait(interval):
+                return
@@ -0,0 +1,150 @@
+import time
+from collections import deque
+
+from src.probes.pressure import read_psi
+from src.procfs import find_processes, read_text
+
+
+def read_vmstat(path="/proc/vmstat"):
+    """Returns (pswpin, compact_stall, allocstall) from one read of /proc/vmstat.
+
+    Each counts a task waiting on memory: a swap-in, a direct compaction, or
+    direct reclaim (allocstall_* summed over zones).
+    """
+    swap_in = compact = reclaim = 0
+    for line in read_text(path).splitlines():
+        name, _, value = line.partition(" ")
+        if name == "pswpin":
+            swap_in = int(value)
+        elif name == "compact_stall":
+            compact = int(value)
+        elif name.startswith("allocstall_"):
+            reclaim += int(value)
+    return swap_in, compact, reclaim
+
+
+def read_faults(pid):
+    """(minflt, majflt) of one process from /proc/<pid>/stat, or None if it is gone."""
+    stat = read_text(f"/proc/{pid}/stat")
+    # Fields after the parenthesised comm start at field 3 (state); see proc(5).
+    fields = stat[stat.rfind(")") + 2:].split()
+    if len(fields) < 10:
+        return None
+    return int(fields[7]), int(fields[9])
+
+
+def read_vm_kb(pid, names=("VmLck", "VmSwap")):
+    """{name: kB} for the given /proc/<pid>/status lines."""
+    values = {}
+    for line in read_text(f"/proc/{pid}/status").splitlines():
+        name, _, rest = line.partition(":")
+        if name in names:
+            values[name] = int(rest.split()[0])
+    return values
+
+
+class MemoryProbe:
+    """Samples page faults of the audio daemons and system memory stalls.
+
+    Every tick reads minflt/majflt of PipeWire and WirePlumber from
+    /proc/<pid>/stat, the swap-in, compaction-stall and direct-reclaim
+    counters of /proc/vmstat, and the `full` line of /proc/pressure/memory.
+    VmLck and VmSwap (whether PipeWire really locked its memory, and how
+    much of it was swapped out) change slowly and are read on each rescan.
+
+    mem_xrun_share is the fraction of the last WINDOW samples with xruns
+    that had a memory stall in the same or the previous sample. It
+    stays 0 until MIN_XRUN_SAMPLES such samples were seen.
+    """
+
+    RESCAN_INTERVAL = 10.0
+    TARGETS = ("pipewire", "pipewire-pulse", "wireplumber")
+    WINDOW = 120
+    MIN_XRUN_SAMPLES = 3
+
+    def __init__(self):
+        self.pids = {}
+        self.status = {}
+        self.previous = None
+        self._last_scan = None
+        self._last_time = None
+        self._stalled = False
+        self.history = deque(maxlen=self.WINDOW)
+
+    def _rescan(self, now):
+        self.pids = find_processes(self.TARGETS)
+        self.status = {pid: read_vm_kb(pid) for pid in self.pids}
+        self._last_scan = now
+
+    def _read(self):
+        faults = {}
+        for pid in self.pids:
+            counters = read_faults(pid)
+            if counters is not None:
+                faults[pid] = counters
+        return faults, read_vmstat(), read_psi("memory", "full")
+
+    def sample(self, new_xruns=0):
+        now = time.monotonic()
+        if self._last_scan is None or now - self._last_scan >= self.RESCAN_INTERVAL:
+            self._rescan(now)
+
+        current = self._read()
+        elapsed = now - self._last_time if self._last_time else 0.0
+        previous = self.previous
+        self.previous = current
+        self._last_time = now
+
+        result = self.idle()
+        locked = [kb.get("VmLck", 0) for pid, kb in self.status.items() if self.pids.get(pid) == "pipewire"]
+        result["audio_locked_kb"] = min(locked) if locked else 0
+        result["audio_swap_kb"] = sum(kb.get("VmSwap", 0) for kb in self.status.values())
+        if previous is None or elapsed <= 0:
+            return result
+
+        faults, vmstat, psi = current
+        old_faults, old_vmstat, old_psi = previous
+        minflt = majflt = 0
+        for pid, (minor, major) in faults.items():
+            before = old_faults.get(pid)
+            if before is not None:
+                minflt += max(0, minor - before[0])
+                majflt += max(0, major - before[1])
+        rates = [max(0, v - old) / elapsed for v, old in zip(vmstat, old_vmstat)]
+
+        result["audio_minflt"] = round(minflt / elapsed, 1)
+        result["audio_majflt"] = round(majflt / elapsed, 2)
+        result["swap_in"] = round(rates[0], 1)
+        result["compact_stall"] = round(rates[1], 2)
+        result["direct_reclaim"] = round(rates[2], 2)
+        if psi is not None and old_psi is not None:
+            result["psi_mem_full"] = round(min(100.0, max(0, psi - old_psi) / 1e4 / elapsed), 1)
+
+        # A major fault in an audio daemon or any task stalling on memory counts as a stall.
+        stalled = bool(majflt or rates[0] or rates[1] or rates[2])
+        if new_xruns:
+            self.history.append(stalled or self._stalled)
+        self._stalled = stalled
+        result["mem_stalled"] = stalled
+        result["mem_xrun_share"] = round(self.share(), 2)
+        return result
+
+    def share(self):
+        if len(self.history) < self.MIN_XRUN_SAMPLES:
+            return 0.0
+        return sum(self.history) / len(self.history)
+
+    def idle(self):
+        """The all-zero result, also used while the probe is switched off."""
+        return {
+            "audio_minflt": 0.0,
+            "audio_majflt": 0.0,
+            "audio_locked_kb": 0,
+            "audio_swap_kb": 0,
+            "swap_in": 0.0,
+            "compact_stall": 0.0,
+            "direct_reclaim": 0.0,
+            "psi_mem_full": 0.0,
+            "mem_stalled": False,
+            "mem_xrun_share": 0.0
+        }
@@ -0,0 +1,229 @@
+import fcntl
+import math
+import os
+import socket
+import struct
+import time
+from collections import deque
+
+from src.procfs import read_text
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# struct hci_dev_info from <bluetooth/hci.h>, native alignment; the last ten
+# words are struct hci_dev_stats (err_rx, err_tx, cmd_tx, evt_rx, acl_tx,
+# acl_rx, sco_tx, sco_rx, byte_rx, byte_tx).
+HCI_DEV_INFO = struct.Struct("H8s6sIB8sIIIHHHH10I")
+HCIGETDEVINFO = 0x800448d3  # _IOR('H', 211, int)
+BTPROTO_HCI = 1
+
+
+def wireless_interfaces():
+    try:
+        names = sorted(os.listdir("/sys/class/net"))
+    except OSError:
+        return []
+    return [name for name in names if os.path.isdir(f"/sys/class/net/{name}/wireless")]
+
+
+def read_net_dev(path="/proc/net/dev"):
+    """Returns {iface: (rx_bytes, rx_packets, rx_errs, tx_bytes, tx_packets, tx_errs)} in one read."""
+    counters = {}
+    try:
+        with open(path, "r") as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return counters
+    for line in lines:
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if len(fields) < 11:
+            continue
+        counters[name.strip()] = (int(fields[0]), int(fields[1]), int(fields[2]),
+                                  int(fields[8]), int(fields[9]), int(fields[10]))
+    return counters
+
+
+def read_wireless_retries(path="/proc/net/wireless"):
+    """Returns {iface: retry-discard count} (the `retry` column of the wireless extensions table)."""
+    retries = {}
+    for line in read_text(path).splitlines()[2:]:
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if len(fields) >= 8:
+            retries[name.strip()] = int(fields[7])
+    return retries
+
+
+def hci_stats(dev_id, sock):
+    """Returns hci_dev_stats of hciN as (errors, acl+sco bytes) or None."""
+    buf = bytearray(HCI_DEV_INFO.size)
+    struct.pack_into("H", buf, 0, dev_id)
+    try:
+        fcntl.ioctl(sock.fileno(), HCIGETDEVINFO, buf)
+    except OSError:
+        return None
+    stats = HCI_DEV_INFO.unpack(bytes(buf))[-10:]
+    return stats[0] + stats[1], stats[8] + stats[9]
+
+
+def cross_correlation(a, b, max_lag):
+    """Peak normalized cross-correlation of `b` lagging `a` by 0..max_lag samples.
+
+    Both series are z-scored, so the result is a Pearson coefficient in [-1, 1];
+    0.0 if either series is constant.
+    """
+    n = len(a)
+    if n < 2 or len(b) != n:
+        return 0.0
+
+    if np is not None:
+        x = np.asarray(a, dtype=float)
+        y = np.asarray(b, dtype=float)
+        sx, sy = x.std(), y.std()
+        if sx == 0 or sy == 0:
+            return 0.0
+        x = (x - x.mean()) / sx
+        y = (y - y.mean()) / sy
+        # Index n-1 of the full correlation is lag 0; higher indices are y lagging x.
+        full = np.correlate(y, x, mode="full")[n - 1:n + max_lag]
+        counts = n - np.arange(len(full))
+        return float((full / counts).max())
+
+    mx, my = sum(a) / n, sum(b) / n
+    sx = math.sqrt(sum((v - mx) ** 2 for v in a) / n)
+    sy = math.sqrt(sum((v - my) ** 2 for v in b) / n)
+    if sx == 0 or sy == 0:
+        return 0.0
+    x = [(v - mx) / sx for v in a]
+    y = [(v - my) / sy for v in b]
+    best = -1.0
+    for lag in range(min(max_lag, n - 1) + 1):
+        count = n - lag
+        best = max(best, sum(x[i] * y[i + lag] for i in range(count)) / count)
+    return best
+
+
+class RadioProbe:
+    """Samples Wi-Fi and Bluetooth controller activity and correlates it with xruns.
+
+    Wi-Fi counters come from /proc/net/dev and /proc/net/wireless (one read each
+    for all interfaces); Bluetooth controller statistics come from the
+    HCIGETDEVINFO ioctl. coex_corr is the peak cross-correlation between Wi-Fi
+    packet rate and xruns over the last WINDOW samples, with xruns allowed to
+    lag by up to MAX_LAG samples. It stays 0 until the window holds enough
+    xruns to mean anything, and while Bluetooth is known to be idle.
+    """
+
+    RESCAN_INTERVAL = 30.0
+    WINDOW = 120
+    MAX_LAG = 2
+    MIN_SAMPLES = 30
+    MIN_XRUN_SAMPLES = 3
+
+    def __init__(self):
+        self.interfaces = []
+        self.bt_devices = []
+        self.previous = None
+        self._last_scan = None
+        self._last_time = None
+        self.activity = deque(maxlen=self.WINDOW)
+        self.xruns = deque(maxlen=self.WINDOW)
+        self.bt_bytes = deque(maxlen=self.WINDOW)
+        self._sock = None
+        try:
+            self._sock = socket.socket(getattr(socket, "AF_BLUETOOTH", 31), socket.SOCK_RAW, BTPROTO_HCI)
+        except OSError:
+            pass  # no Bluetooth stack (or Python built without it): Wi-Fi only
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _rescan(self, now):
+        self.interfaces = wireless_interfaces()
+        try:
+            names = os.listdir("/sys/class/bluetooth")
+        except OSError:
+            names = []
+        self.bt_devices = sorted(int(n[3:]) for n in names if n.startswith("hci") and n[3:].isdigit())
+        self._last_scan = now
+
+    def _read(self):
+        net = read_net_dev()
+        retries = read_wireless_retries()
+        wifi = [0, 0, 0, 0]  # bytes, packets, errors, retries
+        for name in self.interfaces:
+            c = net.get(name)
+            if c is None:
+                continue
+            wifi[0] += c[0] + c[3]
+            wifi[1] += c[1] + c[4]
+            wifi[2] += c[2] + c[5]
+            wifi[3] += retries.get(name, 0)
+
+        bt = None
+        if self._sock is not None:
+            for dev_id in self.bt_devices:
+                stats = hci_stats(dev_id, self._sock)
+                if stats is not None:
+                    bt = (bt[0] + stats[0], bt[1] + stats[1]) if bt else stats
+        return wifi, bt
+
+    def sample(self, new_xruns=0):
+        now = time.monotonic()
+        if self._last_scan is None or now - self._last_scan >= self.RESCAN_INTERVAL:
+            self._rescan(now)
+
+        wifi, bt = self._read()
+        elapsed = now - self._last_time if self._last_time else 0.0
+        previous = self.previous
+        self.previous = (wifi, bt)
+        self._last_time = now
+
+        result = self.idle()
+        if previous is None or elapsed <= 0:
+            return result
+
+        before, bt_before = previous
+        rates = [max(0, now_v - old) / elapsed for now_v, old in zip(wifi, before)]
+        result["wifi_kbps"] = round(rates[0] * 8 / 1000, 1)
+        result["wifi_pps"] = round(rates[1], 1)
+        result["wifi_errors"] = round(rates[2], 2)
+        result["wifi_retries"] = round(rates[3], 2)
+        if bt is not None and bt_before is not None:
+            result["bt_errors"] = round(max(0, bt[0] - bt_before[0]) / elapsed, 2)
+            result["bt_kbps"] = round(max(0, bt[1] - bt_before[1]) * 8 / 1000 / elapsed, 1)
+            self.bt_bytes.append(result["bt_kbps"])
+
+        self.activity.append(rates[1])
+        self.xruns.append(new_xruns)
+        result["coex_corr"] = round(self.correlation(bt_known=bt is not None), 3)
+        return result
+
+    def idle(self):
+        """The all-zero result, also used while the probe is switched off."""
+        return {
+            "wifi_kbps": 0.0,
+            "wifi_pps": 0.0,
+            "wifi_retries": 0.0,
+            "wifi_errors": 0.0,
+            "bt_kbps": 0.0,
+            "bt_errors": 0.0,
+            "coex_corr": 0.0
+        }
+
+    def correlation(self, bt_known=True):
+        if len(self.activity) < self.MIN_SAMPLES:
+            return 0.0
+        if sum(1 for v in self.xruns if v) < self.MIN_XRUN_SAMPLES:
+            return 0.0
+        # Both radios must be busy to interfere; an idle BT controller rules coexistence out.
+        if bt_known and self.bt_bytes and not any(self.bt_bytes):
+            return 0.0
+        return max(0.0, cross_correlation(self.activity, self.xruns, self.MAX_LAG))
@@ -0,0 +1,274 @@
+import os
+import time
+from collections import deque
+
+from src.procfs import find_processes, read_text
+from src.state import save_json, state_dir
+
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+RESOURCES = ("cpu", "io", "memory")
+
+# Processes that make up (or measure) the audio path; never blamed, never confined.
+AUDIO_PROCESSES = ("pipewire", "pipewire-pulse", "wireplumber", "bluetoothd", "jackd", "pw-top")
+
+
+def evidence_path():
+    """Offenders blamed for recent xrun bursts, read by the cgroup isolation fixer."""
+    return os.path.join(state_dir(), "noisy_neighbours.json")
+
+
+def cgroup_v2():
+    """True if /sys/fs/cgroup is the unified (v2) hierarchy."""
+    return os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers"))
+
+
+def read_psi(resource, kind="some"):
+    """Returns the cumulative `some` (or `full`) stall time of a /proc/pressure file in microseconds, or None."""
+    for line in read_text(f"/proc/pressure/{resource}").splitlines():
+        if line.startswith(kind + " "):
+            for field in line.split()[1:]:
+                if field.startswith("total="):
+                    return int(field[6:])
+    return None
+
+
+def process_cgroup(pid):
+    """The v2 cgroup path of `pid` (e.g. "/user.slice/.../app-firefox.scope"), or None."""
+    for line in read_text(f"/proc/{pid}/cgroup").splitlines():
+        if line.startswith("0::"):
+            return line[3:] or "/"
+    return None
+
+
+def cgroup_cpu_usage(cgroup):
+    """(usage_usec, throttled_usec) from a cgroup's cpu.stat, or None."""
+    usage = throttled = None
+    for line in read_text(f"{CGROUP_ROOT}{cgroup}/cpu.stat").splitlines():
+        name, _, value = line.partition(" ")
+        if name == "usage_usec":
+            usage = int(value)
+        elif name == "throttled_usec":
+            throttled = int(value)
+    return None if usage is None else (usage, throttled or 0)
+
+
+def is_protected(cgroup, protected):
+    """True for the root cgroup and for any cgroup that is, or contains, a protected one."""
+    if not cgroup or cgroup == "/":
+        return True
+    return any(p == cgroup or p.startswith(cgroup + "/") for p in protected)
+
+
+def protected_cgroups():
+    """Cgroups of the audio stack and of AirTIGHT itself."""
+    pids = list(find_processes(AUDIO_PROCESSES)) + [os.getpid()]
+    return {cgroup for cgroup in map(process_cgroup, pids) if cgroup}
+
+
+def _read_process(pid, with_io):
+    """(cpu_ticks, majflt, io_bytes) of one process, or None for kernel threads and exited processes."""
+    stat = read_text(f"/proc/{pid}/stat")
+    fields = stat[stat.rfind(")") + 2:].split()
+    # Kernel threads have ppid 0 (kthreadd) or 2; they cannot be moved or confined.
+    if len(fields) < 13 or fields[1] in ("0", "2"):
+        return None
+    io = 0
+    if with_io:
+        for line in read_text(f"/proc/{pid}/io").splitlines():
+            if line.startswith(("read_bytes:", "write_bytes:")):
+                io += int(line.split()[1])
+    return int(fields[11]) + int(fields[12]), int(fields[9]), io
+
+
+class PressureProbe:
+    """Attributes CPU, I/O and memory pressure to processes and cgroups around xrun bursts.
+
+    Every sample reads the `some` totals of /proc/pressure/{cpu,io,memory}
+    and reports the share of the interval tasks spent stalled (psi_*). The
+    per-process scan of /proc/<pid>/stat (and /proc/<pid>/io while I/O
+    pressure is up) is the expensive part, so it runs only every
+    SCAN_INTERVAL seconds to refresh the baseline and on a sample with new
+    xruns, at most once per MIN_SCAN_GAP. A burst scan charges the pressure
+    felt since the previous scan to cgroups by their share of CPU time, I/O
+    bytes and major faults, and the top TOP_CGROUPS are blamed for the burst.
+
+    noisy_share is the fraction of the last BURSTS bursts the current top
+    suspect was blamed for; it stays 0 until MIN_BURSTS bursts were seen.
+    The root cgroup and cgroups holding the audio stack are never blamed,
+    since they cannot be confined without confining audio.
+    """
+
+    SCAN_INTERVAL = 5.0
+    MIN_SCAN_GAP = 1.0
+    PROTECT_INTERVAL = 30.0
+    BURSTS = 10
+    MIN_BURSTS = 3
+    TOP_CGROUPS = 3
+    IO_PSI_SCAN = 5.0  # read /proc/<pid>/io only while I/O stall exceeds this share (%)
+
+    def __init__(self):
+        self.psi_previous = None
+        self._psi_time = None
+        self.processes = {}
+        self._scan_time = None
+        self._scan_io = False
+        self._burst_pending = False
+        self.cgroup_stat = {}
+        self.protected = set()
+        self._protect_time = None
+        self.bursts = deque(maxlen=self.BURSTS)
+        self.suspects = {}
+        self.psi = {}
+
+    def _psi(self, now):
+        current = {resource: read_psi(resource) for resource in RESOURCES}
+        previous, elapsed = self.psi_previous, now - self._psi_time if self._psi_time else 0.0
+        self.psi_previous, self._psi_time = current, now
+        result = {}
+        for resource in RESOURCES:
+            value = 0.0
+            if previous and elapsed > 0 and current[resource] is not None and previous[resource] is not None:
+                value = min(100.0, max(0, current[resource] - previous[resource]) / 1e4 / elapsed)
+            result[resource] = round(value, 1)
+        return result
+
+    def _scan(self, with_io):
+        processes = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            counters = _read_process(pid, with_io)
+            if counters is None:
+                continue
+            # A pid keeps its cgroup until it exits or is moved; re-read only for new pids.
+            known = self.processes.get(pid)
+            cgroup = known[1] if known is not None else process_cgroup(pid)
+            processes[pid] = (counters, cgroup)
+        return processes
+
+    def sample(self, new_xruns=0):
+        now = time.monotonic()
+        self.psi = self._psi(now)
+        if self._protect_time is None or now - self._protect_time >= self.PROTECT_INTERVAL:
+            self.protected = protected_cgroups()
+            self._protect_time = now
+
+        # Xruns right after a scan are charged on the first sample MIN_SCAN_GAP later.
+        self._burst_pending = self._burst_pending or new_xruns > 0
+        due = self._scan_time is None or now - self._scan_time >= self.SCAN_INTERVAL
+        burst = self._burst_pending and self._scan_time is not None and now - self._scan_time >= self.MIN_SCAN_GAP
+        if due or burst:
+            with_io = self.psi["io"] >= self.IO_PSI_SCAN
+            processes = self._scan(with_io)
+            if burst:
+                self._blame(processes, now, now - self._scan_time, with_io and self._scan_io)
+                self._burst_pending = False
+            self.processes, self._scan_time, self._scan_io = processes, now, with_io
+        return self.summarize()
+
+    def _blame(self, processes, now, elapsed, with_io):
+        """Charges the pressure since the previous scan to cgroups and records one burst."""
+        usage = {}
+        comms = {}
+        totals = [0, 0, 0]
+        for pid, (counters, cgroup) in processes.items():
+            before = self.processes.get(pid)
+            if before is None or is_protected(cgroup, self.protected):
+                continue
+            delta = [max(0, now_v - old) for now_v, old in zip(counters, before[0])]
+            if not with_io:
+                delta[2] = 0
+            entry = usage.setdefault(cgroup, [0, 0, 0])
+            for i in range(3):
+                entry[i] += delta[i]
+                totals[i] += delta[i]
+            best = comms.get(cgroup)
+            if best is None or delta[0] > best[2]:
+                comms[cgroup] = (pid, read_text(f"/proc/{pid}/comm"), delta[0])
+
+        # Stalled share per resource weighs the cgroup's share of that resource;
+        # the +1 keeps plain CPU hogs visible when the kernel reports no stalls.
+        weights = (self.psi["cpu"] + 1.0, self.psi["io"], self.psi["memory"])
+        scores = {}
+        for cgroup, entry in usage.items():
+            score = sum(w * v / t for w, v, t in zip(weights, entry, totals) if t)
+            if score > 0:
+                scores[cgroup] = score
+        top = sorted(scores, key=scores.get, reverse=True)[:self.TOP_CGROUPS]
+        self.bursts.append(set(top))
+
+        for cgroup in top:
+            pid, comm, _ = comms[cgroup]
+            cpu = usage[cgroup][0] / CLOCK_TICKS / elapsed * 100
+            stat = cgroup_cpu_usage(cgroup)
+            previous = self.cgroup_stat.get(cgroup)
+            throttled = 0.0
+            if stat is not None:
+                self.cgroup_stat[cgroup] = (stat, now)
+                if previous is not None:
+                    span = now - previous[1]
+                    # cpu.stat also counts short-lived children the /proc scan never saw.
+                    cpu = max(cpu, (stat[0] - previous[0][0]) / 1e4 / span)
+                    throttled = (stat[1] - previous[0][1]) / 1e4 / span
+            self.suspects[cgroup] = {
+                "cgroup": cgroup,
+                "pid": pid,
+                "comm": comm,
+                "cpu_pct": round(cpu, 1),
+                "io_mbps": round(usage[cgroup][2] / elapsed / 2 ** 20, 2),
+                "majflt_rate": round(usage[cgroup][1] / elapsed, 1),
+                "throttled_pct": round(throttled, 1),
+                "score": round(scores[cgroup], 2),
+                "time": time.time()
+            }
+        # Suspects that dropped out of the burst window are forgotten.
+        recent = set().union(*self.bursts)
+        for cgroup in [c for c in self.suspects if c not in recent]:
+            del self.suspects[cgroup]
+            self.cgroup_stat.pop(cgroup, None)
+        self.save()
+
+    def blamed(self, cgroup):
+        return sum(1 for burst in self.bursts if cgroup in burst)
+
+    def offenders(self):
+        """Suspects ordered by how many recent bursts they were blamed for."""
+        ranked = sorted(self.suspects.values(), key=lambda s: (self.blamed(s["cgroup"]), s["score"]), reverse=True)
+        return [dict(s, bursts=self.blamed(s["cgroup"]), window=len(self.bursts)) for s in ranked]
+
+    def save(self):
+        save_json(evidence_path(), {"time": time.time(), "offenders": self.offenders()})
+
+    def summarize(self):
+        result = self.idle()
+        result["psi_cpu"] = self.psi.get("cpu", 0.0)
+        result["psi_io"] = self.psi.get("io", 0.0)
+        result["psi_mem"] = self.psi.get("memory", 0.0)
+        result["psi_max"] = max(result["psi_cpu"], result["psi_io"], result["psi_mem"])
+        offenders = self.offenders()
+        if offenders:
+            top = offenders[0]
+            result["noisy_cgroup"] = top["cgroup"]
+            result["noisy_comm"] = top["comm"]
+            result["noisy_cpu"] = top["cpu_pct"]
+            result["noisy_io_mbps"] = top["io_mbps"]
+            if len(self.bursts) >= self.MIN_BURSTS:
+                result["noisy_share"] = round(top["bursts"] / len(self.bursts), 2)
+        return result
+
+    def idle(self):
+        """The all-zero result, also used while the probe is switched off."""
+        return {
+            "psi_cpu": 0.0,
+            "psi_io": 0.0,
+            "psi_mem": 0.0,
+            "psi_max": 0.0,
+            "noisy_cgroup": None,
+            "noisy_comm": None,
+            "noisy_cpu": 0.0,
+            "noisy_io_mbps": 0.0,
+            "noisy_share": 0.0
+        }
@@ -0,0 +1,151 @@
+import time
+
+from src.procfs import find_processes, list_threads, read_text
+
+
+POLICY_NAMES = {0: "SCHED_OTHER", 1: "SCHED_FIFO", 2: "SCHED_RR", 3: "SCHED_BATCH", 5: "SCHED_IDLE", 6: "SCHED_DEADLINE"}
+
+
+class ThreadSchedStats:
+    """Scheduling view of one audio thread between two samples (rates are per second)."""
+
+    __slots__ = (
+        "pid", "tid", "comm", "thread", "policy", "rtprio", "cpu",
+        "run_ms", "wait_ms", "delay_us", "voluntary_rate", "involuntary_rate"
+    )
+
+    def __init__(self, pid, tid, comm, thread):
+        self.pid = pid
+        self.tid = tid
+        self.comm = comm
+        self.thread = thread
+        self.policy = "SCHED_OTHER"
+        self.rtprio = 0
+        self.cpu = -1
+        self.run_ms = 0.0
+        self.wait_ms = 0.0
+        self.delay_us = 0.0
+        self.voluntary_rate = 0.0
+        self.involuntary_rate = 0.0
+
+    @property
+    def is_data_loop(self):
+        return self.thread.startswith("data-loop")
+
+    @property
+    def is_realtime(self):
+        return self.policy in ("SCHED_FIFO", "SCHED_RR", "SCHED_DEADLINE")
+
+    def __repr__(self):
+        return (f"ThreadSchedStats({self.comm}/{self.thread} tid={self.tid}, {self.policy}/{self.rtprio}, "
+                f"cpu={self.cpu}, wait={self.wait_ms:.2f}ms/s, delay={self.delay_us:.0f}us, "
+                f"invol={self.involuntary_rate:.1f}/s)")
+
+
+class SchedLatencyProbe:
+    """Samples run-queue delay and context switches of PipeWire, WirePlumber and bluetoothd threads.
+
+    Reads /proc/<pid>/task/<tid>/{schedstat,status,stat}; the thread list is
+    refreshed every RESCAN_INTERVAL seconds rather than on every tick.
+    """
+
+    RESCAN_INTERVAL = 10.0
+    TARGETS = ("pipewire", "wireplumber", "bluetoothd")
+
+    # Evidence thresholds for starvation of the real-time path.
+    DELAY_LIMIT_US = 1000.0
+    INVOLUNTARY_LIMIT = 50.0
+
+    def __init__(self):
+        self.threads = []
+        self.previous = {}
+        self._last_scan = None
+        self._last_time = None
+
+    def _rescan(self, now):
+        self.threads = [
+            (pid, tid, comm, name)
+            for pid, comm in find_processes(self.TARGETS).items()
+            for tid, name in list_threads(pid)
+        ]
+        self._last_scan = now
+
+    def sample(self):
+        now = time.monotonic()
+        if self._last_scan is None or now - self._last_scan >= self.RESCAN_INTERVAL:
+            self._rescan(now)
+
+        elapsed = now - self._last_time if self._last_time else 0.0
+        self._last_time = now
+
+        current = {}
+        records = []
+        for pid, tid, comm, name in self.threads:
+            base = f"/proc/{pid}/task/{tid}"
+            raw = _read_counters(base)
+            if raw is None:
+                continue
+            current[tid] = raw
+
+            record = ThreadSchedStats(pid, tid, comm, name)
+            record.cpu, record.rtprio, policy = raw[5], raw[6], raw[7]
+            record.policy = POLICY_NAMES.get(policy, str(policy))
+
+            before = self.previous.get(tid)
+            if before is not None and elapsed > 0:
+                run, wait, slices = raw[0] - before[0], raw[1] - before[1], raw[2] - before[2]
+                record.run_ms = run / 1e6 / elapsed
+                record.wait_ms = wait / 1e6 / elapsed
+                record.delay_us = wait / 1e3 / slices if slices > 0 else 0.0
+                record.voluntary_rate = (raw[3] - before[3]) / elapsed
+                record.involuntary_rate = (raw[4] - before[4]) / elapsed
+            records.append(record)
+
+        self.previous = current
+        return self.summarize(records)
+
+    def summarize(self, records):
+        """Flattens per-thread records into the scalar evidence DecisionEngine uses."""
+        data_loops = [r for r in records if r.is_data_loop and r.comm != "bluetoothd"]
+        focus = data_loops or records
+
+        worst = max(focus, key=lambda r: r.delay_us, default=None)
+        non_rt = sum(1 for r in data_loops if not r.is_realtime)
+        involuntary = sum(r.involuntary_rate for r in focus)
+        delay = worst.delay_us if worst else 0.0
+
+        return {
+            "sched_threads": records,
+            "sched_delay_us": round(delay, 1),
+            "sched_worst_thread": f"{worst.comm}/{worst.thread}" if worst else None,
+            "sched_invol_rate": round(involuntary, 1),
+            "sched_non_rt": non_rt,
+            "sched_starved": bool(delay > self.DELAY_LIMIT_US
+                                  or (non_rt and involuntary > self.INVOLUNTARY_LIMIT))
+        }
+
+
+def _read_counters(base):
+    """Returns (run_ns, wait_ns, slices, voluntary, involuntary, cpu, rtprio, policy) or None."""
+    schedstat = read_text(f"{base}/schedstat").split()
+    stat = read_text(f"{base}/stat")
+    if len(schedstat) < 3 or not stat:
+        return None
+
+    voluntary = involuntary = 0
+    for line in read_text(f"{base}/status").splitlines():
+        if line.startswith("voluntary_ctxt_switches:"):
+            voluntary = int(line.split()[1])
+        elif line.startswith("nonvoluntary_ctxt_switches:"):
+            involuntary = int(line.split()[1])
+
+    # Fields after the parenthesised comm start at field 3 (state); see proc(5).
+    fields = stat[stat.rfind(")") + 2:].split()
+    try:
+        return (
+            int(schedstat[0]), int(schedstat[1]), int(schedstat[2]),
+            voluntary, involuntary,
+            int(fields[36]), int(fields[37]), int(fields[38])
+        )
+    except (IndexError, ValueError):
+        return None
@@ -0,0 +1,156 @@
+import os
+import pwd
+
+
+def read_text(path, default=""):
+    """Reads a small procfs/sysfs file, returning `default` if it is missing or unreadable."""
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return default
+
+
+def find_processes(names):
+    """One pass over /proc; returns {pid: comm} for processes whose comm is in `names`."""
+    found = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return found
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        comm = read_text(f"/proc/{entry}/comm")
+        if comm in names:
+            found[int(entry)] = comm
+    return found
+
+
+def session_owner(names=("pipewire-pulse", "pipewire", "pulseaudio")):
+    """uid of the user running the audio server, or None if none is running."""
+    for pid in find_processes(names):
+        try:
+            return os.stat(f"/proc/{pid}").st_uid
+        except OSError:
+            continue
+    return None
+
+
+def session_env():
+    """Environment for PipeWire and Pulse clients (pw-*, pactl).
+
+    Run as root (sudo, a system service), they would look for the server in
+    root's own runtime directory and find none. As root, the environment is
+    pointed at the runtime directory and home (for the Pulse cookie) of the
+    user running the audio server. The owner is looked up on every call,
+    since the session may start after AirTIGHT does.
+    """
+    env = dict(os.environ)
+    uid = session_owner() if os.geteuid() == 0 else None
+    if not uid:
+        return env
+    runtime = f"/run/user/{uid}"
+    env["XDG_RUNTIME_DIR"] = runtime
+    env["PULSE_SERVER"] = f"unix:{runtime}/pulse/native"
+    try:
+        env["HOME"] = pwd.getpwuid(uid).pw_dir
+    except KeyError:
+        pass
+    return env
+
+
+def list_threads(pid):
+    """Returns [(tid, comm)] for every thread of `pid` (empty if the process is gone)."""
+    try:
+        tids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    return [(int(tid), read_text(f"/proc/{pid}/task/{tid}/comm")) for tid in tids if tid.isdigit()]
+
+
+def thread_identity(pid, tid, proc="/proc"):
+    """(comm, starttime) of one thread, or None once it is gone.
+
+    A TID is reused after its thread exits (a PipeWire restart, a reboot);
+    the start time, field 22 of stat in clock ticks since boot, tells the
+    new thread apart from the one that was journaled.
+    """
+    stat = read_text(f"{proc}/{pid}/task/{tid}/stat")
+    # Fields after the parenthesised comm start at field 3 (state); see proc(5).
+    fields = stat[stat.rfind(")") + 2:].split()
+    if len(fields) < 20:
+        return None
+    return stat[stat.find("(") + 1:stat.rfind(")")], int(fields[19])
+
+
+def parse_cpulist(text):
+    """Parses a kernel CPU list such as "0-3,6" into a sorted list of ints."""
+    cpus = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+def format_cpulist(cpus):
+    """Inverse of parse_cpulist, in the kernel's own range notation."""
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(lo) if lo == hi else f"{lo}-{hi}" for lo, hi in ranges)
+
+
+def read_cpu_times(path="/proc/stat"):
+    """Aggregate (busy, total) clock ticks from the `cpu` line of /proc/stat.
+
+    Idle and iowait count as idle; guest time is already included in user.
+    """
+    with open(path, "r") as f:
+        fields = [int(v) for v in f.readline().split()[1:9]]
+    total = sum(fields)
+    return total - fields[3] - fields[4], total
+
+
+def read_meminfo(path="/proc/meminfo"):
+    """Returns {field: kB} from /proc/meminfo."""
+    info = {}
+    for line in read_text(path).splitlines():
+        key, _, rest = line.partition(":")
+        value = rest.split()
+        if value:
+            info[key] = int(value[0])
+    return info
+
+
+def memory_percent(meminfo=None):
+    """Used memory in percent, counted like psutil: total minus MemAvailable."""
+    info = meminfo if meminfo is not None else read_meminfo()
+    total = info.get("MemTotal", 0)
+    if not total:
+        return 0.0
+    return round((total - info.get("MemAvailable", info.get("MemFree", 0))) / total * 100, 1)
+
+
+class CpuPercent:
+    """System CPU usage between calls from /proc/stat deltas, like psutil.cpu_percent(interval=None)."""
+
+    def __init__(self):
+        self.previous = read_cpu_times()
+
+    def sample(self):
+        busy, total = read_cpu_times()
+        before_busy, before_total = self.previous
+        self.previous = (busy, total)
+        if total <= before_total:
+            return 0.0
+        return round(max(0, busy - before_busy) / (total - before_total) * 100, 1)
@@ -1,6 +1,27 @@
-import subprocess
+import hashlib
+import os
 import shutil
 import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.overhead import meter
+from src.procfs import find_processes, read_text
+from src.state import cache_dir, load_json, save_json
+
+
+PCI_ROOT = "/sys/bus/pci/devices"
+USB_ROOT = "/sys/bus/usb/devices"
+
+
+def audio_server():
+    """Name of the running audio server, from one /proc scan."""
+    names = set(find_processes(("pipewire", "pulseaudio")).values())
+    if "pipewire" in names:
+        return "PipeWire"
+    if "pulseaudio" in names:
+        return "PulseAudio (Legacy)"
+    return "ALSA/Unknown"
 
 
 class Profiler:
@@ -13,47 +34,55 @@ class Profiler:
             "14e4": "Broadcom"
         }
 
+        # USB vendor IDs of the Bluetooth halves of common combo chips.
+        self.usb_vendors = {
+            "0bda": "Realtek",
+            "8087": "Intel",
+            "0e8d": "MediaTek",
+            "0cf3": "Qualcomm",
+            "0a5c": "Broadcom"
+        }
+
+        self.cache_path = os.path.join(cache_dir(), "profile.json")
+
         self.profile = {
             "init_system": "Unknown",
             "vendor_name": "Unknown",
             "chip_id": "Unknown",
-            "distro": self.get_distro(),
+            "distro": "Unknown",
             "audio_server": "Unknown",
+            "audio_pci": [],
+            "wifi_pci": None,
+            "bt_usb": [],
+            "boot_id": None,
+            "fingerprint": None,
+            "cached": False,
             "missing_deps": []
         }
 
    
 
     def get_distro(self):
-        try:
-            return subprocess.check_output(["lsb_release", "-sd"], text=True).strip()
-        except Exception:
-            return platform.system()
+        fields = {}
+        for line in read_text("/etc/os-release").splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                fields[key] = value.strip().strip('"')
+        return fields.get("PRETTY_NAME") or fields.get("NAME") or platform.system()
+
+    def detect_distro(self):
+        self.profile["distro"] = self.get_distro()
 
     def detect_init(self):
-        try:
-            init = subprocess.check_output(
-                ["ps", "-p", "1", "-o", "comm="],
-                text=True
-            ).strip()
+        init = read_text("/proc/1/comm")
+        if init:
             self.profile["init_system"] = init
-        except Exception:
-            pass
         return self.profile["init_system"]
 
     
 
     def detect_audio_server(self):
-        try:
-            output = subprocess.check_output(["ps", "-A"], text=True).lower()
-            if "pipewire" in output:
-                self.profile["audio_server"] = "PipeWire"
-            elif "pulseaudio" in output:
-                self.profile["audio_server"] = "PulseAudio (Legacy)"
-            else:
-                self.profile["audio_server"] = "ALSA/Unknown"
-        except Exception:
-            self.profile["audio_server"] = "Unknown"
+        self.profile["audio_server"] = audio_server()
 
     def get_upgrade_command(self):
         distro_cmds = {
@@ -71,20 +100,15 @@ class Profiler:
 
     def check_dependencies(self):
         deps = {
-            "lspci": "pciutils",
             "pw-top": "pipewire",
             "bluetoothctl": "bluez"
         }
 
+        self.profile["missing_deps"] = []
         for cmd, pkg in deps.items():
             if not shutil.which(cmd):
                 self.profile["missing_deps"].append(pkg)
 
-        try:
-            import psutil  
-        except ImportError:
-            self.profile["missing_deps"].append("python3-psutil")
-
     def get_install_hint(self):
         missing = self.profile["missing_deps"]
         if not missing:
@@ -102,26 +126,128 @@ class Profiler:
     
 
     def detect_hardware(self):
+        """Finds the Wi-Fi chip and audio controllers from PCI vendor/class IDs in sysfs."""
+        audio = []
+        wifi = None
+        bt = self.detect_bluetooth()
+
+        for slot, vendor, device, pci_class in self._pci_devices():
+            if pci_class.startswith("0403"):
+                audio.append(slot)
+            # 0x0280 = network controller (Wi-Fi), 0x0d = wireless controller
+            elif wifi is None and (pci_class.startswith("0280") or pci_class.startswith("0d")):
+                wifi = (slot, vendor, device, pci_class)
+
+        self.profile["audio_pci"] = audio
+
+        if wifi is not None:
+            slot, vendor, device, pci_class = wifi
+            name = self.vendors.get(vendor)
+            self.profile["wifi_pci"] = slot
+            self.profile["chip_id"] = f"{slot} Network controller [{pci_class[:4]}]: [{vendor}:{device}]"
+            if name:
+                self.profile["vendor_name"] = name
+                return
+
+        for usb_id in bt:
+            name = self.usb_vendors.get(usb_id.split(":")[0])
+            if name:
+                self.profile["vendor_name"] = name
+                if wifi is None:
+                    self.profile["chip_id"] = f"USB Bluetooth [{usb_id}]"
+                return
+
+        self.profile["vendor_name"] = "Generic/Not Found"
+
+    def detect_bluetooth(self):
+        """Lists USB Bluetooth adapters (interface class e0/01/01) as vendor:product IDs."""
+        adapters = []
+        ids = []
         try:
-            output = subprocess.check_output(["lspci", "-nn"], text=True)
-            for line in output.splitlines():
-                if "Network" in line or "Wireless" in line:
-                    for vid, name in self.vendors.items():
-                        if vid in line:
-                            self.profile["vendor_name"] = name
-                            self.profile["chip_id"] = line.strip()
-                            return
-            self.profile["vendor_name"] = "Generic/Not Found"
-        except Exception as e:
-            self.profile["vendor_name"] = f"Error: {e}"
+            entries = os.listdir(USB_ROOT)
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            if ":" not in entry:
+                continue
+            base = os.path.join(USB_ROOT, entry)
+            if (read_text(f"{base}/bInterfaceClass") == "e0"
+                    and read_text(f"{base}/bInterfaceSubClass") == "01"
+                    and read_text(f"{base}/bInterfaceProtocol") == "01"):
+                device = entry.split(":")[0]
+                if device in adapters:
+                    continue
+                adapters.append(device)
+                ids.append(f"{read_text(f'{USB_ROOT}/{device}/idVendor')}:"
+                           f"{read_text(f'{USB_ROOT}/{device}/idProduct')}")
+
+        self.profile["bt_usb"] = adapters
+        return ids
+
+    def _pci_devices(self):
+        try:
+            slots = sorted(os.listdir(PCI_ROOT))
+        except OSError:
+            return []
+
+        devices = []
+        for slot in slots:
+            base = os.path.join(PCI_ROOT, slot)
+            devices.append((
+                slot,
+                read_text(f"{base}/vendor")[2:],
+                read_text(f"{base}/device")[2:],
+                read_text(f"{base}/class")[2:]
+            ))
+        return devices
+
+    def hardware_fingerprint(self):
+        """Hash of the PCI device list and USB topology; changes when hardware is added or swapped."""
+        digest = hashlib.sha1()
+        for device in self._pci_devices():
+            digest.update(" ".join(device).encode())
+        try:
+            digest.update(" ".join(sorted(os.listdir(USB_ROOT))).encode())
+        except OSError:
+            pass
+        return digest.hexdigest()
 
    
 
-    def run_audit(self):
-        self.detect_init()
+    def run_audit(self, refresh=False):
+        """Returns the system profile, reusing the on-disk cache while boot and hardware are unchanged.
+
+        Only hardware, distro and init facts are cached. The audio server is
+        detected on every call (one /proc scan), since it can start or change
+        after boot, e.g. after a daemon that audited before the user logged in.
+        """
+        started = time.perf_counter_ns()
+        boot_id = read_text("/proc/sys/kernel/random/boot_id")
+        fingerprint = self.hardware_fingerprint()
+
+        cached = None if refresh else load_json(self.cache_path)
+        if cached and cached.get("boot_id") == boot_id and cached.get("fingerprint") == fingerprint:
+            cached.pop("audio_server", None)
+            self.profile.update(cached)
+            self.profile["cached"] = True
+        else:
+            probes = [self.detect_distro, self.detect_init, self.detect_hardware]
+            with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+                for future in [pool.submit(probe) for probe in probes]:
+                    future.result()
+
+            self.profile["boot_id"] = boot_id
+            self.profile["fingerprint"] = fingerprint
+            self.profile["cached"] = False
+            save_json(self.cache_path, {
+                key: value for key, value in self.profile.items()
+                if key not in ("cached", "missing_deps", "audio_server")
+            })
+
         self.detect_audio_server()
-        self.detect_hardware()
         self.check_dependencies()
+        meter.add("audit", started)
         return self.profile
 
     
@@ -137,6 +263,8 @@ class Profiler:
         print(f"[*] Audio Server : {self.profile['audio_server']}")
         print(f"[*] Chip Vendor  : {self.profile['vendor_name']}")
         print(f"[*] Device ID    : {chip_display}")
+        if self.profile["cached"]:
+            print("[*] Profile      : cached (unchanged boot & hardware)")
         print("─" * 50)
 
         if self.profile["audio_server"] != "PipeWire":
@@ -0,0 +1,199 @@
+import os
+import re
+import shlex
+import subprocess
+import time
+
+from src.overhead import meter
+from src.procfs import session_env
+from src.state import load_json, save_json, state_dir
+
+
+DEFAULT_CANDIDATES = [16, 32, 48, 64, 96, 128, 192, 256, 384, 512, 768, 1024]
+
+
+def set_quantum(q):
+    """Forces the PipeWire graph quantum (0 restores PipeWire's own choice)."""
+    meter.spawned("pw-metadata")
+    subprocess.run([
+        "pw-metadata", "-n", "settings", "0",
+        "clock.force-quantum", str(q)
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=session_env())
+
+
+def forced_quantum():
+    """The current clock.force-quantum setting (0 if none is forced or it cannot be read)."""
+    meter.spawned("pw-metadata")
+    try:
+        out = subprocess.run(["pw-metadata", "-n", "settings", "0"],
+                             capture_output=True, text=True, timeout=5, env=session_env()).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return 0
+    match = re.search(r"key:'clock.force-quantum' value:'(\d+)'", out)
+    return int(match.group(1)) if match else 0
+
+
+def results_path():
+    return os.path.join(state_dir(), "quantum.json")
+
+
+def active_output(nodes):
+    """Picks the running driver node that has the most followers (the device being played to)."""
+    followers = {}
+    for node in nodes.values():
+        if not node.is_driver:
+            followers[node.driver] = followers.get(node.driver, 0) + 1
+
+    drivers = [n for n in nodes.values() if n.is_driver and n.state == "R" and n.rate]
+    if not drivers:
+        return None
+    return max(drivers, key=lambda n: followers.get(n.id, 0))
+
+
+class QuantumTuner:
+    """Binary-searches the lowest quantum that holds a target xrun rate.
+
+    Stability is assumed to grow with the quantum, so each probe halves the
+    remaining range. A probe fails as soon as its xrun budget is exceeded rather
+    than always sitting out the full dwell time. With `measure_latency`, each
+    stable quantum also gets a measured round-trip latency (see LatencyProbe).
+    """
+
+    def __init__(self, monitor, target_rate=0.0, dwell=10.0, settle=1.0, candidates=None, measure_latency=False):
+        self.monitor = monitor
+        self.target_rate = target_rate
+        self.dwell = dwell
+        self.settle = settle
+        self.candidates = sorted(candidates or DEFAULT_CANDIDATES)
+        self.measure_latency = measure_latency
+        self.latency = None
+        self.trials = []
+
+    def probe(self, quantum):
+        """Runs one trial; returns (stable, xruns, seconds_spent)."""
+        set_quantum(quantum)
+        time.sleep(self.settle)
+
+        budget = self.target_rate * self.dwell / 60.0
+        start_total = self.monitor.get_xrun_total()
+        start = time.monotonic()
+        xruns = 0
+
+        while True:
+            elapsed = time.monotonic() - start
+            xruns = self.monitor.get_xrun_total() - start_total
+            if xruns > budget:
+                stable = False
+                break
+            if elapsed >= self.dwell:
+                stable = True
+                break
+            time.sleep(0.25)
+
+        trial = {"quantum": quantum, "stable": stable, "xruns": xruns, "seconds": round(elapsed, 1)}
+        verdict = "✓ stable" if stable else "✗ xruns"
+        measured = self.latency.measure() if stable and self.latency is not None else None
+        if measured:
+            trial["latency_ms"] = measured["latency_ms"]
+            trial["latency_jitter_ms"] = measured["latency_jitter_ms"]
+            verdict += f", {measured['latency_ms']:.2f} ms round trip (±{measured['latency_jitter_ms']:.2f})"
+        self.trials.append(trial)
+        print(f"[*] Quantum {quantum:>5}: {verdict} ({xruns} xruns in {elapsed:.1f}s)")
+        return stable, xruns, elapsed
+
+    def search(self):
+        """Returns the lowest stable quantum among the candidates (None if even the largest fails)."""
+        lo, hi = 0, len(self.candidates) - 1
+
+        if not self.probe(self.candidates[hi])[0]:
+            return None
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.probe(self.candidates[mid])[0]:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        return self.candidates[hi]
+
+    def tune(self, load_cmd=None, apply=False):
+        nodes = self.monitor.collector.nodes
+        output = active_output(nodes)
+        device = output.name if output else "default"
+        rate = output.rate if output else 48000
+
+        print(f"[*] Tuning quantum for {device} @ {rate} Hz "
+              f"(target ≤ {self.target_rate} xruns/min, ≤ {self.dwell:.0f}s per step)")
+
+        if self.measure_latency:
+            from src.probes.latency import LatencyProbe
+            if LatencyProbe.available():
+                self.latency = LatencyProbe(rate=rate)
+            else:
+                print("[!] Latency probe needs pactl, pw-loopback, pw-play and pw-record; skipping measurements.")
+
+        best = None
+        load = None
+        previous = forced_quantum()
+        if load_cmd:
+            load = subprocess.Popen(shlex.split(load_cmd), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        try:
+            best = self.search()
+        finally:
+            if load is not None:
+                load.terminate()
+                load.wait()
+            # Without --apply, whatever was forced before tuning (usually nothing) comes back.
+            set_quantum(best if apply and best else previous)
+
+        if best is None:
+            print("[!] No candidate quantum met the target under this load.")
+            return None
+
+        result = {
+            "quantum": best,
+            "latency_ms": round(best * 1000.0 / rate, 2),
+            "target_rate": self.target_rate,
+            "load": load_cmd,
+            "trials": self.trials,
+            "time": int(time.time())
+        }
+        measured = [t for t in self.trials if t["quantum"] == best and "latency_ms" in t]
+        if measured:
+            result["measured_latency_ms"] = measured[-1]["latency_ms"]
+            result["measured_jitter_ms"] = measured[-1]["latency_jitter_ms"]
+        data = load_json(results_path(), {})
+        data[f"{device}@{rate}"] = result
+        save_json(results_path(), data)
+
+        print(f"[✓] Lowest stable quantum: {best} ({result['latency_ms']} ms per cycle)")
+        if "measured_latency_ms" in result:
+            print(f"[✓] Measured round trip at {best}: {result['measured_latency_ms']} ms "
+                  f"(jitter {result['measured_jitter_ms']} ms)")
+        return result
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.monitor import PerformanceMonitor
+
+    parser = argparse.ArgumentParser(description="Find the lowest stable PipeWire quantum")
+    parser.add_argument("--target", type=float, default=0.0, help="acceptable xruns per minute")
+    parser.add_argument("--dwell", type=float, default=10.0, help="max seconds per step")
+    parser.add_argument("--load", help="command to run as background load during the search")
+    parser.add_argument("--apply", action="store_true", help="keep the best quantum forced afterwards")
+    parser.add_argument("--measure-latency", action="store_true",
+                        help="measure round-trip latency at every stable quantum (null sink + MLS)")
+    args = parser.parse_args()
+
+    monitor = PerformanceMonitor()
+    time.sleep(2)  # let the pw-top collector take its baseline snapshot
+    try:
+        QuantumTuner(monitor, target_rate=args.target, dwell=args.dwell,
+                     measure_latency=args.measure_latency).tune(args.load, args.apply)
+    except KeyboardInterrupt:
+        print("\n[*] Tuning aborted. Previous quantum restored.")
+    finally:
+        monitor.close()
@@ -0,0 +1,275 @@
+import mmap
+import os
+import struct
+import time
+
+from src.state import state_dir
+
+
+MAGIC = b"ATLOG1\0\0"
+HEADER = struct.Struct("<8sHHH")
+# Header bytes (fixed part plus the comma-separated field names) per format version.
+HEADER_SIZES = {1: 256, 2: 1024}
+VERSION = 2
+HEADER_SIZE = HEADER_SIZES[VERSION]
+
+# Float32 sample fields, in record order. New fields are appended at the end;
+# each file's header lists its own fields, so older logs stay readable. Every
+# metric a default rule reads must be recorded, or replay cannot reproduce it.
+FIELDS = (
+    "cpu", "ram", "new_xruns", "lateness",
+    "sched_delay_us", "sched_invol_rate", "sched_non_rt", "sched_starved",
+    "wifi_pps", "wifi_retries", "bt_kbps", "coex_corr",
+    "audio_core", "audio_core_busy", "audio_core_irq", "audio_core_steal", "core_max",
+    "latency_ms", "latency_jitter_ms", "psi_cpu", "psi_io", "psi_max", "noisy_share",
+    "bt_xruns", "bt_link_poor", "psi_mem", "audio_majflt", "swap_in", "compact_stall", "direct_reclaim",
+    "mem_xrun_share", "xrun_risk"
+)
+
+KIND_SAMPLE = 0
+KIND_EVENT = 1
+
+EVENTS = ("applied", "kept", "rolled_back")
+# Action codes stored in event records. Append only: the index is on disk.
+EVENT_ACTIONS = (
+    "APPLY_RT_SCHEDULER_BOOST",
+    "APPLY_BLUETOOTH_COEX_FIX",
+    "DISABLE_AUDIO_POWER_SAVE",
+    "APPLY_IRQ_AFFINITY",
+    "APPLY_CGROUP_ISOLATION",
+    "APPLY_BLUETOOTH_CODEC_FALLBACK",
+    "APPLY_MEMORY_STALL_FIX"
+)
+
+
+def log_dir():
+    return os.path.join(state_dir(), "telemetry")
+
+
+def log_files(directory=None):
+    """Log files in chronological order (their names start with the creation time)."""
+    directory = directory or log_dir()
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.startswith("telemetry-") and n.endswith(".bin"))
+    except OSError:
+        return []
+    return [os.path.join(directory, n) for n in names]
+
+
+def _record_struct(count):
+    # time, kind, code, reserved, then one float32 per field.
+    return struct.Struct(f"<dBBH{count}f")
+
+
+class TelemetryLog:
+    """Append-only log of fixed-size binary records (samples and daemon events).
+
+    One sample costs 8 + 4 + 4 * len(FIELDS) bytes (140 bytes, about 12.1 MB per day
+    at 1 Hz). Files rotate at `max_file_bytes` and the oldest are deleted once
+    the directory exceeds `max_total_bytes`. Writes go through a buffered file
+    and are flushed every `flush_interval` seconds.
+    """
+
+    def __init__(self, directory=None, max_file_bytes=8 << 20, max_total_bytes=64 << 20, flush_interval=5.0):
+        self.directory = directory or log_dir()
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.flush_interval = flush_interval
+        self.record = _record_struct(len(FIELDS))
+        self.file = None
+        self.size = 0
+        self.sequence = 0
+        self._last_flush = 0.0
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        name = time.strftime("telemetry-%Y%m%d-%H%M%S", time.localtime())
+        # The sequence suffix keeps names unique and sortable when files rotate within a second.
+        while True:
+            path = os.path.join(self.directory, f"{name}-{self.sequence % 1000:03d}.bin")
+            self.sequence += 1
+            if not os.path.exists(path):
+                break
+
+        header = HEADER.pack(MAGIC, VERSION, self.record.size, len(FIELDS)) + ",".join(FIELDS).encode()
+        if len(header) > HEADER_SIZE:
+            raise ValueError("too many telemetry fields for the log header")
+        self.file = open(path, "wb")
+        self.file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self.size = HEADER_SIZE
+        self._prune()
+
+    def _prune(self):
+        files = log_files(self.directory)
+        sizes = [os.path.getsize(f) for f in files]
+        # The file being written (always the newest) is never deleted; count it at the size it
+        # will rotate at, so the directory stays within max_total_bytes until the next rotation.
+        total = sum(sizes[:-1]) + self.max_file_bytes
+        for path, size in zip(files[:-1], sizes):
+            if total <= self.max_total_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def _write(self, t, kind, code, values):
+        if self.file is None or self.size + self.record.size > self.max_file_bytes:
+            self.close()
+            self._open()
+        self.file.write(self.record.pack(t, kind, code, 0, *values))
+        self.size += self.record.size
+
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.file.flush()
+            self._last_flush = now
+
+    def append(self, sample):
+        """Sampler listener: records one monitor sample."""
+        self._write(sample.get("time", time.time()), KIND_SAMPLE, 0,
+                    [float(sample.get(name, 0.0) or 0.0) for name in FIELDS])
+
+    def event(self, event, action):
+        """Records a daemon event; the action code goes in the first field slot."""
+        code = EVENT_ACTIONS.index(action) if action in EVENT_ACTIONS else 255
+        self._write(time.time(), KIND_EVENT, EVENTS.index(event), [float(code)] + [0.0] * (len(FIELDS) - 1))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_log(path, chunk=4096):
+    """Yields (time, kind, code, {field: value}) from one log file via mmap.
+
+    With NumPy the mapped records are viewed as a structured array without
+    copying; otherwise struct.iter_unpack walks the mapping. A torn last record
+    (from a crash mid-write) is ignored.
+    """
+    # Imported here rather than at module level so `airtight status` starts fast.
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZES[1]:
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data = view = None
+    try:
+        magic, version, record_size, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version not in HEADER_SIZES:
+            raise ValueError(f"{path} is not an AirTIGHT telemetry log")
+        header_size = HEADER_SIZES[version]
+        names = bytes(mm[HEADER.size:header_size]).rstrip(b"\0").decode().split(",")[:count]
+        total = max(0, len(mm) - header_size) // record_size
+
+        if np is not None:
+            dtype = np.dtype([("time", "<f8"), ("kind", "u1"), ("code", "u1"), ("reserved", "<u2")]
+                             + [(name, "<f4") for name in names])
+            data = np.frombuffer(mm, dtype=dtype, count=total, offset=header_size)
+            for start in range(0, total, chunk):
+                for row in data[start:start + chunk].tolist():
+                    yield row[0], row[1], row[2], dict(zip(names, row[4:]))
+        else:
+            record = _record_struct(count)
+            view = memoryview(mm)[header_size:header_size + total * record_size]
+            for row in record.iter_unpack(view):
+                yield row[0], row[1], row[2], dict(zip(names, row[4:]))
+    finally:
+        # Views into the mapping must go before it can be closed.
+        data = None
+        if view is not None:
+            view.release()
+        mm.close()
+
+
+def last_sample(path):
+    """(time, {field: value}) of the newest sample record in one log file, or None.
+
+    Reads only the header and the tail of the file, so it stays cheap on a
+    full 8 MB log.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZES[1])
+            if len(header) < HEADER_SIZES[1]:
+                return None
+            magic, version, record_size, count = HEADER.unpack_from(header, 0)
+            if magic != MAGIC or version not in HEADER_SIZES:
+                return None
+            header_size = HEADER_SIZES[version]
+            header += f.read(header_size - len(header))
+            names = header[HEADER.size:].rstrip(b"\0").decode().split(",")[:count]
+            record = _record_struct(count)
+            total = max(0, os.fstat(f.fileno()).st_size - header_size) // record_size
+            # Daemon events are interleaved with samples; look back a few records.
+            for index in range(total - 1, max(-1, total - 65), -1):
+                f.seek(header_size + index * record_size)
+                row = record.unpack(f.read(record_size))
+                if row[1] == KIND_SAMPLE:
+                    return row[0], dict(zip(names, row[4:]))
+    except OSError:
+        pass
+    return None
+
+
+def replay(paths, profile, rules=None, since=None, until=None):
+    """Feeds recorded samples through a fresh DecisionEngine.
+
+    Returns a summary with every action the rules would have fired (and when)
+    next to the events the daemon actually recorded.
+    """
+    from src.decision_engine import DecisionEngine
+
+    engine = DecisionEngine(profile, rules=rules)
+    summary = {"samples": 0, "xruns": 0, "start": None, "end": None, "fired": [], "events": []}
+
+    for path in paths:
+        for t, kind, code, values in read_log(path):
+            if (since is not None and t < since) or (until is not None and t > until):
+                continue
+            if kind == KIND_EVENT:
+                index = int(next(iter(values.values()), 255))
+                action = EVENT_ACTIONS[index] if index < len(EVENT_ACTIONS) else "UNKNOWN"
+                summary["events"].append((t, EVENTS[code] if code < len(EVENTS) else "?", action))
+                continue
+
+            values["time"] = t
+            summary["samples"] += 1
+            summary["xruns"] += int(values.get("new_xruns", 0))
+            summary["start"] = t if summary["start"] is None else summary["start"]
+            summary["end"] = t
+            for action in engine.observe(values):
+                summary["fired"].append((t, action))
+
+    summary["plan"] = engine.analyze()
+    return summary
+
+
+def print_replay(summary):
+    if not summary["samples"]:
+        print("[!] No recorded samples in range.")
+        return
+
+    fmt = "%Y-%m-%d %H:%M:%S"
+    span = summary["end"] - summary["start"]
+    print(f"[*] Replayed {summary['samples']} samples "
+          f"({time.strftime(fmt, time.localtime(summary['start']))} → "
+          f"{time.strftime(fmt, time.localtime(summary['end']))}, {span / 3600:.1f} h), "
+          f"{summary['xruns']} xruns.")
+
+    timeline = [(t, f"rule fired: {action}") for t, action in summary["fired"]]
+    timeline += [(t, f"recorded:   {action} {event}") for t, event, action in summary["events"]]
+    for t, line in sorted(timeline):
+        print(f"  {time.strftime(fmt, time.localtime(t))}  {line}")
+
+    counts = {}
+    for _, action in summary["fired"]:
+        counts[action] = counts.get(action, 0) + 1
+    for action, count in sorted(counts.items()):
+        print(f"[*] {action}: fired {count}x")
+    if not counts:
+        print("[✓] No rule would have fired.")
@@ -0,0 +1,239 @@
+import bisect
+import operator
+import time
+from collections import deque
+
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le
+}
+
+AGGREGATES = ("last", "mean", "sum", "rate", "max", "min", "p95", "fraction")
+
+
+class Condition:
+    """`agg(metric over the last `window` seconds) op threshold`.
+
+    `clear` is the hysteresis threshold: once the rule is active, the condition
+    keeps holding until the aggregate crosses `clear` instead of `threshold`.
+    Aggregates: last, mean, sum, rate (sum per minute), max, min, p95, and
+    fraction (share of samples where the metric is non-zero).
+    """
+
+    __slots__ = ("metric", "agg", "window", "op", "threshold", "clear")
+
+    def __init__(self, metric, agg, window, op, threshold, clear=None):
+        if agg not in AGGREGATES:
+            raise ValueError(f"unknown aggregate {agg!r}")
+        if op not in OPERATORS:
+            raise ValueError(f"unknown operator {op!r}")
+        self.metric = metric
+        self.agg = agg
+        self.window = window
+        self.op = op
+        self.threshold = threshold
+        self.clear = threshold if clear is None else clear
+
+    def __repr__(self):
+        return f"{self.agg}({self.metric}, {self.window}s) {self.op} {self.threshold}"
+
+
+class Rule:
+    """Recommends `action` when all conditions hold for `hold` seconds.
+
+    `requires` is a predicate on the system profile, checked once at compile
+    time. After firing, the rule is not re-armed for `cooldown` seconds.
+    `confidence` is the rule's base confidence; the reported value is scaled by
+    how far the weakest condition is past its threshold. `warmup` is how many
+    seconds of samples a probe needs before the rule's metrics can hold at all
+    (e.g. a correlation window).
+    """
+
+    def __init__(self, name, action, conditions, hold=0.0, cooldown=0.0, confidence=1.0, requires=None,
+                 warmup=0.0):
+        self.name = name
+        self.action = action
+        self.conditions = conditions
+        self.hold = hold
+        self.cooldown = cooldown
+        self.confidence = confidence
+        self.requires = requires
+        self.warmup = warmup
+
+
+class WindowStat:
+    """Incrementally maintained aggregates of one metric over a sliding time window."""
+
+    def __init__(self, window, sorted_values=False):
+        self.window = window
+        self.samples = deque()
+        self.total = 0.0
+        self.nonzero = 0
+        self.maxq = deque()
+        self.minq = deque()
+        self.sorted = [] if sorted_values else None
+        self.seq = 0
+
+    def push(self, t, value):
+        self.seq += 1
+        self.samples.append((t, value, self.seq))
+        self.total += value
+        if value:
+            self.nonzero += 1
+
+        # Monotonic deques give O(1) amortised max/min.
+        while self.maxq and self.maxq[-1][1] <= value:
+            self.maxq.pop()
+        self.maxq.append((self.seq, value))
+        while self.minq and self.minq[-1][1] >= value:
+            self.minq.pop()
+        self.minq.append((self.seq, value))
+
+        if self.sorted is not None:
+            bisect.insort(self.sorted, value)
+
+        cutoff = t - self.window
+        while self.samples and self.samples[0][0] <= cutoff:
+            _, old, seq = self.samples.popleft()
+            self.total -= old
+            if old:
+                self.nonzero -= 1
+            if self.maxq[0][0] == seq:
+                self.maxq.popleft()
+            if self.minq[0][0] == seq:
+                self.minq.popleft()
+            if self.sorted is not None:
+                del self.sorted[bisect.bisect_left(self.sorted, old)]
+
+    def value(self, agg):
+        count = len(self.samples)
+        if not count:
+            return 0.0
+        if agg == "last":
+            return self.samples[-1][1]
+        if agg == "mean":
+            return self.total / count
+        if agg == "sum":
+            return self.total
+        if agg == "rate":
+            return self.total * 60.0 / self.window
+        if agg == "max":
+            return self.maxq[0][1]
+        if agg == "min":
+            return self.minq[0][1]
+        if agg == "fraction":
+            return self.nonzero / count
+        if agg == "p95":
+            return self.sorted[min(count - 1, int(0.95 * count))]
+        raise ValueError(agg)
+
+
+class _CompiledRule:
+    __slots__ = ("rule", "checks", "active", "since", "last_fired", "confidence")
+
+    def __init__(self, rule, checks):
+        self.rule = rule
+        self.checks = checks
+        self.active = False
+        self.since = None
+        self.last_fired = None
+        self.confidence = 0.0
+
+
+class RuleEngine:
+    """Evaluates a rule set sample by sample.
+
+    Rules are compiled once: conditions on the same (metric, window) share one
+    WindowStat, and each condition becomes a closure over it, so a new sample
+    costs one push per distinct window plus one comparison per condition.
+    """
+
+    def __init__(self, rules, profile=None):
+        self.windows = {}
+        self.metrics = {}
+        self.compiled = []
+        profile = profile or {}
+
+        for rule in rules:
+            if rule.requires is not None and not rule.requires(profile):
+                continue
+            checks = [self._compile(c) for c in rule.conditions]
+            self.compiled.append(_CompiledRule(rule, checks))
+
+    def _compile(self, condition):
+        key = (condition.metric, condition.window)
+        stat = self.windows.get(key)
+        if stat is None:
+            stat = WindowStat(condition.window)
+            self.windows[key] = stat
+            self.metrics.setdefault(condition.metric, []).append(stat)
+        if condition.agg == "p95" and stat.sorted is None:
+            stat.sorted = sorted(v for _, v, _ in stat.samples)
+
+        compare = OPERATORS[condition.op]
+        agg = condition.agg
+        enter, clear = condition.threshold, condition.clear
+        scale = abs(enter) or 1.0
+        sign = 1 if condition.op in (">", ">=") else -1
+
+        def check(active):
+            value = stat.value(agg)
+            holds = compare(value, clear if active else enter)
+            # 0.5 at the threshold, 1.0 once a full threshold-width past it.
+            score = max(0.0, min(1.0, 0.5 + 0.5 * sign * (value - enter) / scale))
+            return holds, score
+
+        return check
+
+    def settle_time(self):
+        """Seconds of samples after which every compiled rule can have fired."""
+        return max((s.rule.warmup + s.rule.hold for s in self.compiled), default=0.0)
+
+    def observe(self, sample):
+        """Feeds one sample; returns the actions that newly fired on it."""
+        t = sample.get("mono", sample.get("time"))
+        if t is None:
+            t = time.monotonic()
+
+        for metric, stats in self.metrics.items():
+            value = float(sample.get(metric, 0) or 0)
+            for stat in stats:
+                stat.push(t, value)
+
+        fired = []
+        for state in self.compiled:
+            rule = state.rule
+            results = [check(state.active) for check in state.checks]
+            holds = all(h for h, _ in results)
+            state.confidence = rule.confidence * min((s for _, s in results), default=1.0) if holds else 0.0
+
+            if not holds:
+                state.active = False
+                state.since = None
+                continue
+            if state.active:
+                continue
+            if state.since is None:
+                state.since = t
+            if t - state.since < rule.hold:
+                continue
+            if state.last_fired is not None and t - state.last_fired < rule.cooldown:
+                continue
+
+            state.active = True
+            state.last_fired = t
+            fired.append(rule.action)
+
+        return fired
+
+    def active(self):
+        """Returns {action: confidence} for every currently active rule (highest confidence wins)."""
+        result = {}
+        for state in self.compiled:
+            if state.active:
+                action = state.rule.action
+                result[action] = max(result.get(action, 0.0), round(state.confidence, 2))
+        return result
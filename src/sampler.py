@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+from src.overhead import meter
+
+
+class Sampler:
+    """Samples a PerformanceMonitor on a fixed monotonic cadence from a dedicated thread."""
+
+    def __init__(self, monitor, rate_hz=1.0, backlog=256):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+
+        self.monitor = monitor
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.queue = queue.Queue(maxsize=backlog)
+        self.listeners = []
+        self.missed_ticks = 0
+        self._new_period = None
+        self.thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, name="airtight-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2 * self.period + 1)
+            self.thread = None
+
+    def set_rate(self, rate_hz):
+        """Changes the cadence; takes effect from the next tick."""
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.rate_hz = rate_hz
+        self._new_period = 1.0 / rate_hz
+
+    def add_listener(self, callback):
+        """Registers callback(sample), called on the sampler thread for every tick."""
+        self.listeners.append(callback)
+
+    def drain(self):
+        """Discards queued samples so the next read starts from the present."""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def samples(self, count=None):
+        """Yields samples in order; stops after `count` samples if given."""
+        self.start()
+        taken = 0
+        while count is None or taken < count:
+            try:
+                sample = self.queue.get(timeout=self.period + 1)
+            except queue.Empty:
+                if self.thread is None or not self.thread.is_alive():
+                    return
+                continue
+            taken += 1
+            yield sample
+
+    def _run(self):
+        # Deadlines are derived from the start time, never from the previous wake-up,
+        # so scheduling delay and probe time do not accumulate into drift.
+        start = time.monotonic()
+        tick = 0
+
+        while True:
+            if self._new_period is not None:
+                # Re-anchor on the last deadline so the new period starts cleanly.
+                start, tick = start + tick * self.period, 0
+                self.period, self._new_period = self._new_period, None
+
+            tick += 1
+            deadline = start + tick * self.period
+            delay = deadline - time.monotonic()
+
+            if delay < 0:
+                skipped = int(-delay // self.period)
+                if skipped:
+                    tick += skipped
+                    self.missed_ticks += skipped
+                    deadline = start + tick * self.period
+                delay = 0
+
+            if self._stop.wait(delay):
+                return
+
+            started = time.perf_counter_ns()
+            sample = self.monitor.get_stats()
+            meter.add("tick", started)
+            sample["mono"] = deadline
+            sample["lateness"] = time.monotonic() - deadline
+            started = time.perf_counter_ns()
+            self._publish(sample)
+            meter.add("listeners", started)
+
+    def _publish(self, sample):
+        for callback in self.listeners:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"[!] Sampler listener failed: {e}")
+
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+        self.queue.put_nowait(sample)
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+
+
+# Where root (fixes, the system daemon) keeps its data; `airtight status` also reads these.
+SYSTEM_CACHE_DIR = "/var/cache/airtight"
+SYSTEM_STATE_DIR = "/var/lib/airtight"
+
+
+def _base_dir(system_path, xdg_var, fallback):
+    if os.geteuid() == 0:
+        return system_path
+    return os.path.join(os.environ.get(xdg_var) or os.path.expanduser(fallback), "airtight")
+
+
+def cache_dir():
+    """Disposable data (e.g. the hardware profile); safe to delete at any time."""
+    return _base_dir(SYSTEM_CACHE_DIR, "XDG_CACHE_HOME", "~/.cache")
+
+
+def state_dir():
+    """Data that must survive reboots (fix outcomes, tuning results, journals)."""
+    return _base_dir(SYSTEM_STATE_DIR, "XDG_STATE_HOME", "~/.local/state")
+
+
+def journal_path():
+    """Journal of applied optimization runs, read by `airtight revert` and `airtight status`."""
+    return os.path.join(state_dir(), "journal.json")
+
+
+def load_json(path, default=None):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Writes JSON atomically (temp file + rename) so readers never see a partial file.
+
+    Files are world-readable, so `airtight status` run as a user can read what
+    root wrote.
+    """
+    directory = os.path.dirname(path)
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".airtight-")
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+        return True
+    except OSError as e:
+        if tmp and os.path.exists(tmp):
+            os.unlink(tmp)
+        print(f"[!] Could not write {path}: {e}")
+        return False
@@ -0,0 +1,194 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NAN = float("nan")
+
+
+class TelemetryRing:
+    """Fixed-capacity, column-oriented ring buffer of monitor samples.
+
+    Every column is allocated once at construction, so memory use stays flat no
+    matter how long the monitor runs. Window aggregates use NumPy views over the
+    arrays when NumPy is installed and fall back to plain Python otherwise.
+    """
+
+    COLUMNS = ("time", "cpu", "ram", "xruns")
+    # Scalar probe outputs kept alongside the core columns; each gets _p95/_max aggregates.
+    # A missing reading is stored as NaN and left out of them (None if there is none).
+    EXTRA_COLUMNS = ("sched_delay_us", "sched_invol_rate", "sched_non_rt", "wifi_pps", "bt_kbps", "coex_corr",
+                     "audio_core_busy", "audio_core_irq", "core_max", "latency_ms", "latency_jitter_ms",
+                     "psi_cpu", "psi_io", "psi_mem", "noisy_share", "bt_rssi", "bt_xruns",
+                     "audio_majflt", "swap_in", "compact_stall", "direct_reclaim", "mem_xrun_share",
+                     "xrun_risk")
+
+    def __init__(self, capacity=3600, max_nodes=32, columns=COLUMNS + EXTRA_COLUMNS):
+        self.capacity = capacity
+        self.max_nodes = max_nodes
+        self.columns = {name: array("d", bytes(8 * capacity)) for name in columns}
+        self.extras = [name for name in columns if name not in self.COLUMNS]
+        self.nodes = {}
+        self.node_last_seen = {}
+        self.head = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, sample):
+        i = self.head
+        columns = self.columns
+
+        columns["time"][i] = sample.get("time", 0.0)
+        columns["cpu"][i] = sample.get("cpu", 0.0)
+        columns["ram"][i] = sample.get("ram", 0.0)
+        columns["xruns"][i] = sample.get("new_xruns", 0)
+
+        for name in self.extras:
+            value = sample.get(name)
+            columns[name][i] = NAN if value is None else value
+
+        for column in self.nodes.values():
+            column[i] = 0.0
+        for name, count in sample.get("node_xruns", {}).items():
+            column = self.nodes.get(name)
+            if column is None:
+                column = self._add_node(name)
+            column[i] = count
+            self.node_last_seen[name] = i
+
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _add_node(self, name):
+        if len(self.nodes) >= self.max_nodes:
+            # Evict the node whose last xrun is oldest relative to the write head.
+            head = self.head
+            stale = max(self.node_last_seen, key=lambda n: (head - self.node_last_seen[n]) % self.capacity)
+            del self.nodes[stale]
+            del self.node_last_seen[stale]
+
+        column = array("d", bytes(8 * self.capacity))
+        self.nodes[name] = column
+        return column
+
+    def column(self, name):
+        """Returns a column in chronological order (a NumPy array when available)."""
+        return self._ordered(self.columns[name])
+
+    def _ordered(self, column):
+        if np is not None:
+            data = np.frombuffer(column, dtype=np.float64)
+            if self.size < self.capacity:
+                return data[:self.size]
+            return np.concatenate((data[self.head:], data[:self.head]))
+
+        if self.size < self.capacity:
+            return list(column[:self.size])
+        return list(column[self.head:]) + list(column[:self.head])
+
+    def window(self, seconds=None):
+        """Aggregates the most recent `seconds` of samples (all samples if None)."""
+        if self.size == 0:
+            return self._empty_window()
+
+        times = self._ordered(self.columns["time"])
+        start = 0
+        if seconds is not None:
+            cutoff = times[-1] - seconds
+            if np is not None:
+                start = int(np.searchsorted(times, cutoff, side="right"))
+            else:
+                while start < len(times) - 1 and times[start] <= cutoff:
+                    start += 1
+
+        cpu = self._ordered(self.columns["cpu"])[start:]
+        ram = self._ordered(self.columns["ram"])[start:]
+        xruns = self._ordered(self.columns["xruns"])[start:]
+        times = times[start:]
+
+        count = len(times)
+        span = times[-1] - times[0]
+        period = span / (count - 1) if count > 1 else 1.0
+        covered = span + period
+
+        node_xruns = {}
+        for name, column in self.nodes.items():
+            values = self._ordered(column)[start:]
+            total = values.sum() if np is not None else sum(values)
+            if total:
+                node_xruns[name] = int(total)
+
+        if np is not None:
+            p50, p95, p99 = np.percentile(cpu, [50, 95, 99])
+            active = xruns > 0
+            bursts = int(active[0]) + int(np.count_nonzero(active[1:] & ~active[:-1]))
+            total_xruns = int(xruns.sum())
+            cpu_max = float(cpu.max())
+            ram_max = float(ram.max())
+        else:
+            p50, p95, p99 = (_percentile(sorted(cpu), q) for q in (50, 95, 99))
+            active = [x > 0 for x in xruns]
+            bursts = sum(1 for i, a in enumerate(active) if a and (i == 0 or not active[i - 1]))
+            total_xruns = int(sum(xruns))
+            cpu_max = max(cpu)
+            ram_max = max(ram)
+
+        result = {
+            "samples": count,
+            "span": covered,
+            "cpu_p50": round(float(p50), 1),
+            "cpu_p95": round(float(p95), 1),
+            "cpu_p99": round(float(p99), 1),
+            "cpu_max": round(cpu_max, 1),
+            "ram_max": round(ram_max, 1),
+            "xruns": total_xruns,
+            "xrun_rate_per_min": round(total_xruns * 60.0 / covered, 2),
+            "bursts": bursts,
+            "node_xruns": node_xruns
+        }
+
+        for name in self.extras:
+            values = self._ordered(self.columns[name])[start:]
+            if np is not None:
+                values = values[~np.isnan(values)]
+                p95, peak = (float(np.percentile(values, 95)), float(values.max())) if len(values) else (None, None)
+            else:
+                values = sorted(v for v in values if v == v)  # NaN != NaN
+                p95, peak = (_percentile(values, 95), values[-1]) if values else (None, None)
+            result[f"{name}_p95"] = round(p95, 1) if peak is not None else None
+            result[f"{name}_max"] = round(peak, 1) if peak is not None else None
+
+        return result
+
+    def _empty_window(self):
+        result = {
+            "samples": 0,
+            "span": 0.0,
+            "cpu_p50": 0.0,
+            "cpu_p95": 0.0,
+            "cpu_p99": 0.0,
+            "cpu_max": 0.0,
+            "ram_max": 0.0,
+            "xruns": 0,
+            "xrun_rate_per_min": 0.0,
+            "bursts": 0,
+            "node_xruns": {}
+        }
+        for name in self.extras:
+            result[f"{name}_p95"] = None
+            result[f"{name}_max"] = None
+        return result
+
+
+def _percentile(ordered, q):
+    """Linear-interpolated percentile of an already sorted list (matches NumPy's default)."""
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q / 100.0
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
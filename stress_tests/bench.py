@@ -0,0 +1,162 @@
+"""Reproducible audio-stability benchmark.
+
+Sweeps quantum, scheduler mode and synthetic load, and records xruns, node
+busy ratios, the DecisionEngine plan and AirTIGHT's own overhead per run.
+
+    python3 -m stress_tests.bench --fake --duration 10 --out results.json
+
+--fake puts the stand-in pw-top/pw-metadata from stress_tests/fake_pipewire
+first on PATH so the suite runs in CI without PipeWire.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+
+FAKE_PIPEWIRE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_pipewire")
+
+
+def run_case(quantum, load, sched, duration, rate_hz):
+    from src.decision_engine import DecisionEngine
+    from src.monitor import PerformanceMonitor
+    from src.overhead import meter
+    from src.quantum import forced_quantum, set_quantum
+    from src.sampler import Sampler
+    from src.telemetry import TelemetryRing
+    from stress_tests.loadgen import LoadGenerator
+
+    previous = forced_quantum()
+    set_quantum(quantum)
+
+    optimizer = None
+    boost = None
+    if sched == "boost":
+        from src.fixers.scheduler import SchedulerOptimizer
+        optimizer = SchedulerOptimizer()
+        boost = optimizer.boost_audio_priority()
+
+    monitor = PerformanceMonitor()
+    ring = TelemetryRing(capacity=int(duration * rate_hz) + 16)
+    engine = DecisionEngine({"vendor_name": "Intel", "audio_server": "PipeWire"})
+    busy = []
+
+    def record(sample):
+        ring.append(sample)
+        engine.observe(sample)
+        nodes = sample["nodes"]
+        if nodes:
+            busy.append(max(node.busy_ratio for node in nodes.values()))
+
+    sampler = Sampler(monitor, rate_hz=rate_hz)
+    sampler.add_listener(record)
+    lateness = []
+
+    # Let the collector take its baseline snapshot before the measured window.
+    time.sleep(1.5)
+    monitor.get_stats()
+
+    meter.snapshot("bench")
+    cpu_before = os.times()
+    wall_before = time.monotonic()
+    try:
+        with LoadGenerator(load, duration=duration + 1):
+            for sample in sampler.samples(max(1, int(duration * rate_hz))):
+                lateness.append(sample["lateness"])
+        # Before close(): once pw-top is reaped, its CPU ticks can no longer be read.
+        wall = time.monotonic() - wall_before
+        cpu_after = os.times()
+        overhead = meter.snapshot("bench")
+    finally:
+        sampler.stop()
+        monitor.close()
+        if optimizer is not None:
+            optimizer.restore(boost)
+        set_quantum(previous)
+    stages = overhead["overhead_stage_us"]
+    slowest = max(stages, key=stages.get) if stages else ""
+
+    window = ring.window()
+    plan = engine.analyze()
+
+    own_cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    return {
+        "quantum": quantum,
+        "load": load,
+        "sched": sched,
+        "duration": round(wall, 2),
+        "samples": window["samples"],
+        "xruns": window["xruns"],
+        "xrun_rate_per_min": window["xrun_rate_per_min"],
+        "bursts": window["bursts"],
+        "cpu_p95": window["cpu_p95"],
+        "busy_ratio_max": round(max(busy), 3) if busy else 0.0,
+        "busy_ratio_mean": round(sum(busy) / len(busy), 3) if busy else 0.0,
+        "plan": " ".join(plan),
+        "overhead_cpu_pct": round(own_cpu / wall * 100, 3) if wall else 0.0,
+        "overhead_child_cpu_pct": overhead["overhead_child_cpu_pct"],
+        "overhead_rss_mb": overhead["overhead_rss_mb"],
+        "overhead_wakeups": overhead["overhead_wakeups"],
+        "overhead_spawns": overhead["overhead_spawns"],
+        "slowest_stage": slowest,
+        "slowest_stage_us": stages.get(slowest, 0.0),
+        "lateness_max_ms": round(max(lateness) * 1000, 3) if lateness else 0.0
+    }
+
+
+def write_results(results, path):
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(path, "w") as f:
+            json.dump({
+                "host": platform.node(),
+                "kernel": platform.release(),
+                "cpus": os.cpu_count(),
+                "time": int(time.time()),
+                "results": results
+            }, f, indent=2)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="AirTIGHT audio-stability benchmark")
+    parser.add_argument("--quantums", default="64,256,1024", help="comma-separated quanta to sweep")
+    parser.add_argument("--loads", default="none,cpu,membw,disk,irq", help="comma-separated load kinds")
+    parser.add_argument("--sched", default="default", help="comma-separated: default,boost (boost needs root)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per case")
+    parser.add_argument("--rate", type=float, default=2.0, help="monitor samples per second")
+    parser.add_argument("--fake", action="store_true", help="use the fake pw-top/pw-metadata (CI)")
+    parser.add_argument("--out", default="bench_results.json", help=".json or .csv output path")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        os.environ["PATH"] = FAKE_PIPEWIRE + os.pathsep + os.environ.get("PATH", "")
+
+    results = []
+    cases = [
+        (int(q), load, sched)
+        for sched in args.sched.split(",")
+        for load in args.loads.split(",")
+        for q in args.quantums.split(",")
+    ]
+
+    for i, (quantum, load, sched) in enumerate(cases, 1):
+        print(f"[*] Case {i}/{len(cases)}: quantum={quantum} load={load} sched={sched}", flush=True)
+        result = run_case(quantum, load, sched, args.duration, args.rate)
+        results.append(result)
+        print(f"    xruns={result['xruns']} busy_max={result['busy_ratio_max']} "
+              f"overhead={result['overhead_cpu_pct']}% (+{result['overhead_child_cpu_pct']}% pw-top) "
+              f"rss={result['overhead_rss_mb']}MB wakeups={result['overhead_wakeups']}/s "
+              f"slowest={result['slowest_stage']} {result['slowest_stage_us']}µs plan=[{result['plan']}]")
+
+    write_results(results, args.out)
+    print(f"[✓] {len(results)} results written to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
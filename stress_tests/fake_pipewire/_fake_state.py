@@ -0,0 +1,24 @@
+"""Shared state for the fake pw-top / pw-metadata used by the benchmark suite in CI."""
+import json
+import os
+import tempfile
+
+STATE_PATH = os.environ.get(
+    "AIRTIGHT_FAKE_PW_STATE",
+    os.path.join(tempfile.gettempdir(), "airtight-fake-pipewire.json")
+)
+
+
+def load():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"force_quantum": 0}
+
+
+def save(state):
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, STATE_PATH)
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+
+def _cpu(deadline):
+    x = 0
+    while time.monotonic() < deadline:
+        for i in range(10000):
+            x = (x * 1103515245 + i) & 0xFFFFFFFF
+
+
+def _membw(deadline):
+    # 64 MiB buffers are far larger than any cache, so every copy hits DRAM.
+    src = bytearray(64 * 1024 * 1024)
+    while time.monotonic() < deadline:
+        dst = bytes(src)
+        del dst
+
+
+def _disk(deadline, path):
+    block = os.urandom(1024 * 1024)
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        while time.monotonic() < deadline:
+            os.lseek(fd, 0, os.SEEK_SET)
+            for _ in range(16):
+                os.write(fd, block)
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _irq(deadline):
+    # Loopback UDP ping-pong raises NET_RX/NET_TX softirqs; short sleeps add timer wakeups.
+    a = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    b = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    a.bind(("127.0.0.1", 0))
+    b.bind(("127.0.0.1", 0))
+    payload = b"x" * 512
+    try:
+        while time.monotonic() < deadline:
+            for _ in range(200):
+                a.sendto(payload, b.getsockname())
+                b.recv(1024)
+            time.sleep(0.0001)
+    finally:
+        a.close()
+        b.close()
+
+
+WORKERS = {
+    "cpu": _cpu,
+    "membw": _membw,
+    "disk": _disk,
+    "irq": _irq
+}
+
+
+class LoadGenerator:
+    """Runs a synthetic load of one kind on a process pool for a bounded time."""
+
+    def __init__(self, kind, workers=None, duration=60.0):
+        if kind not in WORKERS and kind != "none":
+            raise ValueError(f"unknown load kind: {kind} (choose from none, {', '.join(WORKERS)})")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.duration = duration
+        self.pool = None
+        self.paths = []
+
+    def start(self):
+        if self.kind == "none":
+            return
+        deadline = time.monotonic() + self.duration
+        args = [(deadline,)] * self.workers
+        if self.kind == "disk":
+            # The parent owns the scratch files; terminate() kills workers before their own cleanup runs.
+            for _ in range(self.workers):
+                fd, path = tempfile.mkstemp(prefix="airtight-bench-")
+                os.close(fd)
+                self.paths.append(path)
+            args = [(deadline, path) for path in self.paths]
+        self.pool = multiprocessing.Pool(self.workers)
+        for arg in args:
+            self.pool.apply_async(WORKERS[self.kind], arg)
+
+    def stop(self):
+        if self.pool is None:
+            return
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        for path in self.paths:
+            os.unlink(path)
+        self.paths = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -6,7 +6,8 @@ print("   AirTIGHT PIPEWIRE QUANTUM STRESS TEST")
 print("============================================================")
 print("[!] This will temporarily lower audio buffer size.")
 print("[!] Audio may crackle — this is normal during testing.")
-print("Press Ctrl+C to restore defaults.\n")
+print("Press Ctrl+C to restore defaults.")
+print("[*] For a measured search instead of listening, run: python3 -m src.quantum --measure-latency\n")
 
 quantum_levels = [128, 96, 64, 48, 32]
 
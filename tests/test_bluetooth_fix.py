@@ -0,0 +1,25 @@
+from src.fixers.bluetooth_fix import BluetoothFixer
+from src.fixers.transaction import Transaction
+
+
+def plan(tmp_path, profile):
+    fixer = BluetoothFixer(dict(profile, bt_usb=[]))
+    fixer.conf_path = str(tmp_path / "airtight_coex.conf")
+    txn = Transaction()
+    assert fixer.plan(txn)
+    return txn
+
+
+def test_realtek_reload_is_kept_without_live_aspm(tmp_path):
+    # No writable link/*_aspm for the Wi-Fi device: rtw_pci disable_aspm only applies on reload.
+    txn = plan(tmp_path, {"vendor_name": "Realtek", "wifi_pci": "0000:ff:00.0"})
+    assert txn.modules == ["rtw88_core"]
+    assert txn.reload_only == {"rtw88_core"}
+    assert [p for p, _, _ in txn.params] == ["/sys/module/rtw88_core/parameters/disable_lps_deep"]
+
+
+def test_intel_disables_power_save_live(tmp_path):
+    txn = plan(tmp_path, {"vendor_name": "Intel"})
+    assert txn.modules == ["iwlwifi"]
+    assert not txn.reload_only
+    assert [kind for kind, _, module in txn.steps] == ["wifi_power_save"]
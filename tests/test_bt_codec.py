@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+import src.fixers.bt_codec as bt_codec
+from src.fixers.bt_codec import CodecGovernor, neighbour_profile
+from src.state import load_json, save_json
+
+CARD = {
+    "name": "bluez_card.00_11_22_33_44_55",
+    "address": "00:11:22:33:44:55",
+    "profile": "a2dp-sink-sbc",
+    "codec": "sbc",
+    "profiles": {"a2dp-sink-ldac": "ldac", "a2dp-sink-aac": "aac", "a2dp-sink-sbc": "sbc",
+                 "headset-head-unit": None, "off": None}
+}
+
+
+def test_neighbour_profile_skips_missing_rungs():
+    assert neighbour_profile(CARD, -1) == "a2dp-sink-aac"
+    assert neighbour_profile(dict(CARD, codec="ldac"), 1) == "a2dp-sink-aac"
+    assert neighbour_profile(CARD, 1) is None
+    assert neighbour_profile(dict(CARD, codec=None), 1) is None
+
+
+@pytest.fixture
+def governor(tmp_path, monkeypatch):
+    path = str(tmp_path / "bt_codec.json")
+    monkeypatch.setattr(bt_codec, "codec_state_path", lambda: path)
+    save_json(path, {CARD["name"]: {"original": "a2dp-sink-ldac", "profile": "a2dp-sink-sbc"}})
+
+    switched = threading.Event()
+    calls = []
+
+    def set_card_profile(card, profile):
+        calls.append((threading.current_thread().name, card, profile))
+        switched.set()
+        return True
+
+    monkeypatch.setattr(bt_codec, "bluez_cards", lambda: [CARD])
+    monkeypatch.setattr(bt_codec, "set_card_profile", set_card_profile)
+    governor = CodecGovernor(log=lambda message: None)
+    governor._last_step -= CodecGovernor.RECOVER_SECONDS
+    yield governor, calls, switched, path
+    governor.stop()
+
+
+def test_check_leaves_pactl_to_the_worker(governor):
+    governor, calls, switched, path = governor
+    governor.check({"bt_good_s": 10.0})  # link not recovered long enough
+    governor.check({"bt_good_s": CodecGovernor.RECOVER_SECONDS})
+    assert calls == []
+
+    governor.start()
+    assert switched.wait(5)
+    assert calls == [("airtight-codec", CARD["name"], "a2dp-sink-aac")]
+    governor.stop()
+    assert load_json(path)[CARD["name"]]["profile"] == "a2dp-sink-aac"
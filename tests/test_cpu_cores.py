@@ -0,0 +1,67 @@
+import pytest
+
+import src.probes.cpu_cores as cpu_cores
+from src.probes.cpu_cores import CoreLoadProbe, read_proc_stat, read_softirqs
+from src.probes.sched_latency import ThreadSchedStats
+
+STAT = """\
+cpu  3500 100 1400 23000 150 30 400 10 0 0
+cpu0 1000 0 500 8000 100 0 0 0 0 0
+cpu1 {cpu1} 0 0
+cpu2 500 0 200 9000 0 0 0 10 0 0
+intr 123456789 16 0 0
+ctxt 987654321
+"""
+SOFTIRQS = """\
+                    CPU0       CPU1       CPU2
+          HI:          0          1          0
+       TIMER:     100000      90000      80000
+      NET_TX:         10       {net_tx}          0
+      NET_RX:        500     {net_rx}         20
+"""
+
+
+def write(tmp_path, cpu1, net_rx, net_tx=20):
+    (tmp_path / "stat").write_text(STAT.format(cpu1=" ".join(map(str, cpu1))))
+    (tmp_path / "softirqs").write_text(SOFTIRQS.format(net_rx=net_rx, net_tx=net_tx))
+
+
+def test_read_proc_stat_skips_the_aggregate_line(tmp_path):
+    write(tmp_path, (2000, 100, 700, 6000, 50, 30, 400, 0), 3000)
+    counters = read_proc_stat(str(tmp_path / "stat"))
+    assert sorted(counters) == [0, 1, 2]
+    assert counters[1] == (2000, 100, 700, 6000, 50, 30, 400, 0)
+
+    table, cpus = read_softirqs(str(tmp_path / "softirqs"))
+    assert cpus == [0, 1, 2]
+    assert table["NET_RX"] == [500, 3000, 20]
+
+
+def test_audio_core_follows_the_data_loop(tmp_path, monkeypatch):
+    stat, softirqs = read_proc_stat, read_softirqs
+    monkeypatch.setattr(cpu_cores, "read_proc_stat", lambda: stat(str(tmp_path / "stat")))
+    monkeypatch.setattr(cpu_cores, "read_softirqs", lambda: softirqs(str(tmp_path / "softirqs")))
+
+    probe = CoreLoadProbe()
+    write(tmp_path, (2000, 100, 700, 6000, 50, 30, 400, 0), 3000)
+    probe.sample()
+    probe._last_time -= 2.0
+    # cpu1 over the interval: 100 ticks, 40 user+nice, 10 system, 30 idle, 10 irq, 10 softirq.
+    write(tmp_path, (2030, 110, 710, 6030, 50, 40, 410, 0), 5000, net_tx=60)
+
+    data_loop = ThreadSchedStats(1200, 1204, "pipewire", "data-loop.0")
+    data_loop.cpu = 1
+    bt_loop = ThreadSchedStats(1230, 1231, "bluetoothd", "data-loop.0")
+    bt_loop.cpu = 0
+    result = probe.sample([data_loop, bt_loop])
+
+    core = result["cores"][1]
+    assert (core.user, core.system, core.irq, core.softirq) == (40.0, 10.0, 10.0, 10.0)
+    assert core.busy == 70.0
+    assert core.net_rx == pytest.approx(1000.0, rel=0.01)
+    assert core.net_tx == pytest.approx(20.0, rel=0.01)
+    assert 0 not in result["cores"]  # no ticks elapsed on cpu0 in the fixture
+    assert result["audio_cores"] == [1]
+    assert result["audio_core"] == 1
+    assert result["audio_core_busy"] == 70.0
+    assert result["audio_core_irq"] == 20.0
@@ -0,0 +1,50 @@
+import time
+
+from src.exporter import MetricsExporter, parse_address
+
+
+def sample(**values):
+    base = {"time": time.time(), "lateness": 0.0, "cpu": 12.0, "ram": 40.0, "new_xruns": 0,
+            "node_xruns": {}, "nodes": {}, "cores": {}}
+    base.update(values)
+    return base
+
+
+def lines(exporter):
+    return exporter.render().decode().splitlines()
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:9477") == ("127.0.0.1", 9477)
+    assert parse_address(":9000") == ("127.0.0.1", 9000)
+    assert parse_address("unix:/run/airtight.sock") == "/run/airtight.sock"
+
+
+def test_counters_accumulate_across_samples():
+    exporter = MetricsExporter()
+    exporter.update(sample(new_xruns=2, node_xruns={'alsa "out"': 2}))
+    exporter.update(sample(new_xruns=1, node_xruns={'alsa "out"': 1}))
+    text = lines(exporter)
+    assert "airtight_xruns_total 3" in text
+    assert 'airtight_node_xruns_total{node="alsa \\"out\\""} 3' in text
+
+
+def test_render_is_cached_until_the_next_update():
+    exporter = MetricsExporter()
+    exporter.update(sample())
+    assert exporter.render() is exporter.render()
+    first = exporter.render()
+    exporter.set_plan({"APPLY_IRQ_AFFINITY": 0.5})
+    assert exporter.render() is not first
+    assert 'airtight_recommended_action{action="APPLY_IRQ_AFFINITY"} 0.5' in lines(exporter)
+
+
+def test_gauges_without_a_reading_are_left_out():
+    exporter = MetricsExporter()
+    exporter.update(sample(bt_rssi=None, bt_tx_power=None, coex_corr=0.25))
+    text = "\n".join(lines(exporter))
+    assert "airtight_bluetooth_rssi" not in text
+    assert "airtight_coex_correlation 0.25" in text
+
+    exporter.update(sample(bt_rssi=0.0, bt_tx_power=4.0))
+    assert "airtight_bluetooth_rssi 0.0" in lines(exporter)
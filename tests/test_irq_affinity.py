@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+import src.fixers.irq_affinity as irq_affinity
+from src.fixers.irq_affinity import audio_cores, read_interrupts, restore_placement
+
+INTERRUPTS = """\
+            CPU0       CPU1       CPU2       CPU3
+   0:         16          0          0          0   IO-APIC    2-edge      timer
+   9:          0          4          0          0   IO-APIC    9-fasteoi   acpi
+ 127:          0          0      48211          0   PCI-MSI 442368-edge      snd_hda_intel:card0
+ 128:       1234       5678          0          0   PCI-MSI 327680-edge      xhci_hcd
+ NMI:          0          0          0          0   Non-maskable interrupts
+ LOC:     123456     234567     345678     456789   Local timer interrupts
+"""
+
+
+def test_read_interrupts(tmp_path):
+    path = tmp_path / "interrupts"
+    path.write_text(INTERRUPTS)
+    irqs = read_interrupts(str(path))
+    assert irqs == {
+        0: (16, "timer"),
+        9: (4, "acpi"),
+        127: (48211, "snd_hda_intel:card0"),
+        128: (6912, "xhci_hcd")
+    }
+
+
+@pytest.fixture
+def cpu_root(tmp_path, monkeypatch):
+    def write(online, siblings):
+        (tmp_path / "online").write_text(online + "\n")
+        last = online.split("-")[-1]
+        topology = tmp_path / f"cpu{last}" / "topology"
+        topology.mkdir(parents=True, exist_ok=True)
+        (topology / "thread_siblings_list").write_text(siblings + "\n")
+
+    monkeypatch.setattr(irq_affinity, "CPU_ROOT", str(tmp_path))
+    return write
+
+
+def test_audio_cores_take_the_last_core_and_its_siblings(cpu_root):
+    cpu_root("0-7", "3,7")
+    assert audio_cores() == [3, 7]
+    cpu_root("0-1", "0-1")  # one SMT core: keep the other sibling for everything else
+    assert audio_cores() == [1]
+    cpu_root("0", "0")
+    assert audio_cores() == []
+
+
+def test_restore_skips_reused_tids(monkeypatch):
+    pinned = {}
+    live = {"701": ("data-loop.0", 9100), "702": ("data-loop.0", 9999)}
+    monkeypatch.setattr(irq_affinity, "thread_identity", lambda pid, tid: live.get(tid))
+    monkeypatch.setattr(irq_affinity, "write_param", lambda path, value: (True, value))
+    monkeypatch.setattr(os, "sched_setaffinity", lambda tid, cpus: pinned.__setitem__(tid, cpus))
+
+    restore_placement({"paths": {}, "threads": {
+        "701": {"pid": 700, "thread": "data-loop.0", "start": 9100, "cpus": [0, 1, 2, 3]},
+        "702": {"pid": 700, "thread": "data-loop.0", "start": 9101, "cpus": [0, 1, 2, 3]}
+    }})
+    assert pinned == {701: [0, 1, 2, 3]}
@@ -0,0 +1,40 @@
+import pytest
+
+from src.probes.latency import LatencyProbe, burst_lags, mls
+
+
+@pytest.mark.parametrize("order", [10, 12])
+def test_mls_is_balanced(order):
+    sequence = mls(order)
+    assert len(sequence) == (1 << order) - 1
+    assert sequence.count(1) == 1 << (order - 1)
+
+
+def test_mls_circular_autocorrelation_is_two_valued():
+    sequence = mls(10)
+    n = len(sequence)
+    for shift in (0, 1, 7, 300):
+        value = sum(sequence[i] * sequence[(i + shift) % n] for i in range(n))
+        assert value == (n if shift == 0 else -1)
+
+
+def test_burst_lags_finds_the_loop_delay():
+    reference = mls(10)
+    spacing, delay, count = 3000, 137, 3
+    length = spacing * count + delay + len(reference)
+    left, right = [0] * length, [0] * length
+    for burst in range(count):
+        start = 500 + burst * spacing
+        for i, v in enumerate(reference):
+            left[start + i] = 8000 * v
+            right[start + delay + i] = 4000 * v
+    assert burst_lags(left, right, reference, count, spacing) == [delay] * count
+
+
+def test_summarize():
+    probe = LatencyProbe(rate=48000)
+    assert probe.summarize([480]) is None
+    result = probe.summarize([480, 480, 960])
+    assert result["latency_min_ms"] == 10.0
+    assert result["latency_max_ms"] == 20.0
+    assert result["bursts"] == 3
@@ -0,0 +1,18 @@
+import glob
+import os
+import tempfile
+import time
+
+from stress_tests.loadgen import LoadGenerator
+
+
+def scratch_files():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "airtight-bench-*")))
+
+
+def test_disk_load_leaves_no_scratch_files():
+    before = scratch_files()
+    with LoadGenerator("disk", workers=2, duration=30) as load:
+        time.sleep(0.5)
+        assert len(load.paths) == 2
+    assert scratch_files() == before
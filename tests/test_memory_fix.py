@@ -0,0 +1,79 @@
+import pytest
+
+import src.fixers.memory_fix as memory_fix
+import src.probes.memory as memory
+from src.fixers.memory_fix import THP_DEFRAG, VM, MemoryFixer, thp_mode
+from src.fixers.transaction import Transaction
+from src.probes.memory import read_faults, read_vmstat
+
+VMSTAT = """\
+nr_free_pages 1523374
+pswpin 4182
+pswpout 9931
+allocstall_dma 0
+allocstall_dma32 2
+allocstall_normal 37
+allocstall_movable 5
+compact_stall 18
+compact_fail 3
+"""
+
+
+def test_read_vmstat(tmp_path):
+    path = tmp_path / "vmstat"
+    path.write_text(VMSTAT)
+    assert read_vmstat(str(path)) == (4182, 18, 44)
+
+
+def test_read_faults(monkeypatch):
+    stat = ("1200 (pipewire) S 1 1200 1200 0 -1 4194560 23117 0 42 0 1310 2207 0 0 -11 0 7 0 2143 "
+            "312754176 4512 18446744073709551615 1 1 0 0 0 0 0 4096 0 0 0 0 17 3 0 0 0 0 0\n")
+    monkeypatch.setattr(memory, "read_text", lambda path, default="": stat if path == "/proc/1200/stat" else default)
+    assert read_faults(1200) == (23117, 42)
+    assert read_faults(1300) is None
+
+
+@pytest.mark.parametrize("text, mode", [("always defer defer+madvise [madvise] never", "madvise"),
+                                        ("[always] defer defer+madvise madvise never", "always"),
+                                        ("", None)])
+def test_thp_mode(tmp_path, text, mode):
+    path = tmp_path / "defrag"
+    path.write_text(text + "\n")
+    assert thp_mode(str(path)) == mode
+
+
+@pytest.fixture
+def system(monkeypatch):
+    files = {
+        f"{VM}/swappiness": "60",
+        f"{VM}/watermark_scale_factor": "10",
+        THP_DEFRAG: "[always] defer defer+madvise madvise never",
+        "/proc/1200/status": "Name:\tpipewire\nVmLck:\t    8192 kB\nVmSwap:\t       0 kB\n"
+    }
+    meminfo = {"MemTotal": 16000000, "SwapTotal": 8000000}
+    read_text = lambda path, default="": files.get(path, default)
+    monkeypatch.setattr(memory_fix, "read_text", read_text)
+    monkeypatch.setattr(memory, "read_text", read_text)
+    monkeypatch.setattr(memory_fix, "read_meminfo", lambda: meminfo)
+    monkeypatch.setattr(memory_fix, "find_processes", lambda names: {1200: "pipewire"})
+    return files, meminfo
+
+
+def test_plan_stages_sysctls_and_thp(system):
+    txn = Transaction({"init_system": "systemd"})
+    fixer = MemoryFixer(txn.profile)
+    assert fixer.plan(txn)
+    assert txn.params == [(f"{VM}/swappiness", "10", None), (f"{VM}/watermark_scale_factor", "125", None)]
+    assert txn.files[fixer.sysctl_path].endswith("vm.swappiness = 10\nvm.watermark_scale_factor = 125\n")
+    assert txn.files[fixer.tmpfiles_path].endswith(f"w {THP_DEFRAG} - - - - madvise\n")
+    assert [kind for kind, _, _ in txn.steps] == ["thp_defrag"]
+
+
+def test_plan_leaves_tuned_systems_alone(system):
+    files, meminfo = system
+    files[f"{VM}/watermark_scale_factor"] = "200"
+    files[THP_DEFRAG] = "always defer defer+madvise [madvise] never"
+    del meminfo["SwapTotal"]  # no swap: swappiness does not matter
+    txn = Transaction()
+    assert not MemoryFixer().plan(txn)
+    assert not txn.params and not txn.files and not txn.steps
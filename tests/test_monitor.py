@@ -0,0 +1,74 @@
+import pytest
+
+from src.monitor import NodeStats, XrunCollector
+
+# pw-top -b from PipeWire 1.0: an idle driver, a driver with two followers ("+"), and a suspended sink.
+SNAPSHOT = """\
+S   ID  QUANT   RATE    WAIT    BUSY   W/Q   B/Q  ERR FORMAT           NAME
+S   28      0      0    ---     ---   ---   ---     0                  Dummy-Driver
+R   58   1024  48000   9.4us  18.2us  0.00  0.02    0    S32LE 2 48000 alsa_output.pci-0000_00_1f.3.analog-stereo
+R   81   1024  48000  11.5us   7.3us  0.01  0.01    {firefox}    F32LE 2 48000  + Firefox
+R   84   1024  48000   1.2ms  850ns   0.06  0.00    0    F32LE 2 48000  + Music Player Daemon
+S   90      0      0    ---     ---   ---   ---     0                  bluez_output.00_11_22_33_44_55.1
+"""
+
+
+def feed(collector, firefox=0):
+    for line in SNAPSHOT.format(firefox=firefox).splitlines():
+        collector.feed(line + "\n")
+
+
+def parsed(firefox=0):
+    collector = XrunCollector()
+    feed(collector, firefox)
+    collector.feed(SNAPSHOT.splitlines()[0])  # the next header closes the snapshot
+    return collector
+
+
+def test_rows_become_node_stats():
+    nodes = parsed().nodes
+    assert sorted(nodes) == [28, 58, 81, 84, 90]
+
+    sink = nodes[58]
+    assert sink.is_driver
+    assert (sink.state, sink.quantum, sink.rate) == ("R", 1024, 48000)
+    assert (sink.wait, sink.busy, sink.busy_ratio) == (9.4, 18.2, 0.02)
+    assert sink.format == "S32LE 2 48000"
+    assert sink.name == "alsa_output.pci-0000_00_1f.3.analog-stereo"
+    assert sink.period_us == pytest.approx(21333.33, abs=0.01)
+
+    player = nodes[84]
+    assert player.name == "Music Player Daemon"
+    assert player.driver == 58 and not player.is_driver
+    assert (player.wait, player.busy) == (1200.0, 0.85)
+
+    idle = nodes[28]
+    assert idle.name == "Dummy-Driver" and idle.format == ""
+    assert (idle.wait, idle.busy_ratio, idle.period_us) == (0.0, 0.0, 0.0)
+    # A new driver row ends the previous driver's group.
+    assert nodes[90].is_driver
+
+
+def test_first_snapshot_is_a_baseline():
+    collector = parsed(firefox=4)
+    assert collector.total == 0
+    assert collector.take_node_deltas() == {}
+
+    feed(collector, firefox=7)
+    collector.feed(SNAPSHOT.splitlines()[0])
+    assert collector.total == 3
+    assert collector.take_node_deltas() == {"Firefox": 3}
+    assert collector.take_node_deltas() == {}
+
+
+def test_error_delta_after_node_id_reuse():
+    old = NodeStats(81, "Firefox", 58, errors=9)
+    new = NodeStats(81, "mpv", 58, errors=2)
+    assert new.error_delta(old) == 2
+    assert NodeStats(81, "Firefox", 58, errors=12).error_delta(old) == 3
+
+
+@pytest.mark.parametrize("text, us", [("850ns", 0.85), ("18.2us", 18.2), ("18.2µs", 18.2), ("1.2ms", 1200.0),
+                                      ("1s", 1000000.0), ("---", 0.0)])
+def test_parse_time(text, us):
+    assert NodeStats.parse_time(text) == pytest.approx(us)
@@ -0,0 +1,80 @@
+import pytest
+
+import src.probes.pressure as pressure
+from src.probes.pressure import PressureProbe, is_protected, process_cgroup, read_psi
+
+FIREFOX = "/user.slice/user-1000.slice/user@1000.service/app.slice/app-firefox.scope"
+MAKE = "/user.slice/user-1000.slice/user@1000.service/app.slice/app-org.gnome.Terminal.slice/vte-spawn-1.scope"
+PIPEWIRE = "/user.slice/user-1000.slice/user@1000.service/session.slice/pipewire.service"
+
+FILES = {
+    "/proc/pressure/cpu": "some avg10=12.04 avg60=4.75 avg300=1.16 total=88123456\n"
+                          "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n",
+    "/proc/pressure/io": "some avg10=0.00 avg60=0.00 avg300=0.00 total=5000\n"
+                         "full avg10=0.00 avg60=0.00 avg300=0.00 total=4000\n",
+    "/proc/4100/cgroup": f"0::{FIREFOX}\n",
+    "/proc/4200/cgroup": f"0::{MAKE}\n",
+    "/proc/1200/cgroup": f"0::{PIPEWIRE}\n",
+    "/proc/4100/comm": "firefox",
+    "/proc/4200/comm": "cc1",
+    # pid 4200 (cc1): ppid 4190, utime 870, stime 95, majflt 3; pid 2 children are kernel threads.
+    "/proc/4200/stat": "4200 (cc1) R 4190 4190 4011 34816 4190 4194304 9119 0 3 0 870 95 0 0 20 0 1 0 "
+                       "775322 181227520 40119 18446744073709551615 1 1 0 0 0 0 0 0 0 0 0 0 17 5 0 0 0 0 0\n",
+    "/proc/77/stat": "77 (kworker/3:1-events) I 2 0 0 0 -1 69238880 0 0 0 0 0 41 0 0 20 0 1 0 312 0 0 "
+                     "18446744073709551615 0 0 0 0 0 0 0 2147483647 0 0 0 0 17 3 0 0 0 0 0\n",
+    "/proc/4200/io": "rchar: 512\nwchar: 1024\nread_bytes: 4096\nwrite_bytes: 1048576\ncancelled_write_bytes: 0\n"
+}
+
+
+@pytest.fixture(autouse=True)
+def proc(monkeypatch, tmp_path):
+    monkeypatch.setattr(pressure, "read_text", lambda path, default="": FILES.get(path, default))
+    monkeypatch.setattr(pressure, "evidence_path", lambda: str(tmp_path / "noisy_neighbours.json"))
+
+
+def test_read_psi():
+    assert read_psi("cpu") == 88123456
+    assert read_psi("io", "full") == 4000
+    assert read_psi("memory") is None
+
+
+def test_cgroups_of_the_audio_stack_are_protected():
+    protected = {process_cgroup(1200)}
+    assert process_cgroup(4100) == FIREFOX
+    assert not is_protected(FIREFOX, protected)
+    assert is_protected(PIPEWIRE, protected)
+    assert is_protected("/user.slice", protected)  # contains PipeWire
+    assert is_protected("/", protected)
+
+
+def test_read_process():
+    assert pressure._read_process(4200, with_io=True) == (965, 3, 1052672)
+    assert pressure._read_process(4200, with_io=False) == (965, 3, 0)
+    assert pressure._read_process(77, with_io=False) is None
+
+
+def test_bursts_blame_the_cpu_hog():
+    probe = PressureProbe()
+    probe.psi = {"cpu": 30.0, "io": 0.0, "memory": 0.0}
+    probe.protected = {PIPEWIRE}
+    ticks = {4100: 0, 4200: 0, 1200: 0}
+    cgroups = {4100: FIREFOX, 4200: MAKE, 1200: PIPEWIRE}
+
+    def scan(cpu):
+        for pid, used in cpu.items():
+            ticks[pid] += used
+        return {pid: ((ticks[pid], 0, 0), cgroups[pid]) for pid in ticks}
+
+    probe.processes = scan({})
+    for _ in range(PressureProbe.MIN_BURSTS):
+        processes = scan({4100: 10, 4200: 180, 1200: 300})
+        probe._blame(processes, 0.0, 2.0, with_io=False)
+        probe.processes = processes
+
+    result = probe.summarize()
+    assert result["noisy_comm"] == "cc1"
+    assert result["noisy_cgroup"] == MAKE
+    assert result["noisy_cpu"] == pytest.approx(180 / pressure.CLOCK_TICKS / 2.0 * 100, abs=0.1)
+    assert result["noisy_share"] == 1.0
+    assert result["psi_max"] == 30.0
+    assert PIPEWIRE not in probe.suspects
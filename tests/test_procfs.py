@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import src.procfs as procfs
+from src.procfs import format_cpulist, parse_cpulist, read_meminfo
+
+
+@pytest.mark.parametrize("text, cpus", [
+    ("0", [0]),
+    ("0-3", [0, 1, 2, 3]),
+    ("0-1,4,6-7\n", [0, 1, 4, 6, 7]),
+    ("", [])
+])
+def test_cpulist_round_trip(text, cpus):
+    assert parse_cpulist(text) == cpus
+    assert parse_cpulist(format_cpulist(cpus)) == cpus
+
+
+def test_format_cpulist_uses_ranges():
+    assert format_cpulist([3, 0, 1, 2, 5]) == "0-3,5"
+
+
+def test_session_env_targets_the_audio_user_as_root(monkeypatch):
+    monkeypatch.setattr(os, "geteuid", lambda: 0)
+    monkeypatch.setattr(procfs, "session_owner", lambda: 1000)
+    env = procfs.session_env()
+    assert env["XDG_RUNTIME_DIR"] == "/run/user/1000"
+    assert env["PULSE_SERVER"] == "unix:/run/user/1000/pulse/native"
+
+    monkeypatch.setattr(procfs, "session_owner", lambda: None)
+    assert procfs.session_env() == dict(os.environ)
+
+
+def test_thread_identity(tmp_path):
+    task = tmp_path / "1200" / "task" / "1204"
+    task.mkdir(parents=True)
+    (task / "stat").write_text(
+        "1204 (data-loop (0)) S 1 1200 1200 0 -1 1077936192 52 0 0 0 1310 2207 0 0 -89 0 7 0 2143 "
+        "312754176 4512 18446744073709551615 1 1 0 0 0 0 0 4096 0 0 0 0 -1 2 88 1 0 0 0\n")
+    assert procfs.thread_identity(1200, 1204, proc=str(tmp_path)) == ("data-loop (0)", 2143)
+    assert procfs.thread_identity(1200, 1205, proc=str(tmp_path)) is None
+
+    own = procfs.thread_identity(os.getpid(), os.getpid())
+    assert own[0] == procfs.read_text("/proc/self/comm")
+
+
+def test_read_meminfo(tmp_path):
+    path = tmp_path / "meminfo"
+    path.write_text("MemTotal:       16000 kB\nMemAvailable:    4000 kB\nHugePages_Total:       0\n")
+    info = read_meminfo(str(path))
+    assert info == {"MemTotal": 16000, "MemAvailable": 4000, "HugePages_Total": 0}
+    assert procfs.memory_percent(info) == 75.0
@@ -0,0 +1,115 @@
+import pytest
+
+from src.decision_engine import DEFAULT_RULES, DecisionEngine
+from src.probes.network import RadioProbe
+from src.rules import Condition, Rule, RuleEngine, WindowStat
+
+
+def feed(engine, values, metric="x", start=0.0):
+    """Feeds one sample per second; returns the actions fired on each."""
+    return [engine.observe({"mono": start + i, metric: v}) for i, v in enumerate(values)]
+
+
+def test_window_stat_aggregates():
+    stat = WindowStat(10, sorted_values=True)
+    for t, v in enumerate([3, 0, 5, 1]):
+        stat.push(float(t), v)
+    assert stat.value("last") == 1
+    assert stat.value("sum") == 9
+    assert stat.value("mean") == 2.25
+    assert stat.value("max") == 5
+    assert stat.value("min") == 0
+    assert stat.value("fraction") == 0.75
+    assert stat.value("rate") == 9 * 60.0 / 10
+    assert stat.value("p95") == 5
+
+
+def test_window_stat_expires_old_samples():
+    stat = WindowStat(3, sorted_values=True)
+    for t, v in enumerate([9, 1, 2, 3]):
+        stat.push(float(t), v)
+    # t=0 is outside (3 - 3, 3]
+    assert stat.value("max") == 3
+    assert stat.value("sum") == 6
+    assert stat.value("p95") == 3
+
+
+def test_unknown_aggregate_or_operator():
+    with pytest.raises(ValueError):
+        Condition("x", "median", 10, ">", 1)
+    with pytest.raises(ValueError):
+        Condition("x", "mean", 10, "==", 1)
+
+
+def test_hold_delays_firing():
+    engine = RuleEngine([Rule("r", "ACT", [Condition("x", "last", 5, ">", 1)], hold=3)])
+    fired = feed(engine, [2] * 5)
+    # The hold starts on the first matching sample and fires hold seconds later.
+    assert fired == [[], [], [], ["ACT"], []]
+    assert engine.active() == {"ACT": pytest.approx(1.0)}
+
+
+def test_hold_restarts_when_condition_breaks():
+    engine = RuleEngine([Rule("r", "ACT", [Condition("x", "last", 5, ">", 1)], hold=2)])
+    fired = feed(engine, [2, 2, 0, 2, 2, 2])
+    assert [i for i, f in enumerate(fired) if f] == [5]
+
+
+def test_hysteresis_keeps_rule_active_until_clear():
+    engine = RuleEngine([Rule("r", "ACT", [Condition("x", "last", 5, ">", 10, clear=5)])])
+    feed(engine, [11])
+    assert "ACT" in engine.active()
+    feed(engine, [7], start=1)  # below the threshold, above clear
+    assert "ACT" in engine.active()
+    feed(engine, [4], start=2)
+    assert engine.active() == {}
+
+
+def test_cooldown_suppresses_refiring():
+    engine = RuleEngine([Rule("r", "ACT", [Condition("x", "last", 1, ">", 1)], cooldown=10)])
+    fired = feed(engine, [2, 0, 2, 0] + [0] * 6 + [2])
+    assert [i for i, f in enumerate(fired) if f] == [0, 10]
+
+
+def test_requires_filters_rules_by_profile():
+    rule = Rule("r", "ACT", [Condition("x", "last", 1, ">", 1)], requires=lambda p: p.get("ok"))
+    assert RuleEngine([rule], {}).compiled == []
+    assert len(RuleEngine([rule], {"ok": True}).compiled) == 1
+
+
+def test_settle_time_covers_hold_and_warmup():
+    rules = [Rule("a", "A", [], hold=5), Rule("b", "B", [], hold=3, warmup=30)]
+    assert RuleEngine(rules).settle_time() == 33
+    assert RuleEngine([]).settle_time() == 0.0
+
+
+def test_health_check_length_lets_default_rules_fire():
+    profile = {"audio_server": "PipeWire"}
+    engine = DecisionEngine(profile)
+    samples = int(engine.settle_time()) + 1
+    for i in range(samples):
+        engine.observe({"mono": float(i), "new_xruns": 3, "audio_core_busy": 90, "sched_starved": 1,
+                        "bt_xruns": 3, "bt_link_poor": 1, "mem_xrun_share": 1})
+    plan = engine.analyze()
+    assert "APPLY_RT_SCHEDULER_BOOST" in plan
+    assert "APPLY_BLUETOOTH_CODEC_FALLBACK" in plan
+    assert "APPLY_MEMORY_STALL_FIX" in plan
+
+
+def test_plan_follows_priority_order():
+    engine = DecisionEngine({"audio_server": "PipeWire"}, rules=[
+        Rule("late", "DISABLE_AUDIO_POWER_SAVE", [Condition("x", "last", 1, ">", 0)]),
+        Rule("early", "APPLY_RT_SCHEDULER_BOOST", [Condition("x", "last", 1, ">", 0)])
+    ])
+    engine.observe({"mono": 0.0, "x": 1})
+    assert engine.analyze() == ["APPLY_RT_SCHEDULER_BOOST", "DISABLE_AUDIO_POWER_SAVE"]
+
+
+def test_default_rule_names_are_unique():
+    names = [rule.name for rule in DEFAULT_RULES]
+    assert len(names) == len(set(names))
+
+
+def test_coex_rule_waits_for_the_radio_probe():
+    assert DecisionEngine({"vendor_name": "Intel"}).settle_time() >= RadioProbe.MIN_SAMPLES
+    assert DecisionEngine({"vendor_name": "Unknown"}).settle_time() < RadioProbe.MIN_SAMPLES
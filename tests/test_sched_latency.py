@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import src.probes.sched_latency as sched_latency
+from src.probes.sched_latency import SchedLatencyProbe, _read_counters
+
+# /proc/<pid>/task/<tid>/stat of a PipeWire data-loop thread on SCHED_FIFO 88, last run on CPU 3.
+STAT = ("1204 (data-loop.0) S 1 1200 1200 0 -1 1077936192 52 0 0 0 1310 2207 0 0 -89 0 7 0 2143 312754176 "
+        "4512 18446744073709551615 1 1 0 0 0 0 0 4096 0 0 0 0 -1 3 88 1 0 0 0 0 0 0 0 0 0 0 0\n")
+STATUS = """\
+Name:\tdata-loop.0
+State:\tS (sleeping)
+Tgid:\t1200
+Pid:\t1204
+voluntary_ctxt_switches:\t48213
+nonvoluntary_ctxt_switches:\t117
+"""
+
+
+def test_read_counters(tmp_path):
+    (tmp_path / "stat").write_text(STAT)
+    (tmp_path / "status").write_text(STATUS)
+    (tmp_path / "schedstat").write_text("13100442311 220754833 48330\n")
+    assert _read_counters(str(tmp_path)) == (13100442311, 220754833, 48330, 48213, 117, 3, 88, 1)
+
+    (tmp_path / "schedstat").write_text("")  # kernel without CONFIG_SCHEDSTATS
+    assert _read_counters(str(tmp_path)) is None
+
+
+def test_sample_rates_and_starvation(monkeypatch):
+    clock = [100.0]
+    counters = {}
+    monkeypatch.setattr(sched_latency, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(sched_latency, "find_processes", lambda names: {1200: "pipewire", 1230: "bluetoothd"})
+    monkeypatch.setattr(sched_latency, "list_threads", lambda pid: {
+        1200: [(1200, "pipewire"), (1204, "data-loop.0"), (1205, "data-loop.1")],
+        1230: [(1231, "data-loop.0")]}[pid])
+    monkeypatch.setattr(sched_latency, "_read_counters", lambda base: counters.get(int(base.rsplit("/", 1)[1])))
+
+    # (run_ns, wait_ns, slices, voluntary, involuntary, cpu, rtprio, policy)
+    counters.update({1200: (0, 0, 0, 0, 0, 0, 0, 0), 1204: (0, 0, 0, 0, 0, 3, 88, 1),
+                     1205: (0, 0, 0, 0, 0, 2, 0, 0), 1231: (0, 0, 0, 0, 0, 1, 0, 0)})
+    probe = SchedLatencyProbe()
+    probe.sample()
+
+    clock[0] += 2.0
+    counters.update({1204: (4000000, 2000000, 100, 1000, 20, 3, 88, 1),
+                     1205: (2000000, 6000000, 4, 50, 180, 2, 0, 0),
+                     1231: (0, 90000000, 1, 0, 900, 1, 0, 0)})
+    result = probe.sample()
+
+    threads = {r.tid: r for r in result["sched_threads"]}
+    assert threads[1204].policy == "SCHED_FIFO" and threads[1204].is_realtime
+    assert threads[1204].delay_us == 20.0
+    assert threads[1204].wait_ms == 1.0
+    assert threads[1204].involuntary_rate == 10.0
+    # bluetoothd's own loop is not on the audio deadline and is left out of the verdict.
+    assert result["sched_worst_thread"] == "pipewire/data-loop.1"
+    assert result["sched_delay_us"] == 1500.0
+    assert result["sched_invol_rate"] == 100.0
+    assert result["sched_non_rt"] == 1
+    assert result["sched_starved"]
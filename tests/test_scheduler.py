@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+import src.fixers.scheduler as scheduler
+from src.fixers.scheduler import SchedulerOptimizer
+
+# pid -> (comm, {tid: thread name}) of a small audio session.
+PROCESSES = {
+    1200: ("pipewire", {1200: "pipewire", 1204: "data-loop.0"}),
+    1210: ("pipewire-pulse", {1210: "pipewire-pulse", 1213: "data-loop.0"}),
+    1220: ("wireplumber", {1220: "wireplumber"}),
+    1230: ("bluetoothd", {1230: "bluetoothd", 1231: "data-loop.0"}),
+    1300: ("firefox", {1300: "firefox"})
+}
+
+
+@pytest.fixture
+def system(monkeypatch):
+    """Fake process table and thread state; records every scheduling change."""
+    threads = {tid: name for _, names in PROCESSES.values() for tid, name in names.items()}
+    starts = {tid: 5000 + tid for tid in threads}
+    applied = []
+
+    def find_processes(names):
+        return {pid: comm for pid, (comm, _) in PROCESSES.items() if comm in names}
+
+    monkeypatch.setattr(scheduler, "find_processes", find_processes)
+    monkeypatch.setattr(scheduler, "list_threads", lambda pid: sorted(PROCESSES[pid][1].items()))
+    monkeypatch.setattr(scheduler, "thread_identity",
+                        lambda pid, tid: (threads[tid], starts[tid]) if tid in threads else None)
+    monkeypatch.setattr(SchedulerOptimizer, "_read_state", lambda self, tid: {
+        "policy_id": os.SCHED_OTHER, "policy": "SCHED_OTHER", "rtprio": 0, "nice": 0, "ioprio": 0})
+    monkeypatch.setattr(SchedulerOptimizer, "_apply", lambda self, tid, *target: applied.append((tid,) + target))
+    return starts, applied
+
+
+def test_boost_targets_every_audio_daemon(system):
+    _, applied = system
+    result = SchedulerOptimizer().boost_audio_priority()
+
+    boosted = {entry["comm"] for entry in result["threads"] if entry["changed"]}
+    assert boosted == {"pipewire", "pipewire-pulse", "wireplumber", "bluetoothd"}
+    targets = {tid: target for tid, *target in applied}
+    # Data-loop threads go real-time; bluetoothd's own loop and main threads only get nice and I/O priority.
+    assert targets[1204][:2] == [os.SCHED_FIFO, 88]
+    assert targets[1213][:2] == [os.SCHED_FIFO, 88]
+    assert targets[1231][:3] == [os.SCHED_OTHER, 0, -12]
+    assert targets[1200][:3] == [os.SCHED_OTHER, 0, -12]
+
+
+def test_restore_skips_reused_tids(system):
+    starts, applied = system
+    optimizer = SchedulerOptimizer()
+    # As journaled: the result comes back from JSON.
+    result = json.loads(json.dumps(optimizer.boost_audio_priority()))
+    applied.clear()
+
+    starts[1204] += 1  # PipeWire restarted; its old data-loop TID now names another thread
+    optimizer.restore(result)
+    restored = {tid for tid, *_ in applied}
+    assert 1204 not in restored
+    assert 1213 in restored and 1200 in restored
@@ -0,0 +1,65 @@
+from src.telemetry import TelemetryRing
+
+
+def sample(t, cpu=10.0, xruns=0, node_xruns=None):
+    return {"time": float(t), "cpu": cpu, "ram": 50.0, "new_xruns": xruns, "node_xruns": node_xruns or {}}
+
+
+def test_empty_window():
+    ring = TelemetryRing(capacity=4)
+    window = ring.window(10)
+    assert window["samples"] == 0
+    assert window["xrun_rate_per_min"] == 0.0
+
+
+def test_window_aggregates():
+    ring = TelemetryRing(capacity=10)
+    for t, (cpu, xruns) in enumerate([(10, 0), (20, 2), (30, 1), (40, 0), (50, 3)]):
+        ring.append(sample(t, cpu, xruns, {"alsa_output": xruns} if xruns else None))
+    window = ring.window()
+    assert window["samples"] == 5
+    assert window["span"] == 5.0
+    assert window["cpu_max"] == 50.0
+    assert window["xruns"] == 6
+    assert window["bursts"] == 2
+    assert window["xrun_rate_per_min"] == 72.0
+    assert window["node_xruns"] == {"alsa_output": 6}
+
+
+def test_window_limits_to_recent_seconds():
+    ring = TelemetryRing(capacity=10)
+    for t in range(6):
+        ring.append(sample(t, xruns=1 if t < 3 else 0))
+    assert ring.window(2)["samples"] == 2
+    assert ring.window(2)["xruns"] == 0
+
+
+def test_ring_wraps_in_order():
+    ring = TelemetryRing(capacity=3)
+    for t in range(5):
+        ring.append(sample(t, cpu=t))
+    assert len(ring) == 3
+    assert list(ring.column("time")) == [2.0, 3.0, 4.0]
+    assert list(ring.column("cpu")) == [2.0, 3.0, 4.0]
+
+
+
+def test_missing_readings_are_stored_as_nan():
+    ring = TelemetryRing(capacity=4, columns=TelemetryRing.COLUMNS + ("rssi",))
+    ring.append(dict(sample(0), rssi=None))
+    ring.append(dict(sample(1), rssi=-12.0))
+    first, second = ring.column("rssi")
+    assert first != first
+    assert second == -12.0
+
+
+def test_missing_extras_are_left_out_of_aggregates():
+    ring = TelemetryRing(capacity=4)
+    ring.append(dict(sample(0), sched_delay_us=None))
+    assert ring.window()["sched_delay_us_max"] is None
+
+    ring.append(dict(sample(1), sched_delay_us=120.0))
+    ring.append(sample(2))
+    window = ring.window()
+    assert window["sched_delay_us_max"] == 120.0
+    assert window["sched_delay_us_p95"] == 120.0
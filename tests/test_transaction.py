@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+import src.actions  # registers every fixer's reverter
+import src.fixers.transaction as transaction
+from src.fixers.transaction import Transaction
+from src.state import load_json
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.json")
+    monkeypatch.setattr(transaction, "journal_path", lambda: path)
+    return path
+
+
+@pytest.fixture
+def param(tmp_path):
+    """A file standing in for a live sysfs parameter."""
+    path = tmp_path / "param"
+    path.write_text("1\n")
+    return path
+
+
+def test_every_journaled_kind_has_a_reverter():
+    assert {"sched", "irq_affinity", "wifi_power_save", "bt_codec", "thp_defrag"} <= set(Transaction.REVERTERS)
+
+
+def test_apply_and_revert(tmp_path, journal, param):
+    existing = tmp_path / "existing.conf"
+    existing.write_text("old\n")
+    created = tmp_path / "sub" / "new.conf"
+
+    txn = Transaction()
+    txn.write_file(str(existing), "new\n")
+    txn.write_file(str(created), "created\n")
+    txn.set_param(str(param), 0)
+    assert txn.apply()
+
+    assert existing.read_text() == "new\n"
+    assert created.read_text() == "created\n"
+    assert param.read_text() == "0"
+    assert len(load_json(journal)["transactions"]) == 1
+
+    txn.revert()
+    assert existing.read_text() == "old\n"
+    assert not created.exists()
+    assert param.read_text() == "1"
+    assert load_json(journal)["transactions"] == []
+
+
+def test_revert_removes_its_entry_by_id(journal, monkeypatch):
+    monkeypatch.setitem(Transaction.REVERTERS, "test", lambda data: None)
+    first = Transaction()
+    first.call(lambda: {"cpus": (0, 1)}, kind="test")  # stored as a list in the journal
+    assert first.apply()
+    second = Transaction()
+    second.call(lambda: {"cpus": (2, 3)}, kind="test")
+    assert second.apply()
+
+    first.revert()
+    remaining = load_json(journal)["transactions"]
+    assert [t["id"] for t in remaining] == [second.entry["id"]]
+
+
+def test_unchanged_files_are_not_journaled(tmp_path, journal):
+    path = tmp_path / "same.conf"
+    path.write_text("same\n")
+    txn = Transaction()
+    txn.write_file(str(path), "same\n")
+    assert not txn.apply()
+    assert not os.path.exists(journal)
+
+
+def test_failed_step_rolls_back(tmp_path, journal, param):
+    def fail():
+        raise RuntimeError("boom")
+
+    txn = Transaction()
+    txn.set_param(str(param), 0)
+    txn.call(fail, kind="test")
+    assert not txn.apply()
+    assert param.read_text() == "1"
+
+
+def test_revert_last_runs_registered_reverters(journal, monkeypatch):
+    undone = []
+    monkeypatch.setitem(Transaction.REVERTERS, "test", undone.append)
+    txn = Transaction()
+    txn.call(lambda: {"previous": "a"}, kind="test")
+    txn.call(lambda: True, kind="test")  # already in place: live, not journaled
+    assert txn.apply()
+
+    assert Transaction.revert_last() is True
+    assert undone == [{"previous": "a"}]
+    assert Transaction.revert_last() is False
+
+
+def test_module_reload_skipped_when_applied_live(tmp_path, journal, param, monkeypatch):
+    reloaded = []
+    monkeypatch.setattr(transaction, "reload_module", lambda name: reloaded.append(name) or True)
+    monkeypatch.setattr(transaction, "restart_service", lambda init, name: True)
+
+    txn = Transaction()
+    txn.write_file(str(tmp_path / "mod.conf"), "options mod x=0\n")
+    txn.reload_module("mod")
+    txn.set_param(str(param), 0, module="mod")
+    assert txn.apply()
+    assert reloaded == []
+
+    txn = Transaction()
+    txn.write_file(str(tmp_path / "mod.conf"), "options mod x=2\n")
+    txn.reload_module("mod")
+    txn.call(lambda: None, module="mod")  # the live change failed
+    assert txn.apply()
+    assert reloaded == ["mod"]
+
+
+def test_module_without_live_counterpart_is_reloaded(tmp_path, journal, param, monkeypatch):
+    reloaded = []
+    monkeypatch.setattr(transaction, "reload_module", lambda name: reloaded.append(name) or name != "gone")
+
+    txn = Transaction()
+    txn.write_file(str(tmp_path / "mod.conf"), "options mod x=0\noptions mod_pci y=1\n")
+    txn.reload_module("mod")
+    txn.set_param(str(param), 0, module="mod")
+    txn.require_reload("mod")
+    assert "skipped if applied live" not in txn.diff()
+    assert txn.apply()
+    assert reloaded == ["mod"]
+    assert not txn.reboot_required
+
+    txn = Transaction()
+    txn.write_file(str(tmp_path / "gone.conf"), "options gone x=0\n")
+    txn.reload_module("gone")
+    assert txn.apply()
+    assert txn.reboot_required
+
+
+def test_revert_last_keeps_entry_without_reverter(journal, monkeypatch):
+    monkeypatch.setitem(Transaction.REVERTERS, "test", lambda data: None)
+    txn = Transaction()
+    txn.call(lambda: {"previous": "a"}, kind="test")
+    assert txn.apply()
+
+    monkeypatch.delitem(Transaction.REVERTERS, "test")
+    assert Transaction.revert_last() is None
+    assert len(load_json(journal)["transactions"]) == 1